@@ -1,11 +1,12 @@
 import streamlit as st
-import pandas as pd
 import time
-import textwrap
-from datetime import datetime
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 import logic
 import database
-from styles import CSS
+from styles import CSS, COMPONENT_CSS
+from issue_list import issue_list
 
 # 1. Config and Setup
 st.set_page_config(
@@ -23,6 +24,99 @@ if 'db_initialized' not in st.session_state:
 
 st.markdown(CSS, unsafe_allow_html=True)
 
+# --- NEW: In-memory read model (opt-in with TRACKER_READ_MODEL=1) ---
+logic.load_env()
+READ_MODEL_ENABLED = os.getenv("TRACKER_READ_MODEL") == "1"
+
+@st.cache_resource
+def get_read_model():
+    import read_model  # pandas/NumPy only load when the read model is enabled
+    return read_model.ReadModel()
+
+model = get_read_model() if READ_MODEL_ENABLED else None
+
+# Fragment reruns (Mark Seen, undo, filter changes) skip the module-level code, so
+# the model is synced right before it answers; sync is one PRAGMA when nothing changed
+
+def count_issues(filters):
+    """Counts from the read model when it can answer the filters, else from SQLite."""
+    if model:
+        model.sync()
+    count = model.count(filters) if model else None
+    return count if count is not None else database.count_issues(filters)
+
+def get_issues(filters, columns, order_by, limit=None):
+    if model:
+        model.sync()
+    issues = model.get_issues(filters, order_by, limit=limit) if model else None
+    return issues if issues is not None else database.get_issues(filters, columns=columns, order_by=order_by, limit=limit)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_category_counts(category_id):
+    """(total, new) for a category card. Seen state doesn't affect them, so triage clicks reuse these."""
+    return count_issues({'category_id': category_id}), count_issues({'category_id': category_id, 'only_new': True})
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_label_options():
+    return list(database.get_label_counts())
+
+MAX_COMMENTS_FILTER = 50  # Top of the comments slider; selecting it means "no upper limit"
+ISSUE_PAGE_SIZE = 100     # Cards sent to the issue list at first and per "load more"
+
+# Where feed_server.py is reachable; only used to show feed URLs
+FEED_BASE_URL = os.getenv("FEED_BASE_URL", "http://127.0.0.1:8766").rstrip("/")
+
+# --- NEW: Per-user seen state ---
+# Open the dashboard as ?user=<name> (or set TRACKER_USER) to keep your own seen state
+if 'user_id' not in st.session_state:
+    st.session_state['user_name'] = (st.query_params.get("user") or os.getenv("TRACKER_USER")
+                                     or database.DEFAULT_USER)
+    st.session_state['user_id'] = database.get_or_create_user(st.session_state['user_name'])
+
+# --- NEW: Seen-state callbacks ---
+# Run by Streamlit before the rerun a click triggers, so marking issues costs one
+# rerun instead of two and no explicit st.rerun() is needed.
+
+def _remember_undo(count, token):
+    if count:
+        st.session_state['seen_undo'] = (token, count)
+
+def mark_seen(issue_ids):
+    _remember_undo(*database.mark_issues_seen(issue_ids, st.session_state['user_id']))
+
+def mark_matching_seen(filters):
+    _remember_undo(*database.mark_matching_issues_seen(filters))
+
+def on_issue_list_action():
+    """Applies the card action the issue list component reported."""
+    event = st.session_state.get('issue_list')
+    if not event:
+        return
+    if event['action'] == 'seen':
+        mark_seen([int(i) for i in event['ids']])
+    elif event['action'] == 'details':
+        st.session_state.setdefault('expanded_issues', set()).symmetric_difference_update(event['ids'])
+    elif event['action'] == 'more':
+        st.session_state['issue_list_limit'] = st.session_state.get('issue_list_limit', ISSUE_PAGE_SIZE) + ISSUE_PAGE_SIZE
+
+def undo_mark_seen():
+    token, _ = st.session_state.pop('seen_undo')
+    database.unmark_issues_seen(token, st.session_state['user_id'])
+
+# --- NEW: Interaction timing (TRACKER_SHOW_TIMINGS=1) ---
+# Logs how long each dashboard section takes to render, so a click can be traced to
+# the sections it actually reran.
+SHOW_TIMINGS = os.getenv("TRACKER_SHOW_TIMINGS") == "1"
+
+@contextmanager
+def timed(section):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if SHOW_TIMINGS:
+            print(f"[timing] {section}: {(time.perf_counter() - start) * 1000:.1f} ms")
+
 # 2. Helper Functions
 def format_time_ago(dt_obj):
     if not isinstance(dt_obj, datetime):
@@ -51,25 +145,90 @@ def get_label_class(label_name):
         return 'label-tag label-help-wanted'
     return 'label-tag'
 
+def card_payload(issue):
+    """Plain dict the issue list component renders for one card."""
+    is_new = False
+    fs = issue.first_seen_at
+    if isinstance(fs, str):
+        fs_dt = datetime.fromisoformat(fs)
+        if (datetime.now() - fs_dt).total_seconds() < 86400:
+            is_new = True
+
+    labels = [l.strip() for l in (issue.labels or "").split(',') if l.strip()]
+    return {
+        'id': issue.id,
+        'title': issue.title,
+        'url': issue.github_issue_url,
+        'repo': issue.repo_name,
+        'labels': [[l, get_label_class(l)] for l in labels],
+        'assignee': issue.assignee_login if issue.is_assigned else None,
+        'comments': issue.comments_count or 0,
+        'first_seen': format_time_ago(issue.first_seen_at),
+        'is_new': is_new,
+        'duplicate_count': issue.duplicate_count or 0,
+        'seen': bool(issue.seen_at),
+    }
+
 # 3. Session State Management
 if 'last_refresh' not in st.session_state:
     st.session_state['last_refresh'] = None
     
-def run_refresh_all():
+def run_refresh_all(job=None):
+    """Runs Refresh All, or resumes an interrupted job when one is given."""
     progress_bar = st.progress(0)
     status_text = st.empty()
+    # Clicking stops this script run; the callback then cancels the job before the rerun
+    st.button("⏹️ Cancel Refresh", key="cancel_running_refresh",
+              on_click=logic.cancel_refresh, args=(job['scope'] if job else "all",))
     
     def update_progress(current, total, text):
         progress_bar.progress(current / total)
         status_text.text(text)
         
-    stats = logic.refresh_all(progress_callback=update_progress)
+    if job:
+        stats = logic.run_refresh_job(job['id'], progress_callback=update_progress)
+    else:
+        stats = logic.refresh_all(progress_callback=update_progress)
     
     progress_bar.empty()
-    status_text.success(f"Refresh Complete! Found {stats['total_new']} new issues.")
+    if stats['cancelled']:
+        status_text.warning(f"Refresh cancelled after {stats['repos_processed']} repositories.")
+    elif not stats['repos_processed'] and not stats['repos_failed']:
+        status_text.info("No repositories are due yet. Use a category or repository refresh to force one.")
+    else:
+        status_text.success(f"Refresh Complete! Found {stats['total_new']} new issues.")
     time.sleep(2)
     status_text.empty()
     st.session_state['last_refresh'] = datetime.now()
+    get_category_counts.clear()
+    st.rerun()
+
+def run_discover():
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+
+    def update_progress(current, total, text):
+        progress_bar.progress(current / total)
+        status_text.text(text)
+
+    stats = logic.discover_good_first_issues(progress_callback=update_progress)
+
+    progress_bar.empty()
+    if stats['repos_failed'] and not stats['repos_processed']:
+        status_text.error(f"Discovery failed for all {stats['repos_failed']} repositories: "
+                          f"{next(iter(stats['errors'].values()), 'unknown error')}")
+    elif stats['repos_failed']:
+        failed = ", ".join(list(stats['errors'])[:5])
+        more = f" and {stats['repos_failed'] - 5} more" if stats['repos_failed'] > 5 else ""
+        status_text.warning(f"Discovery found {stats['total_new']} new good first issues, "
+                            f"but {stats['repos_failed']} repositories failed: {failed}{more}.")
+    else:
+        status_text.success(f"Discovery Complete! Found {stats['total_new']} new good first issues.")
+    # Failures stay up longer; the rerun below clears the message
+    time.sleep(5 if stats['repos_failed'] else 2)
+    status_text.empty()
+    st.session_state['last_refresh'] = datetime.now()
+    get_category_counts.clear()
     st.rerun()
 
 def run_refresh_category(cat_id):
@@ -81,6 +240,7 @@ def run_refresh_category(cat_id):
         st.success(f"Updated! Found {stats['total_new']} new issues.")
     time.sleep(1.5)
     time.sleep(1.5)
+    get_category_counts.clear()
     st.rerun()
 
 def run_refresh_repository(repo_id):
@@ -90,282 +250,396 @@ def run_refresh_repository(repo_id):
     if "error" in result:
         st.error(f"Error: {result['error']}")
     else:
-        st.success(f"Updated! Found {result['new']} new issues.")
+        st.success(f"Updated! Found {result['new']} new issues, {result['updated']} changed.")
     time.sleep(1.5)
+    get_category_counts.clear()
     st.rerun()
 
-# 4. Main App Layout - TABS
-t1, t2, t3 = st.tabs(["🚀 Dashboard", "📊 Statistics", "⚙️ Settings"])
+# --- NEW: Dashboard sections ---
+# Each section is a fragment: a click inside one reruns only that section (Mark Seen
+# doesn't recompute category cards, stats or the Settings list). Actions that change
+# data for every section (refreshes, adding/removing repos) call st.rerun() for the
+# whole app.
 
-with t1:
-    # --- DASHBOARD TAB ---
-    
-    # HEADERS
-    c1, c2 = st.columns([3, 1])
-    with c1:
-        st.title("🔍 GitHub Issue Tracker")
-        last_update = st.session_state.get('last_refresh', "Never")
-        if isinstance(last_update, datetime):
-            last_update = format_time_ago(last_update)
-        st.caption(f"Last updated: {last_update}")
+@st.fragment
+def render_category_summary():
+    with timed("categories"):
+        # CATEGORIES SECTION
+        st.subheader("Categories")
+        categories = database.get_categories()
+        cat_cols = st.columns(len(categories))
 
-    with c2:
-        if st.button("🔄 Refresh All", type="primary", use_container_width=True):
-            run_refresh_all()
-            
-    st.markdown("---")
+        selected_cat_id_from_card = None
 
-    # CATEGORIES SECTION
-    st.subheader("Categories")
-    categories = database.get_categories()
-    cat_cols = st.columns(len(categories))
-
-    selected_cat_id_from_card = None
-
-    for idx, cat in enumerate(categories):
-        # ... [Stats Calc] ...
-        repos = database.get_repositories(cat['id'])
-        repo_ids = [r['id'] for r in repos]
-        issues = database.get_issues({'category_id': cat['id']})
-        total_issues = len(issues)
-        now = datetime.now()
-        new_issues = sum(1 for i in issues if (
-            isinstance(i['first_seen_at'], str) and 
-            (now - datetime.fromisoformat(i['first_seen_at'])).total_seconds() < 86400
-        ))
+        for idx, cat in enumerate(categories):
+            # Cards only render counts, so don't fetch any issue rows
+            total_issues, new_issues = get_category_counts(cat['id'])
         
-        with cat_cols[idx]:
-            st.markdown(f"""
-            <div class="metric-box">
-                <div class="metric-value">{total_issues}</div>
-                <div class="metric-label">{cat['name']}</div>
-                <div class="new-count">+{new_issues} New</div>
-            </div>
-            """, unsafe_allow_html=True)
-            if st.button(f"🔄 Refresh", key=f"btn_cat_{cat['id']}", use_container_width=True):
-                run_refresh_category(cat['id'])
-
-    # FILTER SECTION
-    st.markdown("### Filters")
-    with st.container():
-        f_col1, f_col2, f_col3, f_col4 = st.columns(4)
+            with cat_cols[idx]:
+                st.markdown(f"""
+                <div class="metric-box">
+                    <div class="metric-value">{total_issues}</div>
+                    <div class="metric-label">{cat['name']}</div>
+                    <div class="new-count">+{new_issues} New</div>
+                </div>
+                """, unsafe_allow_html=True)
+                if st.button(f"🔄 Refresh", key=f"btn_cat_{cat['id']}", use_container_width=True):
+                    run_refresh_category(cat['id'])
+
+@st.fragment
+def render_results():
+    with timed("results"):
+        categories = database.get_categories()
+
+        # FILTER SECTION
+        st.markdown("### Filters")
+        with st.container():
+            f_col1, f_col2, f_col3, f_col4 = st.columns(4)
         
-        with f_col1:
-            cat_options = {"All": None}
-            for c in categories:
-                cat_options[c['name']] = c['id']
-            sel_cat_name = st.selectbox("Category", list(cat_options.keys()))
-            selected_cat_id = cat_options[sel_cat_name]
+            with f_col1:
+                cat_options = {c['name']: c['id'] for c in categories}
+                sel_cat_names = st.multiselect("Category", list(cat_options.keys()), placeholder="All")
+                selected_cat_ids = [cat_options[name] for name in sel_cat_names]
             
-        with f_col2:
-            repo_options = {"All": None}
-            if selected_cat_id:
-                 cat_repos = database.get_repositories(selected_cat_id)
-            else:
-                 cat_repos = database.get_repositories()
-            for r in cat_repos:
-                repo_options[r['full_name']] = r['id']
-            sel_repo_name = st.selectbox("Repository", list(repo_options.keys()))
-            selected_repo_id = repo_options[sel_repo_name]
+            with f_col2:
+                if selected_cat_ids:
+                     cat_repos = [r for cat_id in selected_cat_ids for r in database.get_repositories(cat_id)]
+                else:
+                     cat_repos = database.get_repositories()
+                repo_options = {r['full_name']: r['id'] for r in cat_repos}
+                sel_repo_names = st.multiselect("Repository", list(repo_options.keys()), placeholder="All")
+                selected_repo_ids = [repo_options[name] for name in sel_repo_names if name in repo_options]
             
-            if selected_repo_id:
-                if st.button("🔄 Refresh This Repo", key="btn_refresh_repo"):
-                     run_refresh_repository(selected_repo_id)
+                if len(selected_repo_ids) == 1:
+                    if st.button("🔄 Refresh This Repo", key="btn_refresh_repo"):
+                         run_refresh_repository(selected_repo_ids[0])
 
-        with f_col3:
-            filter_type = st.selectbox("Show", ["All Issues", "Good First Issue Only", "Unassigned Only"])
+            with f_col3:
+                filter_type = st.selectbox("Show", ["All Issues", "Good First Issue Only", "Unassigned Only"])
             
-        with f_col4:
-            search_query = st.text_input("Search", placeholder="Search titles...")
+            with f_col4:
+                search_query = st.text_input("Search", placeholder="Search titles...")
     
-    col_check1, col_check2 = st.columns(2)
-    with col_check1:    
-        only_new = st.checkbox("🆕 Show New Only ( < 24h )")
-    with col_check2:
-        unseen_only = st.checkbox("👀 Show Unseen Only", value=True)
-
-    # RESULTS SECTION
-    filters = {
-        'category_id': selected_cat_id,
-        'repo_id': selected_repo_id,
-        'search': search_query,
-        'only_good_first': filter_type == "Good First Issue Only",
-        'unassigned_only': filter_type == "Unassigned Only",
-        'only_new': only_new,
-        'unseen_only': unseen_only
-    }
+        with st.expander("More Filters"):
+            m_col1, m_col2, m_col3, m_col4 = st.columns(4)
+            label_options = get_label_options()
+            include_labels = m_col1.multiselect("Labels", label_options, placeholder="Any")
+            exclude_labels = m_col2.multiselect("Exclude Labels", label_options, placeholder="None")
+            assignee = m_col3.text_input("Assignee", placeholder="GitHub login")
+            min_comments, max_comments = m_col4.slider(
+                "Comments", 0, MAX_COMMENTS_FILTER, (0, MAX_COMMENTS_FILTER),
+                help=f"{MAX_COMMENTS_FILTER} at the top of the range means no upper limit"
+            )
+
+        col_check1, col_check2, col_check3, col_sort = st.columns(4)
+        with col_check1:    
+            only_new = st.checkbox("🆕 Show New Only ( < 24h )")
+        with col_check2:
+            unseen_only = st.checkbox("👀 Show Unseen Only", value=True)
+        with col_check3:
+            collapse_duplicates = st.checkbox("🧬 Collapse Duplicates", help="Show one issue per cross-repo duplicate cluster")
+        with col_sort:
+            sort_options = {"Newest": 'created', "Best to Pick Up": 'score'}
+            sort_label = st.selectbox("Sort By", list(sort_options.keys()), label_visibility="collapsed")
+
+        # RESULTS SECTION
+        filters = {
+            'category_id': selected_cat_ids,
+            'repo_id': selected_repo_ids,
+            'labels': include_labels,
+            'exclude_labels': exclude_labels,
+            'assignee': assignee.strip(),
+            'min_comments': min_comments or None,
+            'max_comments': max_comments if max_comments < MAX_COMMENTS_FILTER else None,
+            'search': search_query,
+            'only_good_first': filter_type == "Good First Issue Only",
+            'unassigned_only': filter_type == "Unassigned Only",
+            'only_new': only_new,
+            'unseen_only': unseen_only,
+            'collapse_duplicates': collapse_duplicates,
+            'user_id': st.session_state['user_id'],
+        }
     
-    # Results Query
-    filtered_issues = database.get_issues(filters)
-
-    # Post-processing for "New" filter if DB didn't handle it strictly
-    if only_new:
-        final_issues = []
-        for i in filtered_issues:
-            fs = i['first_seen_at']
-            if isinstance(fs, str):
-                fs_dt = datetime.fromisoformat(fs)
-                if (datetime.now() - fs_dt).total_seconds() < 86400:
-                    final_issues.append(i)
-        filtered_issues = final_issues
-
-    st.caption(f"Showing {len(filtered_issues)} issues")
+        # Only the first pages are loaded; the issue list asks for more as it scrolls
+        view = (repr(filters), sort_options[sort_label])
+        if st.session_state.get('issue_list_view') != view:
+            st.session_state['issue_list_view'] = view
+            st.session_state['issue_list_limit'] = ISSUE_PAGE_SIZE
+
+        # Results Query - only the fields the cards render
+        total = count_issues(filters)
+        filtered_issues = get_issues(filters, columns=[
+            'id', 'title', 'github_issue_url', 'repo_name', 'labels', 'is_assigned',
+            'assignee_login', 'comments_count', 'first_seen_at', 'seen_at', 'duplicate_count'
+        ], order_by=sort_options[sort_label], limit=st.session_state['issue_list_limit'])
+
+        st.caption(f"Showing {total} issues")
+
+        # BULK TRIAGE BAR (per-card selection lives inside the issue list)
+        b1, b2 = st.columns([2, 1])
+        b1.button(f"👁️ Mark All {total} Matching Seen", disabled=not filtered_issues,
+                  on_click=mark_matching_seen, args=(filters,), use_container_width=True)
+        if 'seen_undo' in st.session_state:
+            b2.button(f"↩️ Undo ({st.session_state['seen_undo'][1]})", on_click=undo_mark_seen,
+                      use_container_width=True)
+
+        with st.expander("📡 Save as Feed"):
+            with st.form("save_feed_form", clear_on_submit=True):
+                feed_name = st.text_input("Feed Name", placeholder="PyTorch good first issues")
+                if st.form_submit_button("Save Feed"):
+                    if not feed_name.strip():
+                        st.error("Name is required")
+                    else:
+                        success, result = database.create_saved_feed(feed_name.strip(), filters)
+                        if success:
+                            st.success(f"Published at {FEED_BASE_URL}/feeds/{result}.rss (also .json and .atom)")
+                        else:
+                            st.error(result)
     
-    # 5. RENDER ISSUE LIST
-    if not filtered_issues:
-        st.info("No issues found matching your filters. Try hitting Refresh!")
-    else:
-        for issue in filtered_issues:
-            # Prepare Data
-            is_new = False
-            fs = issue['first_seen_at']
-            if isinstance(fs, str):
-                fs_dt = datetime.fromisoformat(fs)
-                if (datetime.now() - fs_dt).total_seconds() < 86400:
-                    is_new = True
-                    
-            new_badge_html = '<span class="badge-new">NEW</span>' if is_new else ''
-            
-            # Labels HTML generation (same as before)
-            labels_html = ""
-            if issue['labels']:
-                for l in issue['labels'].split(','):
-                    l = l.strip()
-                    if not l: continue
-                    c_class = get_label_class(l)
-                    labels_html += f'<span class="{c_class}">{l}</span>'
-                    
-            assignee_html = f"👤 {issue['assignee_login']}" if issue['is_assigned'] else "👤 Unassigned"
-            
-            # Use st.container to group card + mark seen button
-            with st.container():
-                c_card, c_action = st.columns([5, 1])
-                with c_card:
-                    card_html = textwrap.dedent(f"""
-<div class="issue-card">
-    <div class="card-top">
-        {new_badge_html}
-        <a class="issue-title" href="{issue['github_issue_url']}" target="_blank">{issue['title']}</a>
-    </div>
-    <div class="card-meta">
-        <span class="repo-name">
-            <svg aria-hidden="true" height="16" viewBox="0 0 16 16" width="16" style="fill: currentColor;">
-                <path d="M2 2.5A2.5 2.5 0 0 1 4.5 0h8.75a.75.75 0 0 1 .75.75v12.5a.75.75 0 0 1-.75.75h-2.5a.75.75 0 0 1 0-1.5h1.75v-2h-8a1 1 0 0 0-.714 1.7.75.75 0 1 1-1.072 1.05A2.495 2.495 0 0 1 2 11.5Zm10.5-1h-8a1 1 0 0 0-1 1v6.708A2.486 2.486 0 0 1 4.5 9h8ZM5 12.25a.25.25 0 0 1 .25-.25h3.5a.25.25 0 0 1 .25.25v3.25a.25.25 0 0 1-.4.2l-1.45-1.087a.25.25 0 0 0-.3 0L5.4 15.45a.25.25 0 0 1-.4-.2Z"></path>
-            </svg>
-            &nbsp;{issue['repo_name']}
-        </span>
-        <span>{assignee_html}</span>
-        <span class="comments-count">
-            <svg aria-hidden="true" height="16" viewBox="0 0 16 16" width="16" style="fill: currentColor;">
-                <path d="M1 2.75C1 1.784 1.784 1 2.75 1h10.5c.966 0 1.75.784 1.75 1.75v7.5A1.75 1.75 0 0 1 13.25 12H9.06l-2.573 2.573A1.457 1.457 0 0 1 4 13.543V12H2.75A1.75 1.75 0 0 1 1 10.25Zm1.75-.25a.25.25 0 0 0-.25.25v7.5c0 .138.112.25.25.25h2a.75.75 0 0 1 .75.75v2.19l2.72-2.72a.75.75 0 0 1 .53-.22h4.5a.25.25 0 0 0 .25-.25v-7.5a.25.25 0 0 0-.25-.25Z"></path>
-            </svg>
-            &nbsp;{issue['comments_count']}
-        </span>
-    </div>
-    <div class="label-container">
-        {labels_html}
-    </div>
-    <div class="card-footer">
-        <span>📅 First seen: {format_time_ago(issue['first_seen_at'])}</span>
-        <a class="open-btn" href="{issue['github_issue_url']}" target="_blank">Open on GitHub ↗</a>
-    </div>
-</div>
-""")
-                    st.markdown(card_html, unsafe_allow_html=True)
-                with c_action:
-                    st.markdown("<br><br>", unsafe_allow_html=True)
-                    if not issue['seen_at']:
-                        if st.button("👁️ Mark Seen", key=f"seen_{issue['id']}"):
-                            database.mark_issue_seen(issue['id'])
-                            st.rerun()
+        # 5. RENDER ISSUE LIST
+        if not filtered_issues:
+            st.info("No issues found matching your filters. Try hitting Refresh!")
+        else:
+            expanded_issues = st.session_state.setdefault('expanded_issues', set())
+            issue_list([card_payload(issue) for issue in filtered_issues], total=total, expanded=expanded_issues,
+                       css=COMPONENT_CSS, key="issue_list", on_change=on_issue_list_action)
 
-with t2:
-    # --- STATISTICS TAB ---
-    st.header("📊 Issue Statistics")
+            # Full bodies are only decompressed for cards the user expanded
+            titles = {issue.id: issue.title for issue in filtered_issues}
+            for issue_id in sorted(expanded_issues & titles.keys()):
+                body = database.get_issue_body(issue_id)
+                with st.expander(f"📄 {titles[issue_id]}", expanded=True):
+                    if body:
+                        st.markdown(body)
+                    else:
+                        st.caption("Full description not stored yet. Refresh the repository to load it.")
+
+@st.fragment
+def render_statistics():
+    with timed("statistics"):
+        # --- STATISTICS TAB ---
+        st.header("📊 Issue Statistics")
     
-    stats = database.get_issue_stats()
+        stats = database.get_issue_stats()
     
-    # Charts
-    c1, c2 = st.columns(2)
-    with c1:
-        st.subheader("Issues by Category")
-        if stats['by_category']:
-            st.bar_chart(stats['by_category'])
-        else:
-            st.info("No data yet.")
+        # Charts
+        c1, c2 = st.columns(2)
+        with c1:
+            st.subheader("Issues by Category")
+            if stats['by_category']:
+                st.bar_chart(stats['by_category'])
+            else:
+                st.info("No data yet.")
             
-    with c2:
-        st.subheader("Top Active Repositories")
-        if stats['top_repos']:
-            st.bar_chart(stats['top_repos'])
-        else:
-            st.info("No data yet.")
+        with c2:
+            st.subheader("Top Active Repositories")
+            if stats['top_repos']:
+                st.bar_chart(stats['top_repos'])
+            else:
+                st.info("No data yet.")
             
-    st.subheader("Issues Found History (Last 7 Days)")
-    if stats['daily_history']:
-        st.area_chart(stats['daily_history'])
-    else:
-        st.info("No history yet.")
+        st.subheader("Issues Found History (Last 7 Days)")
+        if stats['daily_history']:
+            st.area_chart(stats['daily_history'])
+        else:
+            st.info("No history yet.")
 
-with t3:
-    # --- SETTINGS TAB ---
-    st.header("⚙️ Settings")
+        st.subheader("Open Issue Backlog")
+        h1, h2 = st.columns(2)
+        ranges = {"Last 7 Days": 7, "Last 30 Days": 30, "Last 90 Days": 90, "Last Year": 365, "All Time": None}
+        range_label = h1.selectbox("Range", list(ranges.keys()), key="backlog_range")
+        scopes = {"All Repositories": {}}
+        for c in database.get_categories():
+            scopes[f"Category: {c['name']}"] = {'category_id': c['id']}
+        for r in database.get_repositories(active_only=False):
+            scopes[r['full_name']] = {'repo_id': r['id']}
+        scope_label = h2.selectbox("Scope", list(scopes.keys()), key="backlog_scope")
+
+        days = ranges[range_label]
+        start = datetime.now() - timedelta(days=days) if days else datetime.min
+        resolution, history = database.get_backlog_history(start, **scopes[scope_label])
+        if history:
+            st.line_chart(history, x='time', y=['open', 'good_first', 'unassigned'])
+            st.caption(f"Resolution: {resolution}. Recorded at each refresh; older points are downsampled.")
+        else:
+            st.info("No backlog history yet. It is recorded from the next refresh on.")
+
+@st.fragment
+def render_settings():
+    with timed("settings"):
+        # --- SETTINGS TAB ---
+        st.header("⚙️ Settings")
+        categories = database.get_categories()
     
-    st.subheader("Add New Category")
-    with st.form("add_cat_form"):
-        new_cat_name = st.text_input("Category Name")
-        new_cat_desc = st.text_input("Description (Optional)")
-        if st.form_submit_button("Add Category"):
-            if new_cat_name:
-                success, msg = database.add_category(new_cat_name, new_cat_desc)
-                if success:
-                    st.success(msg)
-                    time.sleep(1)
-                    st.rerun()
+        st.subheader("Add New Category")
+        with st.form("add_cat_form"):
+            new_cat_name = st.text_input("Category Name")
+            new_cat_desc = st.text_input("Description (Optional)")
+            if st.form_submit_button("Add Category"):
+                if new_cat_name:
+                    success, msg = database.add_category(new_cat_name, new_cat_desc)
+                    if success:
+                        st.success(msg)
+                        time.sleep(1)
+                        st.rerun()
+                    else:
+                        st.error(msg)
                 else:
-                    st.error(msg)
-            else:
-                st.error("Name is required")
+                    st.error("Name is required")
 
-    st.markdown("---")
+        st.markdown("---")
     
-    st.subheader("Add New Repository")
-    with st.form("add_repo_form"):
-        col1, col2 = st.columns(2)
-        with col1:
-            new_owner = st.text_input("Owner (e.g. streamlit)")
-        with col2:
-            new_repo = st.text_input("Repository (e.g. streamlit)")
+        st.subheader("Add New Repository")
+        with st.form("add_repo_form"):
+            col1, col2 = st.columns(2)
+            with col1:
+                new_owner = st.text_input("Owner (e.g. streamlit)")
+            with col2:
+                new_repo = st.text_input("Repository (e.g. streamlit)")
             
-        cat_options = {c['name']: c['id'] for c in categories}
-        target_cat = st.selectbox("Assign Category", list(cat_options.keys()))
+            cat_options = {c['name']: c['id'] for c in categories}
+            target_cat = st.selectbox("Assign Category", list(cat_options.keys()))
+            new_labels = st.text_input(
+                "Tracked Labels (Optional)",
+                placeholder="good first issue, help wanted",
+                help="Only fetch issues with one of these labels. Leave empty to track every open issue."
+            )
         
-        submitted = st.form_submit_button("Add Repository")
-        if submitted:
-            if not new_owner or not new_repo:
-                st.error("Please enter owner and repository name.")
-            else:
-                with st.spinner("Validating on GitHub..."):
-                    token = logic.get_github_token()
-                    if logic.validate_repo(new_owner, new_repo, token):
-                        success, pid = database.add_repository(new_owner, new_repo, cat_options[target_cat])
-                        if success:
-                            st.success(f"Added {new_owner}/{new_repo}!")
-                            time.sleep(1)
-                            st.rerun()
+            submitted = st.form_submit_button("Add Repository")
+            if submitted:
+                if not new_owner or not new_repo:
+                    st.error("Please enter owner and repository name.")
+                else:
+                    with st.spinner("Validating on GitHub..."):
+                        token = logic.get_github_token()
+                        meta = logic.get_repo_metadata(new_owner, new_repo, token)
+                        if meta:
+                            if meta['archived']:
+                                st.warning(f"{meta['full_name']} is archived; it will not get new issues.")
+                            # Follow renames so refreshes don't go through a redirect
+                            if meta['full_name'] and meta['full_name'].lower() != f"{new_owner}/{new_repo}".lower():
+                                new_owner, new_repo = meta['full_name'].split("/", 1)
+                            success, pid = database.add_repository(
+                                new_owner, new_repo, cat_options[target_cat],
+                                tracked_labels=logic.parse_labels(new_labels)
+                            )
+                            if success:
+                                st.success(f"Added {new_owner}/{new_repo}!")
+                                time.sleep(1)
+                                st.rerun()
+                            else:
+                                st.error(pid)
                         else:
-                            st.error(pid)
-                    else:
-                        st.error("Repository not found on GitHub or token invalid.")
+                            st.error("Repository not found on GitHub or token invalid.")
 
-    st.markdown("---")
-    st.subheader("Manage Repositories")
+        st.markdown("---")
+        st.subheader("Manage Repositories")
     
-    current_repos = database.get_repositories()
-    for repo in current_repos:
-        c1, c2, c3 = st.columns([4, 2, 1])
-        c1.write(f"**{repo['full_name']}**")
-        c2.caption(f"Last updated: {format_time_ago(repo['last_refreshed_at']) if repo['last_refreshed_at'] else 'Never'}")
-        if c3.button("🗑️", key=f"del_{repo['id']}"):
-            database.delete_repository(repo['id'])
-            st.rerun()
+        # Include deactivated repos so they can be re-enabled here
+        current_repos = database.get_repositories(active_only=False)
+        for repo in current_repos:
+            c1, c2, c3 = st.columns([4, 2, 1])
+            c1.write(f"**{repo['full_name']}**")
+            if repo['tracked_labels']:
+                c1.caption(f"🏷️ Labels: {repo['tracked_labels']}")
+            if repo['webhook_enabled']:
+                c1.caption("⚡ Webhook updates (polled daily for reconciliation)")
+            c2.caption(f"Last updated: {format_time_ago(repo['last_refreshed_at']) if repo['last_refreshed_at'] else 'Never'}")
+            if repo['churn_rate'] is not None and not repo['webhook_enabled']:
+                interval = logic.refresh_interval(repo['churn_rate'])
+                c2.caption(f"📈 {repo['churn_rate']:.1f} changes/h · refreshed every ~{interval.total_seconds() / 3600:.1f}h")
+
+            # Circuit breaker state
+            open_until = logic.breaker_open_until(repo)
+            if not repo['is_active']:
+                c1.error(f"⛔ Deactivated after repeated 404s: {repo['last_error'] or 'not found'}")
+                if c2.button("Reactivate", key=f"reactivate_{repo['id']}"):
+                    database.reset_repository_breaker(repo['id'])
+                    database.set_repository_active(repo['id'], True)
+                    st.rerun()
+            elif open_until:
+                c1.warning(f"🔌 Paused until {open_until:%Y-%m-%d %H:%M} after {repo['failure_count']} failures: {repo['last_error']}")
+                if c2.button("Retry Now", key=f"breaker_reset_{repo['id']}"):
+                    database.reset_repository_breaker(repo['id'])
+                    st.rerun()
+            elif repo['failure_count']:
+                c1.caption(f"⚠️ {repo['failure_count']} recent failure(s): {repo['last_error']}")
+            if c3.button("🗑️", key=f"del_{repo['id']}"):
+                database.delete_repository(repo['id'])
+                get_category_counts.clear()
+                st.rerun()
+
+        st.markdown("---")
+        st.subheader("Label Scope")
+        if current_repos:
+            with st.form("label_scope_form"):
+                scope_options = {r['full_name']: r for r in current_repos}
+                scope_repo_name = st.selectbox("Repository", list(scope_options.keys()))
+                scope_labels = st.text_input(
+                    "Tracked Labels",
+                    placeholder="good first issue, help wanted",
+                    help="Leave empty to track every open issue."
+                )
+                if st.form_submit_button("Save Labels"):
+                    database.update_repository_labels(scope_options[scope_repo_name]['id'], logic.parse_labels(scope_labels))
+                    st.success(f"Updated label scope for {scope_repo_name}.")
+                    time.sleep(1)
+                    st.rerun()
+
+        st.markdown("---")
+        st.subheader("Published Feeds")
+        feeds = database.get_saved_feeds()
+        if not feeds:
+            st.caption("Save the current filters as a feed from the Dashboard. Run feed_server.py to serve them.")
+        for feed in feeds:
+            c1, c2 = st.columns([6, 1])
+            c1.write(f"**{feed['name']}**")
+            c1.caption(" · ".join(f"{FEED_BASE_URL}/feeds/{feed['slug']}.{fmt}" for fmt in ("json", "rss", "atom")))
+            if c2.button("🗑️", key=f"del_feed_{feed['id']}"):
+                database.delete_saved_feed(feed['id'])
+                st.rerun()
+
+# 4. Main App Layout - TABS
+t1, t2, t3 = st.tabs(["🚀 Dashboard", "📊 Statistics", "⚙️ Settings"])
+
+with t1:
+    # --- DASHBOARD TAB ---
+    
+    # HEADERS
+    c1, c2 = st.columns([3, 1])
+    with c1:
+        st.title("🔍 GitHub Issue Tracker")
+        last_update = st.session_state.get('last_refresh', "Never")
+        if isinstance(last_update, datetime):
+            last_update = format_time_ago(last_update)
+        st.caption(f"Last updated: {last_update} · 👤 {st.session_state['user_name']}")
+
+    with c2:
+        if st.button("🔄 Refresh All", type="primary", use_container_width=True,
+                     help="Refreshes every repository that is due, busiest first"):
+            run_refresh_all()
+        if st.button("🔎 Discover Good First", use_container_width=True,
+                     help="Search all tracked repos for good first issues in a few batched queries"):
+            run_discover()
+
+    # Interrupted refreshes (restart, closed tab) can be picked up where they stopped
+    unfinished = database.get_unfinished_refresh_job()
+    if unfinished:
+        finished = unfinished['tasks'].get('done', 0) + unfinished['tasks'].get('failed', 0)
+        j1, j2, j3 = st.columns([4, 1, 1])
+        j1.warning(f"⏸️ Unfinished refresh ({unfinished['scope']}): {finished}/{unfinished['total_tasks']} repositories done.")
+        if j2.button("▶️ Resume", key="resume_refresh", use_container_width=True):
+            run_refresh_all(unfinished)
+        j3.button("⏹️ Cancel", key="cancel_refresh", use_container_width=True,
+                  on_click=database.cancel_refresh_job, args=(unfinished['id'],))
+            
+    st.markdown("---")
+
+    render_category_summary()
+    render_results()
+
+with t2:
+    render_statistics()
+
+with t3:
+    render_settings()
@@ -0,0 +1,218 @@
+"""
+Render-time benchmark: how long dashboard reruns take as the database grows.
+
+    python benchmark_render.py [--sizes 1000 10000 100000 1000000] [--json results.json]
+                               [--baseline previous.json] [--tolerance 0.25]
+
+For each size a synthetic database is populated (kept in --data-dir for reuse) and
+a new process drives app.py headlessly with AppTest through a scripted session.
+Every step reports wall time, SQL statements executed and elements emitted:
+    initial_load     first run of a new session
+    category_filter  pick the first category in the Category filter
+    search           type a search term
+    mark_seen        mark the first listed issue seen, as the issue list's event would, and rerun
+    statistics       change the backlog range on the Statistics tab (tab switches
+                     themselves happen in the browser and don't rerun the script)
+
+With --baseline, any metric more than --tolerance above the baseline is reported
+and the exit status is 1, so the script can gate UI performance regressions.
+--check-plans also fails the run if any issue filter combination lacks an indexed
+query plan (see database.unindexed_issue_plans).
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import database
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+SEARCH_TERM = "memory"
+METRICS = ("wall_ms", "sql_statements", "elements")
+
+_WORDS = ["memory", "leak", "cuda", "tokenizer", "docs", "crash", "export", "onnx",
+          "gradient", "typo", "install", "windows", "flaky", "test", "batch", "attention"]
+_LABELS = ["bug", "good first issue", "help wanted", "documentation", "enhancement", "question"]
+
+def populate(db_path, n_issues, seed=0):
+    """Creates a seeded database with n_issues synthetic open issues spread over its repositories."""
+    database.DB_NAME = db_path
+    database.init_db()
+    database.seed_data()
+
+    rng = random.Random(seed)
+    now = datetime.now()
+    conn = database.get_connection()
+    repo_ids = [r['id'] for r in conn.execute("SELECT id FROM repositories")]
+    batch = []
+    for n in range(n_issues):
+        first_seen = now - timedelta(minutes=rng.randrange(30 * 24 * 60))
+        assignee = f"user{rng.randrange(500)}" if rng.random() < 0.3 else None
+        batch.append((
+            rng.choice(repo_ids), n + 1, f"https://github.com/example/repo/issues/{n + 1}",
+            " ".join(rng.choices(_WORDS, k=6)), 'open', ",".join(rng.sample(_LABELS, rng.randrange(3))),
+            assignee is not None, assignee, rng.randrange(40),
+            first_seen - timedelta(days=rng.randrange(365)), first_seen, first_seen, rng.random(),
+        ))
+        if len(batch) == 50000 or n == n_issues - 1:
+            conn.executemany("""
+                INSERT INTO issues (repository_id, github_issue_id, github_issue_url, title, state, labels,
+                                    is_assigned, assignee_login, comments_count, created_at_github,
+                                    first_seen_at, last_updated_at, score)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, batch)
+            conn.commit()
+            batch = []
+    # The default user has already seen about 30% of issues
+    conn.execute("""
+        INSERT INTO issue_seen (user_id, issue_id, seen_at)
+        SELECT ?, id, first_seen_at FROM issues WHERE id % 10 < 3
+    """, (database.DEFAULT_USER_ID,))
+    database.rebuild_issue_labels(conn.cursor())
+    database.rebuild_issue_search(conn.cursor())
+    conn.commit()
+    conn.close()
+
+    for repo_id in repo_ids:
+        database.record_repo_snapshot(repo_id)
+
+def _count_elements(at):
+    from streamlit.testing.v1.element_tree import Element
+    return sum(1 for block in (at.main, at.sidebar) for node in block if isinstance(node, Element))
+
+def _widget(widgets, label):
+    return next(w for w in widgets if w.label == label)
+
+def _first_listed_issue(at):
+    cards = json.loads(at.get("component_instance")[0].proto.json_args)['cards']
+    return next(card['id'] for card in cards if not card['seen'])
+
+def measure(db_path):
+    """Runs the scripted session against db_path in this process. Returns a list of step dicts."""
+    from streamlit.testing.v1 import AppTest
+
+    database.DB_NAME = db_path
+    statements = [0]
+    connect = database.get_connection
+
+    def counting_connection():
+        conn = connect()
+        conn.set_trace_callback(lambda sql: statements.__setitem__(0, statements[0] + 1))
+        return conn
+
+    database.get_connection = counting_connection
+
+    at = AppTest.from_file(os.path.join(APP_DIR, "app.py"), default_timeout=600)
+
+    def filter_category():
+        box = _widget(at.multiselect, "Category")
+        box.select(box.options[0]).run()
+
+    def mark_seen():
+        database.mark_issues_seen([_first_listed_issue(at)])
+        at.run()
+
+    steps = [
+        ("initial_load", at.run),
+        ("category_filter", filter_category),
+        ("search", lambda: _widget(at.text_input, "Search").input(SEARCH_TERM).run()),
+        ("mark_seen", mark_seen),
+        ("statistics", lambda: at.selectbox(key="backlog_range").select("Last 90 Days").run()),
+    ]
+    results = []
+    for name, step in steps:
+        statements[0] = 0
+        start = time.perf_counter()
+        step()
+        wall = time.perf_counter() - start
+        if at.exception:
+            raise SystemExit(f"{name}: app.py raised: {at.exception[0].value}")
+        results.append({
+            "step": name, "wall_ms": round(wall * 1000, 1),
+            "sql_statements": statements[0], "elements": _count_elements(at),
+        })
+    return results
+
+def _run_size(db_path):
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--measure", db_path],
+        cwd=APP_DIR, capture_output=True, text=True, check=True
+    )
+    # The app prints progress messages; the results are on the last line
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def run_benchmark(sizes, data_dir):
+    """Returns {size: [step dicts]}; databases are created in data_dir if missing."""
+    results = {}
+    for size in sizes:
+        db_path = os.path.join(data_dir, f"bench_{size}.db")
+        if not os.path.exists(db_path):
+            print(f"Populating {size} issues...", file=sys.stderr)
+            populate(db_path, size)
+        results[str(size)] = _run_size(db_path)
+    return results
+
+def find_regressions(results, baseline, tolerance):
+    """Lines describing every metric more than tolerance above the baseline."""
+    regressions = []
+    for size, steps in results.items():
+        previous = {s['step']: s for s in baseline.get(size, [])}
+        for step in steps:
+            old = previous.get(step['step'])
+            if not old:
+                continue
+            for metric in METRICS:
+                if step[metric] > old[metric] * (1 + tolerance):
+                    regressions.append(f"{size} issues, {step['step']}: {metric} {old[metric]} -> {step[metric]}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure dashboard rerun time as data grows")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--data-dir", help="Where synthetic databases are kept between runs (default: a temp dir)")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Results file from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed increase over the baseline (0.25 = 25%%)")
+    parser.add_argument("--check-plans", action="store_true", help="Fail if a filter combination has no indexed plan")
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure)))
+        sys.exit(0)
+
+    failed = False
+    if args.check_plans:
+        with tempfile.TemporaryDirectory() as tmp:
+            populate(os.path.join(tmp, "plans.db"), 1000)
+            for active, problem, plan in database.unindexed_issue_plans():
+                print(f"UNINDEXED {', '.join(active) or 'no filters'} ({problem}): {' / '.join(plan)}")
+                failed = True
+
+    if args.data_dir:
+        os.makedirs(args.data_dir, exist_ok=True)
+        results = run_benchmark(args.sizes, args.data_dir)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            results = run_benchmark(args.sizes, tmp)
+
+    for size, steps in results.items():
+        for step in steps:
+            print(f"{size:>8} {step['step']:<16} {step['wall_ms']:9.1f} ms  "
+                  f"{step['sql_statements']:5} sql  {step['elements']:5} elements")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        failed = failed or bool(regressions)
+    sys.exit(1 if failed else 0)
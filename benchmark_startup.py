@@ -0,0 +1,74 @@
+"""
+Cold-start benchmark: how long a fresh process takes to get the dashboard on screen.
+
+    python benchmark_startup.py [--runs 5]
+
+Each run starts a new interpreter against a throwaway database, so nothing is
+cached between runs. Reported phases:
+    imports       importing the app's own modules (streamlit excluded)
+    init_db       schema setup + seeding on a database that is already current
+    first_render  first full run of app.py in a new session
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+_CHILD = r"""
+import json, sys, time
+db_path = sys.argv[1]
+
+from streamlit.testing.v1 import AppTest
+
+start = time.perf_counter()
+import database, logic, github_client
+imports = time.perf_counter() - start
+
+database.DB_NAME = db_path
+start = time.perf_counter()
+database.init_db()
+database.seed_data()
+init_db = time.perf_counter() - start
+
+start = time.perf_counter()
+at = AppTest.from_file("app.py", default_timeout=60)
+at.run()
+first_render = time.perf_counter() - start
+if at.exception:
+    raise SystemExit(f"app.py raised: {at.exception}")
+
+print(json.dumps({"imports": imports, "init_db": init_db, "first_render": first_render}))
+"""
+
+def _run_once(db_path):
+    result = subprocess.run(
+        [sys.executable, "-c", _CHILD, db_path],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True
+    )
+    # The app prints progress messages; the timings are on the last line
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def run_benchmark(runs=5):
+    """Returns dict of phase -> list of timings in seconds."""
+    timings = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "tracker.db")
+        # Create the schema up front so every run measures an existing database
+        _run_once(db_path)
+        for _ in range(runs):
+            for phase, seconds in _run_once(db_path).items():
+                timings.setdefault(phase, []).append(seconds)
+    return timings
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure dashboard cold-start time")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    for phase, values in run_benchmark(args.runs).items():
+        print(f"{phase:<13} median {statistics.median(values) * 1000:8.1f} ms   "
+              f"min {min(values) * 1000:8.1f} ms")
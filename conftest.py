@@ -0,0 +1,10 @@
+import pytest
+
+import database
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_NAME", str(tmp_path / "tracker.db"))
+    database.init_db()
+    database.seed_data()
+    return database
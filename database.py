@@ -1,25 +1,97 @@
 import sqlite3
 import os
-from datetime import datetime
+import re
+import zlib
+import json
+import hashlib
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from models import Issue
 
 # Database file path
 DB_NAME = "tracker.db"
 
+# Seen state belongs to this user unless the dashboard is opened as someone else
+DEFAULT_USER = "default"
+DEFAULT_USER_ID = 1
+
+def _decompress_body(blob):
+    """Inflates a stored issue body."""
+    return zlib.decompress(blob).decode("utf-8") if blob else None
+
 def get_connection():
     """Returns a connection to the SQLite database."""
     conn = sqlite3.connect(DB_NAME)
     conn.row_factory = sqlite3.Row  # Access columns by name
     return conn
 
-def init_db():
-    """Initializes the database with the required tables."""
-    conn = get_connection()
-    cursor = conn.cursor()
+_read_lock = threading.Lock()
+_read_conn = None
+_read_db_name = None
+
+@contextmanager
+def _read_connection():
+    """
+    One process-wide connection kept open for the issue list queries, held under
+    a lock for the duration of a query. Streamlit reruns and ThreadingHTTPServer
+    requests arrive on fresh threads, so a per-thread connection would be rebuilt
+    (and leaked) on every call. sqlite3 caches prepared statements per connection,
+    so reusing it lets repeated filter shapes skip re-parsing. Reads only: it is
+    never left inside a transaction.
+    """
+    global _read_conn, _read_db_name
+    with _read_lock:
+        if _read_db_name != DB_NAME:
+            if _read_conn is not None:
+                _read_conn.close()
+            _read_conn = sqlite3.connect(DB_NAME, check_same_thread=False)
+            _read_db_name = DB_NAME
+        yield _read_conn
+
+# --- NEW: Versioned schema migrations ---
+# Each migration runs once per database, in order, and is recorded in schema_version.
+# Steps are idempotent so databases created by the older unversioned init_db (which
+# already have some of these columns) upgrade cleanly. Append new migrations; never
+# edit or reorder applied ones.
+
+def _add_column(cursor, table, column, decl):
+    """ALTER TABLE ... ADD COLUMN, skipped if the column already exists."""
+    existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+    if column not in existing:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+def _drop_column(cursor, table, column):
+    """
+    ALTER TABLE ... DROP COLUMN, which needs SQLite 3.35+. Older builds get the
+    documented rebuild instead: the table is recreated without the column, its
+    rows copied over and its indexes recreated. Only for columns added by
+    _add_column (SQLite splices those into the stored CREATE as ", name decl")
+    with no index or constraint of their own.
+    """
+    if sqlite3.sqlite_version_info >= (3, 35, 0):
+        cursor.execute(f"ALTER TABLE {table} DROP COLUMN {column}")
+        return
+    create = cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+                            (table,)).fetchone()[0]
+    create = re.sub(rf",\s*{column}\s[^,)]*", "", create, count=1)
+    columns = ", ".join(row[1] for row in cursor.execute(f"PRAGMA table_info({table})") if row[1] != column)
+    indexes = [row[0] for row in cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,))]
+    sequence = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
 
-    # Enable foreign key support
-    cursor.execute("PRAGMA foreign_keys = ON;")
+    # Other tables' foreign keys name `table`, so they follow the rename (foreign
+    # key enforcement is off while migrating, as SQLite's procedure requires)
+    cursor.execute(re.sub(rf"^CREATE TABLE \"?{table}\"?", f"CREATE TABLE {table}_rebuild", create))
+    cursor.execute(f"INSERT INTO {table}_rebuild ({columns}) SELECT {columns} FROM {table}")
+    cursor.execute(f"DROP TABLE {table}")
+    cursor.execute(f"ALTER TABLE {table}_rebuild RENAME TO {table}")
+    if sequence:
+        cursor.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = ?", (sequence[0], table))
+    for sql in indexes:
+        cursor.execute(sql)
 
-    # Table 1: Categories
+def _migrate_base_tables(cursor):
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS categories (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -29,7 +101,6 @@ def init_db():
     );
     """)
 
-    # Table 2: Repositories
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS repositories (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -45,7 +116,6 @@ def init_db():
     );
     """)
 
-    # Table 3: Issues
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS issues (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -62,27 +132,365 @@ def init_db():
         first_seen_at TIMESTAMP,
         last_updated_at TIMESTAMP,
         body_preview TEXT,
-        seen_at TIMESTAMP,
         FOREIGN KEY (repository_id) REFERENCES repositories (id)
     );
     """)
 
-    # --- Migration: Add seen_at to existing DB if missing ---
+def _migrate_seen_at(cursor):
+    _add_column(cursor, "issues", "seen_at", "TIMESTAMP")
+
+def _migrate_tracked_labels(cursor):
+    # Comma-separated; NULL means track every open issue
+    _add_column(cursor, "repositories", "tracked_labels", "TEXT")
+
+def _migrate_issue_bodies(cursor):
+    # Full issue bodies, zlib-compressed and kept out of the hot issues table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS issue_bodies (
+        issue_id INTEGER PRIMARY KEY,
+        body_hash TEXT NOT NULL,
+        body BLOB,
+        FOREIGN KEY (issue_id) REFERENCES issues (id)
+    );
+    """)
+
+def _migrate_webhooks(cursor):
+    # webhook_enabled is set once GitHub delivers a webhook for the repo
+    _add_column(cursor, "repositories", "webhook_enabled", "BOOLEAN DEFAULT 0")
+    _add_column(cursor, "repositories", "last_webhook_at", "TIMESTAMP")
+
+def _migrate_content_hash(cursor):
+    # Fingerprint of tracked fields, see issue_content_hash
+    _add_column(cursor, "issues", "content_hash", "TEXT")
+    # Bulk hash comparison looks issues up by (repository_id, github_issue_id)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_issues_repo_github_id
+        ON issues (repository_id, github_issue_id)
+    """)
+
+def _migrate_score(cursor):
+    # "Best to pick up" ranking, maintained by scoring.py
+    _add_column(cursor, "issues", "score", "REAL")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_issues_score ON issues (score)")
+
+def _migrate_duplicates(cursor):
+    # Lowest issue id of its near-duplicate cluster, maintained by dedup.py
+    _add_column(cursor, "issues", "duplicate_of", "INTEGER")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_issues_duplicate_of ON issues (duplicate_of)")
+
+    # MinHash signatures and LSH band buckets for duplicate detection
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS issue_minhash (
+        issue_id INTEGER PRIMARY KEY,
+        signature BLOB NOT NULL,
+        FOREIGN KEY (issue_id) REFERENCES issues (id)
+    );
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS issue_lsh (
+        band INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,
+        issue_id INTEGER NOT NULL,
+        PRIMARY KEY (band, bucket, issue_id)
+    ) WITHOUT ROWID;
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_issue_lsh_issue ON issue_lsh (issue_id)")
+
+def _migrate_change_indexes(cursor):
+    # Incremental consumers (read model, post-sync scoring) scan by write/seen time
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_issues_last_updated ON issues (last_updated_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_issues_seen_at ON issues (seen_at)")
+
+def _migrate_refresh_jobs(cursor):
+    # Persistent refresh runs: one job row, one task row per repository
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS refresh_jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        scope TEXT NOT NULL,  -- 'all' or 'category:<id>'
+        status TEXT NOT NULL DEFAULT 'running',  -- running, completed, cancelled
+        created_at TIMESTAMP,
+        finished_at TIMESTAMP
+    );
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS refresh_tasks (
+        job_id INTEGER NOT NULL,
+        repository_id INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',  -- pending, running, done, failed, cancelled
+        attempts INTEGER DEFAULT 0,
+        error TEXT,
+        new_count INTEGER DEFAULT 0,
+        updated_count INTEGER DEFAULT 0,
+        unchanged_count INTEGER DEFAULT 0,
+        started_at TIMESTAMP,
+        finished_at TIMESTAMP,
+        PRIMARY KEY (job_id, repository_id),
+        FOREIGN KEY (job_id) REFERENCES refresh_jobs (id)
+    );
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_refresh_jobs_status ON refresh_jobs (status, scope)")
+
+def _migrate_circuit_breaker(cursor):
+    # Consecutive refresh failures; the breaker skips the repo until breaker_open_until
+    _add_column(cursor, "repositories", "failure_count", "INTEGER DEFAULT 0")
+    _add_column(cursor, "repositories", "not_found_count", "INTEGER DEFAULT 0")
+    _add_column(cursor, "repositories", "breaker_open_until", "TIMESTAMP")
+    _add_column(cursor, "repositories", "last_error", "TEXT")
+
+def _migrate_refresh_cadence(cursor):
+    # EWMA of new+changed issues per hour, and when the repo is next due for a refresh
+    _add_column(cursor, "repositories", "churn_rate", "REAL")
+    _add_column(cursor, "repositories", "next_refresh_due_at", "TIMESTAMP")
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS repo_churn (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        repository_id INTEGER NOT NULL,
+        refreshed_at TIMESTAMP NOT NULL,
+        new_count INTEGER NOT NULL,
+        updated_count INTEGER NOT NULL,
+        elapsed_hours REAL,  -- Since the previous refresh; NULL for the first one
+        FOREIGN KEY (repository_id) REFERENCES repositories (id)
+    );
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_repo_churn_repo ON repo_churn (repository_id, refreshed_at)")
+
+def _migrate_backlog_history(cursor):
+    # Per-repo open/good-first/unassigned counts over time; resolution is 'raw', 'hour' or 'day'
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS repo_snapshots (
+        repository_id INTEGER NOT NULL,
+        resolution TEXT NOT NULL,
+        bucket_at TIMESTAMP NOT NULL,
+        open_count INTEGER NOT NULL,
+        good_first_count INTEGER NOT NULL,
+        unassigned_count INTEGER NOT NULL,
+        PRIMARY KEY (repository_id, resolution, bucket_at)
+    ) WITHOUT ROWID;
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_repo_snapshots_age ON repo_snapshots (resolution, bucket_at)")
+
+def _migrate_per_user_seen(cursor):
+    # Seen state per user; (user_id, issue_id) is the primary key, so unseen filters
+    # are one index probe per issue whatever the number of users
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """)
+    cursor.execute("INSERT OR IGNORE INTO users (id, name) VALUES (?, ?)", (DEFAULT_USER_ID, DEFAULT_USER))
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS issue_seen (
+        user_id INTEGER NOT NULL,
+        issue_id INTEGER NOT NULL,
+        seen_at TIMESTAMP NOT NULL,
+        PRIMARY KEY (user_id, issue_id)
+    ) WITHOUT ROWID;
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_issue_seen_time ON issue_seen (user_id, seen_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_issue_seen_issue ON issue_seen (issue_id)")
+
+    # The old global seen state becomes the default user's
+    if "seen_at" in {row[1] for row in cursor.execute("PRAGMA table_info(issues)")}:
+        cursor.execute("""
+            INSERT OR IGNORE INTO issue_seen (user_id, issue_id, seen_at)
+            SELECT ?, id, seen_at FROM issues WHERE seen_at IS NOT NULL
+        """, (DEFAULT_USER_ID,))
+        cursor.execute("DROP INDEX IF EXISTS idx_issues_seen_at")
+        _drop_column(cursor, "issues", "seen_at")
+
+def _migrate_open_issue_indexes(cursor):
+    # Every issue query filters on state = 'open' and orders by created or score;
+    # these give each filter combination an indexed, pre-sorted path to the rows
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_issues_open_created ON issues (state, created_at_github)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_issues_open_score ON issues (state, score)")
+
+def _migrate_saved_feeds(cursor):
+    # Named filter sets published as JSON Feed/RSS/Atom by feed_server.py
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS saved_feeds (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        slug TEXT NOT NULL UNIQUE,
+        name TEXT NOT NULL,
+        filters TEXT NOT NULL,  -- JSON, same keys as get_issues filters
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """)
+
+_CHANGE_LOG_TABLE = """
+    CREATE TABLE IF NOT EXISTS issue_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        issue_id INTEGER,       -- NULL for a marker covering a whole pass (see log_change_marker)
+        repository_id INTEGER,
+        kind TEXT NOT NULL,     -- see CHANGE_KINDS
+        user_id INTEGER,        -- set for seen/unseen, NULL for changes to the issue itself
+        changed_at TIMESTAMP NOT NULL
+    );
+"""
+
+def _migrate_change_log(cursor):
+    # Append-only log of issue changes for incremental consumers. AUTOINCREMENT keeps
+    # seq monotonic even after compaction deletes the newest rows
+    cursor.execute(_CHANGE_LOG_TABLE)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_issue_changes_stream ON issue_changes (issue_id, user_id, seq)")
+    # Highest seq removed by age-based compaction; consumers behind it must rescan
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS issue_changes_floor (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        seq INTEGER NOT NULL
+    );
+    """)
+    cursor.execute("INSERT OR IGNORE INTO issue_changes_floor (id, seq) VALUES (1, 0)")
+
+def _migrate_selective_filter_indexes(cursor):
+    # Repository, category, assignee and label filters pick a few issues out of the
+    # open set; these let each of them drive the query instead of a walk over every
+    # open issue (see SELECTIVE_FILTERS)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_issues_repo_open ON issues (repository_id, state, created_at_github)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_issues_assignee_open ON issues (assignee_login COLLATE NOCASE, state)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_repositories_category ON repositories (category_id)")
+    # One row per (lower-cased label, issue), kept in step with issues.labels
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS issue_labels (
+        label TEXT NOT NULL,
+        issue_id INTEGER NOT NULL,
+        PRIMARY KEY (label, issue_id)
+    ) WITHOUT ROWID;
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_issue_labels_issue ON issue_labels (issue_id)")
+    rebuild_issue_labels(cursor)
+
+def _migrate_change_log_markers(cursor):
+    # Pass-wide markers name no issue; SQLite can't drop NOT NULL in place, so the
+    # table is copied, carrying over its sequence so seq stays monotonic
+    columns = {col[1]: col[3] for col in cursor.execute("PRAGMA table_info(issue_changes)")}
+    if not columns.get('issue_id'):
+        return
+    row = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'issue_changes'").fetchone()
+    cursor.execute("DROP INDEX IF EXISTS idx_issue_changes_stream")
+    cursor.execute("ALTER TABLE issue_changes RENAME TO issue_changes_old")
+    cursor.execute(_CHANGE_LOG_TABLE)
+    cursor.execute("INSERT INTO issue_changes SELECT * FROM issue_changes_old")
+    cursor.execute("DROP TABLE issue_changes_old")
+    if row:
+        cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'issue_changes'")
+        cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('issue_changes', ?)", (row[0],))
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_issue_changes_stream ON issue_changes (issue_id, user_id, seq)")
+
+def _migrate_issue_search(cursor):
+    # Uncompressed title + body, one row per issue (rowid = issue id), so search reads
+    # an index instead of inflating every stored body. The trigram tokenizer (SQLite
+    # 3.34+) answers LIKE '%text%' from its index; older builds get a plain table
     try:
-        cursor.execute("SELECT seen_at FROM issues LIMIT 1")
+        cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS issue_search USING fts5(text, tokenize = 'trigram')")
     except sqlite3.OperationalError:
-        print("Migrating: Adding 'seen_at' column to issues table...")
-        cursor.execute("ALTER TABLE issues ADD COLUMN seen_at TIMESTAMP")
+        cursor.execute("CREATE TABLE IF NOT EXISTS issue_search (rowid INTEGER PRIMARY KEY, text TEXT)")
+    rebuild_issue_search(cursor)
+
+def _migrate_seen_batches(cursor):
+    # One row per bulk seen mark; its id is the undo token, so two marks in the same
+    # clock tick stay separately undoable. AUTOINCREMENT never hands an id out twice
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS seen_batches (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """)
+    _add_column(cursor, "issue_seen", "batch_id", "INTEGER")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_issue_seen_batch ON issue_seen (user_id, batch_id)")
+
+MIGRATIONS = [
+    (1, "base tables", _migrate_base_tables),
+    (2, "issues.seen_at", _migrate_seen_at),
+    (3, "repositories.tracked_labels", _migrate_tracked_labels),
+    (4, "issue_bodies table", _migrate_issue_bodies),
+    (5, "webhook columns", _migrate_webhooks),
+    (6, "issues.content_hash", _migrate_content_hash),
+    (7, "issues.score", _migrate_score),
+    (8, "duplicate detection tables", _migrate_duplicates),
+    (9, "change-tracking indexes", _migrate_change_indexes),
+    (10, "refresh jobs", _migrate_refresh_jobs),
+    (11, "repository circuit breaker", _migrate_circuit_breaker),
+    (12, "adaptive refresh cadence", _migrate_refresh_cadence),
+    (13, "backlog history", _migrate_backlog_history),
+    (14, "per-user seen state", _migrate_per_user_seen),
+    (15, "open issue indexes", _migrate_open_issue_indexes),
+    (16, "saved feeds", _migrate_saved_feeds),
+    (17, "issue change log", _migrate_change_log),
+    (18, "selective filter indexes", _migrate_selective_filter_indexes),
+    (19, "change log markers", _migrate_change_log_markers),
+    (20, "issue search index", _migrate_issue_search),
+    (21, "seen batches", _migrate_seen_batches),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# Database paths already migrated by this process; Streamlit calls init_db per session
+_initialized = set()
+
+def init_db():
+    """Brings the database schema up to date. Cheap after the first call in a process."""
+    db_key = os.path.abspath(DB_NAME)
+    if db_key in _initialized:
+        return
+
+    conn = get_connection()
+    conn.isolation_level = None  # Explicit transactions below
+    cursor = conn.cursor()
+
+    # Foreign keys stay unenforced while migrating (as on every other connection):
+    # a table rebuild (_drop_column) drops and replaces tables others reference
+    cursor.execute("PRAGMA foreign_keys = OFF")
+    # WAL is stored in the file: readers (a snapshot export, the dashboard) keep their
+    # snapshot while a refresh commits, instead of locking each other out
+    cursor.execute("PRAGMA journal_mode = WAL")
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """)
+
+    current = cursor.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0
+    applied = 0
+    for version, description, migrate in MIGRATIONS:
+        if version <= current:
+            continue
+        # IMMEDIATE takes the write lock first, so a second process (e.g. the
+        # webhook server) waits and then sees the migration as already applied
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            if cursor.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,)).fetchone():
+                cursor.execute("COMMIT")
+                continue
+            if current:
+                print(f"Migrating: {description} (schema version {version})...")
+            migrate(cursor)
+            cursor.execute("INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                           (version, description))
+            cursor.execute("COMMIT")
+            applied += 1
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
 
-    conn.commit()
     conn.close()
-    print(f"Database {DB_NAME} initialized/updated successfully.")
+    _initialized.add(db_key)
+    if applied:
+        print(f"Database {DB_NAME} migrated to schema version {SCHEMA_VERSION} ({applied} migrations applied).")
 
 # ... [seed_data function remains unchanged] ...
 
 # --- NEW: Repo Management ---
 
-def add_repository(owner, repo, category_id):
+def add_repository(owner, repo, category_id, tracked_labels=None):
+    """
+    tracked_labels: optional list of labels. When set, refreshes only fetch issues
+    carrying one of these labels instead of every open issue.
+    """
     conn = get_connection()
     full_name = f"{owner}/{repo}"
     
@@ -93,28 +501,47 @@ def add_repository(owner, repo, category_id):
         return False, "Repository already exists."
         
     conn.execute("""
-        INSERT INTO repositories (github_owner, github_repo, full_name, category_id)
-        VALUES (?, ?, ?, ?)
-    """, (owner, repo, full_name, category_id))
+        INSERT INTO repositories (github_owner, github_repo, full_name, category_id, tracked_labels)
+        VALUES (?, ?, ?, ?, ?)
+    """, (owner, repo, full_name, category_id, ",".join(tracked_labels) if tracked_labels else None))
     conn.commit()
     conn.close()
     return True, "Repository added successfully."
 
+def update_repository_labels(repo_id, tracked_labels):
+    """Sets the label scope for a repository. An empty list goes back to tracking everything."""
+    conn = get_connection()
+    conn.execute("UPDATE repositories SET tracked_labels = ? WHERE id = ?",
+                 (",".join(tracked_labels) if tracked_labels else None, repo_id))
+    conn.commit()
+    conn.close()
+
+# Tables keyed by issue_id that must be cleaned up with their issue
+ISSUE_SIDE_TABLES = ("issue_bodies", "issue_minhash", "issue_lsh", "issue_seen", "issue_labels")
+
+def _delete_issue_side_rows(conn, id_query, params):
+    """Deletes side-table rows for the issues selected by id_query."""
+    for table in ISSUE_SIDE_TABLES:
+        conn.execute(f"DELETE FROM {table} WHERE issue_id IN ({id_query})", params)
+    conn.execute(f"DELETE FROM issue_search WHERE rowid IN ({id_query})", params)
+
 def delete_repository(repo_id):
     conn = get_connection()
-    # Cascade delete issues first
+    _log_changes(conn, 'deleted', "SELECT id FROM issues WHERE repository_id = ?", (repo_id,))
+    # Cascade delete per-issue side tables and issues first
+    _delete_issue_side_rows(conn, "SELECT id FROM issues WHERE repository_id = ?", (repo_id,))
     conn.execute("DELETE FROM issues WHERE repository_id = ?", (repo_id,))
+    conn.execute("DELETE FROM refresh_tasks WHERE repository_id = ?", (repo_id,))
+    conn.execute("DELETE FROM repo_churn WHERE repository_id = ?", (repo_id,))
+    conn.execute("DELETE FROM repo_snapshots WHERE repository_id = ?", (repo_id,))
     conn.execute("DELETE FROM repositories WHERE id = ?", (repo_id,))
     conn.commit()
     conn.close()
 
 # --- NEW: Notification History ---
 
-def mark_issue_seen(issue_id):
-    conn = get_connection()
-    conn.execute("UPDATE issues SET seen_at = ? WHERE id = ?", (datetime.now(), issue_id))
-    conn.commit()
-    conn.close()
+def mark_issue_seen(issue_id, user_id=None):
+    mark_issues_seen([issue_id], user_id)
 
 # --- NEW: Statistics ---
 
@@ -132,6 +559,7 @@ def get_issue_stats():
         FROM issues i
         JOIN repositories r ON i.repository_id = r.id
         JOIN categories c ON r.category_id = c.id
+        WHERE i.state = 'open'
         GROUP BY c.name
     """).fetchall()
     stats['by_category'] = {row['name']: row['count'] for row in by_cat}
@@ -141,6 +569,7 @@ def get_issue_stats():
         SELECT r.full_name, COUNT(i.id) as count
         FROM issues i
         JOIN repositories r ON i.repository_id = r.id
+        WHERE i.state = 'open'
         GROUP BY r.full_name
         ORDER BY count DESC
         LIMIT 10
@@ -171,64 +600,6 @@ def get_issue_stats():
 # --- Data Access Methods (Modified) ---
 # ... [get_categories, get_repositories, get_repository, update_repo_timestamp, upsert_issue remain unchanged] ...
 
-def get_issues(filters=None):
-    """
-    Fetch issues based on filters.
-    filters: dict with keys: category_id, repo_id, search, only_new, only_good_first, unassigned_only, unseen_only
-    """
-    filters = filters or {}
-    conn = get_connection()
-    
-    # Base query with Join to get repo name and category name helper
-    query = """
-        SELECT i.*, r.full_name as repo_name, c.name as category_name
-        FROM issues i
-        JOIN repositories r ON i.repository_id = r.id
-        JOIN categories c ON r.category_id = c.id
-        WHERE 1=1
-    """
-    params = []
-    
-    # Apply Filters
-    if filters.get('unseen_only'):
-        query += " AND i.seen_at IS NULL"
-        
-    if filters.get('category_id'):
-# ... [rest can be kept via context or I need to include it if replace_file_content requires contiguous context blocks]
-# Since I need to modify get_issues to add 'unseen_only', I will output the start of get_issues and let the tool replace just the start if possible, or I have to replace the whole block.
-# replace_file_content requires contiguous replacement. Let's include the whole function to be safe and clean.
-        query += " AND r.category_id = ?"
-        params.append(filters['category_id'])
-        
-    if filters.get('repo_id'):
-        query += " AND i.repository_id = ?"
-        params.append(filters['repo_id'])
-        
-    if filters.get('only_good_first'):
-        keywords = ['good first issue', 'good-first-issue', 'beginner', 'help wanted']
-        query += " AND (" + " OR ".join(["i.labels LIKE ?" for _ in keywords]) + ")"
-        for k in keywords:
-            params.append(f"%{k}%")
-            
-    if filters.get('unassigned_only'):
-        query += " AND i.is_assigned = 0"
-        
-    # 'only_new' logic is currently post-processed in app.py but we can look at timestamps here too if needed.
-    # Leaving as is for consistency with previous step.
-        
-    if filters.get('search'):
-        term = f"%{filters['search']}%"
-        query += " AND (i.title LIKE ? OR i.body_preview LIKE ?)"
-        params.extend([term, term])
-        
-    query += " ORDER BY i.created_at_github DESC"
-    
-    rows = conn.execute(query, params).fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
-
-    return [dict(row) for row in rows]
-
 def add_category(name, description=""):
     conn = get_connection()
     exists = conn.execute("SELECT id FROM categories WHERE name = ?", (name,)).fetchone()
@@ -253,48 +624,7 @@ def seed_data():
         return
 
     print("Seeding initial data...")
-    # ... [Implementation of seeding logic as before]
-    # Re-implementing simplified seeding for restoration
-    categories = [
-        ("Machine Learning", "ML frameworks and tools"),
-        ("Computer Vision", "Image and video processing"),
-        ("NLP", "Natural language processing"),
-        ("LLM", "Large Language Models")
-    ]
-    cursor.executemany("INSERT INTO categories (name, description) VALUES (?, ?)", categories)
-    
-    cursor.execute("SELECT id, name FROM categories")
-    cat_map = {row['name']: row['id'] for row in cursor.fetchall()}
-    
-    repos = [
-        ("huggingface", "transformers", cat_map["Machine Learning"]),
-        ("pytorch", "pytorch", cat_map["Machine Learning"]),
-        ("scikit-learn", "scikit-learn", cat_map["Machine Learning"]),
-        ("openai", "CLIP", cat_map["Computer Vision"]),
-        ("ultralytics", "ultralytics", cat_map["Computer Vision"]),
-        ("explosion", "spaCy", cat_map["NLP"]),
-        ("langchain-ai", "langchain", cat_map["LLM"]),
-    ]
-    
-    for owner, repo, cat_id in repos:
-        full_name = f"{owner}/{repo}"
-        cursor.execute("""
-            INSERT INTO repositories (github_owner, github_repo, full_name, category_id)
-            VALUES (?, ?, ?, ?)
-        """, (owner, repo, full_name, cat_id))
-        
-    conn.commit()
-    conn.close()
-    print("Seeding complete.")
-    
-    # Check if categories exist
-    cursor.execute("SELECT count(*) FROM categories")
-    if cursor.fetchone()[0] > 0:
-        conn.close()
-        return
 
-    print("Seeding initial data...")
-    
     # Insert Categories
     categories = [
         ("Machine Learning", "ML frameworks and tools"),
@@ -360,122 +690,1011 @@ def get_repository(repo_id):
     conn.close()
     return dict(repo) if repo else None
 
+def get_repository_by_full_name(full_name):
+    """Looks up a tracked repository by 'owner/repo' (case-insensitive)."""
+    conn = get_connection()
+    repo = conn.execute(
+        "SELECT * FROM repositories WHERE full_name = ? COLLATE NOCASE", (full_name,)
+    ).fetchone()
+    conn.close()
+    return dict(repo) if repo else None
+
+def mark_webhook_received(repo_id):
+    """Flags a repository as webhook-enabled so polling drops to reconciliation sweeps."""
+    conn = get_connection()
+    conn.execute("""
+        UPDATE repositories SET webhook_enabled = 1, last_webhook_at = ? WHERE id = ?
+    """, (datetime.now(), repo_id))
+    conn.commit()
+    conn.close()
+
+def request_reconciliation(repo_id):
+    """Makes the next refresh run treat this repository as never refreshed."""
+    conn = get_connection()
+    conn.execute("UPDATE repositories SET last_refreshed_at = NULL WHERE id = ?", (repo_id,))
+    conn.commit()
+    conn.close()
+
+def delete_issues(repo_id, github_issue_ids, conn=None):
+    """Removes issues (e.g. deleted on GitHub) by their GitHub issue number."""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    ids = json.dumps(list(github_issue_ids))
+    id_query = """
+        SELECT id FROM issues
+        WHERE repository_id = ? AND github_issue_id IN (SELECT value FROM json_each(?))
+    """
+    _log_changes(conn, 'deleted', id_query, (repo_id, ids))
+    _delete_issue_side_rows(conn, id_query, (repo_id, ids))
+    conn.execute("""
+        DELETE FROM issues
+        WHERE repository_id = ? AND github_issue_id IN (SELECT value FROM json_each(?))
+    """, (repo_id, ids))
+    conn.commit()
+    if own_conn:
+        conn.close()
+
 def update_repo_timestamp(repo_id, total_issues):
+    """Records a successful refresh, which also closes the repo's circuit breaker."""
     conn = get_connection()
     conn.execute("""
         UPDATE repositories 
-        SET last_refreshed_at = ?, total_open_issues = ? 
+        SET last_refreshed_at = ?, total_open_issues = ?,
+            failure_count = 0, not_found_count = 0, breaker_open_until = NULL, last_error = NULL
         WHERE id = ?
     """, (datetime.now(), total_issues, repo_id))
     conn.commit()
     conn.close()
 
-def upsert_issue(repo_id, issue_data):
+# --- NEW: Refresh Cadence ---
+
+def record_repo_churn(repo_id, new_count, updated_count, elapsed_hours, churn_rate, next_due):
+    """Logs one refresh's churn and stores the repo's updated rate and next due time."""
+    conn = get_connection()
+    now = datetime.now()
+    conn.execute("""
+        INSERT INTO repo_churn (repository_id, refreshed_at, new_count, updated_count, elapsed_hours)
+        VALUES (?, ?, ?, ?, ?)
+    """, (repo_id, now, new_count, updated_count, elapsed_hours))
+    conn.execute("""
+        UPDATE repositories SET churn_rate = ?, next_refresh_due_at = ? WHERE id = ?
+    """, (churn_rate, next_due, repo_id))
+    conn.commit()
+    conn.close()
+
+# --- NEW: Backlog History ---
+# Append-only per-repo snapshots written at each sync. Old rows are rolled up in
+# place (last value per bucket): raw for SNAPSHOT_RAW_DAYS, hourly until
+# SNAPSHOT_HOURLY_DAYS, daily after that, so years of history stay small.
+
+SNAPSHOT_RAW_DAYS = 7
+SNAPSHOT_HOURLY_DAYS = 90
+SNAPSHOT_BUCKETS = {'hour': '%Y-%m-%d %H:00:00', 'day': '%Y-%m-%d 00:00:00'}
+SNAPSHOT_RESOLUTIONS = ('raw', 'hour', 'day')
+
+def record_repo_snapshot(repo_id, conn=None):
     """
-    Inserts a new issue or updates an existing one.
-    Returns: 'new' if inserted, 'updated' if updated.
+    Appends the repo's current counts (skipped when unchanged since its last raw
+    snapshot) and rolls up rows that have aged out of their resolution.
+    Pass an open connection to reuse it (it is committed, not closed).
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    good_first = " OR ".join("labels LIKE ?" for _ in GOOD_FIRST_KEYWORDS)
+    counts = tuple(conn.execute(f"""
+        SELECT COUNT(*), COALESCE(SUM({good_first}), 0), COALESCE(SUM(is_assigned = 0), 0)
+        FROM issues WHERE repository_id = ? AND state = 'open'
+    """, [f"%{k}%" for k in GOOD_FIRST_KEYWORDS] + [repo_id]).fetchone())
+
+    last = conn.execute("""
+        SELECT open_count, good_first_count, unassigned_count FROM repo_snapshots
+        WHERE repository_id = ? AND resolution = 'raw' ORDER BY bucket_at DESC LIMIT 1
+    """, (repo_id,)).fetchone()
+    if last is None or tuple(last) != counts:
+        conn.execute("""
+            INSERT OR REPLACE INTO repo_snapshots
+                (repository_id, resolution, bucket_at, open_count, good_first_count, unassigned_count)
+            VALUES (?, 'raw', ?, ?, ?, ?)
+        """, (repo_id, datetime.now(), *counts))
+
+    downsample_snapshots(conn)
+    conn.commit()
+    if own_conn:
+        conn.close()
+
+def downsample_snapshots(conn, now=None):
+    """Rolls raw rows older than SNAPSHOT_RAW_DAYS into hours and hourly rows older than SNAPSHOT_HOURLY_DAYS into days."""
+    now = now or datetime.now()
+    steps = [
+        ('raw', 'hour', now - timedelta(days=SNAPSHOT_RAW_DAYS)),
+        ('hour', 'day', now - timedelta(days=SNAPSHOT_HOURLY_DAYS)),
+    ]
+    for source, target, cutoff in steps:
+        # Aligned to the target bucket, so a bucket is never split across two rollups
+        cutoff = cutoff.strftime(SNAPSHOT_BUCKETS[target])
+        if not conn.execute("SELECT 1 FROM repo_snapshots WHERE resolution = ? AND bucket_at < ? LIMIT 1",
+                            (source, cutoff)).fetchone():
+            continue
+        # Bare columns in a MAX() aggregate come from the latest row of each bucket
+        conn.execute("""
+            INSERT OR REPLACE INTO repo_snapshots
+                (repository_id, resolution, bucket_at, open_count, good_first_count, unassigned_count)
+            SELECT repository_id, ?, bucket, open_count, good_first_count, unassigned_count FROM (
+                SELECT repository_id, strftime(?, bucket_at) AS bucket,
+                       open_count, good_first_count, unassigned_count, MAX(bucket_at)
+                FROM repo_snapshots WHERE resolution = ? AND bucket_at < ?
+                GROUP BY repository_id, bucket
+            )
+        """, (target, SNAPSHOT_BUCKETS[target], source, cutoff))
+        conn.execute("DELETE FROM repo_snapshots WHERE resolution = ? AND bucket_at < ?", (source, cutoff))
+
+def get_backlog_history(start, end=None, repo_id=None, category_id=None):
+    """
+    Open, good-first and unassigned counts over [start, end), summed over one repo,
+    one category or every repository. The resolution follows the span (raw up to
+    SNAPSHOT_RAW_DAYS, hourly up to SNAPSHOT_HOURLY_DAYS, else daily), so long
+    ranges only read coarse rows.
+    Returns (resolution, [{time, open, good_first, unassigned}, ...]).
     """
+    end = end or datetime.now()
+    span = end - start
+    if span <= timedelta(days=SNAPSHOT_RAW_DAYS):
+        resolution = 'raw'
+    elif span <= timedelta(days=SNAPSHOT_HOURLY_DAYS):
+        resolution = 'hour'
+    else:
+        resolution = 'day'
+    bucket = "bucket_at" if resolution == 'raw' else f"strftime('{SNAPSHOT_BUCKETS[resolution]}', bucket_at)"
+
+    conn = get_connection()
+    if repo_id:
+        repo_ids = [repo_id]
+    elif category_id:
+        repo_ids = [r['id'] for r in conn.execute("SELECT id FROM repositories WHERE category_id = ?", (category_id,))]
+    else:
+        repo_ids = [r['id'] for r in conn.execute("SELECT id FROM repositories")]
+
+    # Repos only get a row when their counts change, so each series starts from
+    # its last value before the range and is carried forward between rows
+    current = {}
+    for rid in repo_ids:
+        latest = None
+        for tier in SNAPSHOT_RESOLUTIONS:
+            row = conn.execute("""
+                SELECT bucket_at, open_count, good_first_count, unassigned_count FROM repo_snapshots
+                WHERE repository_id = ? AND resolution = ? AND bucket_at < ?
+                ORDER BY bucket_at DESC LIMIT 1
+            """, (rid, tier, start)).fetchone()
+            if row and (latest is None or row['bucket_at'] > latest['bucket_at']):
+                latest = row
+        if latest:
+            current[rid] = tuple(latest)[1:]
+
+    placeholders = ",".join("?" * len(repo_ids))
+    rows = conn.execute(f"""
+        SELECT repository_id, {bucket} AS bucket, open_count, good_first_count, unassigned_count, MAX(bucket_at)
+        FROM repo_snapshots
+        WHERE repository_id IN ({placeholders}) AND resolution IN ('raw', 'hour', 'day')
+          AND bucket_at >= ? AND bucket_at < ?
+        GROUP BY repository_id, bucket
+        ORDER BY bucket
+    """, repo_ids + [start, end]).fetchall() if repo_ids else []
+    conn.close()
+
+    totals = [sum(counts[i] for counts in current.values()) for i in range(3)]
+    points = {}
+    if current:
+        points[str(start)] = tuple(totals)
+    for row in rows:
+        counts = (row['open_count'], row['good_first_count'], row['unassigned_count'])
+        previous = current.get(row['repository_id'], (0, 0, 0))
+        current[row['repository_id']] = counts
+        totals = [t + new - old for t, new, old in zip(totals, counts, previous)]
+        points[row['bucket']] = tuple(totals)
+
+    return resolution, [
+        {'time': datetime.fromisoformat(t), 'open': o, 'good_first': g, 'unassigned': u}
+        for t, (o, g, u) in points.items()
+    ]
+
+# --- NEW: Circuit Breaker ---
+
+def record_repository_failure(repo_id, error, not_found=False):
+    """
+    Counts a failed refresh. not_found failures also count towards deactivation.
+    Returns: (failure_count, not_found_count) after the update.
+    """
+    conn = get_connection()
+    conn.execute("""
+        UPDATE repositories
+        SET failure_count = COALESCE(failure_count, 0) + 1,
+            not_found_count = CASE WHEN ? THEN COALESCE(not_found_count, 0) + 1 ELSE 0 END,
+            last_error = ?
+        WHERE id = ?
+    """, (not_found, error, repo_id))
+    row = conn.execute("SELECT failure_count, not_found_count FROM repositories WHERE id = ?", (repo_id,)).fetchone()
+    conn.commit()
+    conn.close()
+    return (row['failure_count'], row['not_found_count']) if row else (0, 0)
+
+def set_repository_breaker(repo_id, open_until):
+    """Skips the repository in batch refreshes until open_until (None closes it)."""
+    conn = get_connection()
+    conn.execute("UPDATE repositories SET breaker_open_until = ? WHERE id = ?", (open_until, repo_id))
+    conn.commit()
+    conn.close()
+
+def reset_repository_breaker(repo_id):
+    conn = get_connection()
+    conn.execute("""
+        UPDATE repositories
+        SET failure_count = 0, not_found_count = 0, breaker_open_until = NULL, last_error = NULL
+        WHERE id = ?
+    """, (repo_id,))
+    conn.commit()
+    conn.close()
+
+def set_repository_active(repo_id, active):
+    conn = get_connection()
+    conn.execute("UPDATE repositories SET is_active = ? WHERE id = ?", (1 if active else 0, repo_id))
+    conn.commit()
+    conn.close()
+
+# --- NEW: Refresh Jobs ---
+# A refresh run is persisted as a job with one task per repository, so it can be
+# resumed after a restart without redoing finished repositories.
+
+def create_refresh_job(scope, repo_ids):
+    """Creates a job with one pending task per repository. Returns the job id."""
     conn = get_connection()
     cursor = conn.cursor()
-    
-    # Check if exists
-    cursor.execute("""
-        SELECT id, first_seen_at FROM issues 
-        WHERE repository_id = ? AND github_issue_id = ?
-    """, (repo_id, issue_data['github_issue_id']))
-    
-    existing = cursor.fetchone()
-    current_time = datetime.now()
-    
-    if existing:
-        # Update existing
-        cursor.execute("""
-            UPDATE issues SET
-                title = ?, state = ?, labels = ?, is_assigned = ?, 
-                assignee_login = ?, comments_count = ?, last_updated_at = ?, body_preview = ?
-            WHERE id = ?
-        """, (
-            issue_data['title'], issue_data['state'], issue_data['labels'], 
-            issue_data['is_assigned'], issue_data['assignee_login'], issue_data['comments_count'],
-            current_time, issue_data['body_preview'], existing['id']
-        ))
-        result = 'updated'
+    cursor.execute("INSERT INTO refresh_jobs (scope, created_at) VALUES (?, ?)", (scope, datetime.now()))
+    job_id = cursor.lastrowid
+    cursor.executemany(
+        "INSERT INTO refresh_tasks (job_id, repository_id, position) VALUES (?, ?, ?)",
+        [(job_id, repo_id, position) for position, repo_id in enumerate(repo_ids)]
+    )
+    conn.commit()
+    conn.close()
+    return job_id
+
+def get_refresh_job(job_id):
+    """Job row plus task counts by status, or None."""
+    conn = get_connection()
+    job = conn.execute("SELECT * FROM refresh_jobs WHERE id = ?", (job_id,)).fetchone()
+    if not job:
+        conn.close()
+        return None
+    job = dict(job)
+    counts = conn.execute("""
+        SELECT status, COUNT(*) AS count FROM refresh_tasks WHERE job_id = ? GROUP BY status
+    """, (job_id,)).fetchall()
+    conn.close()
+    job['tasks'] = {row['status']: row['count'] for row in counts}
+    job['total_tasks'] = sum(job['tasks'].values())
+    return job
+
+def get_unfinished_refresh_job(scope=None):
+    """Most recent job still marked running (e.g. interrupted by a restart), or None."""
+    conn = get_connection()
+    query = "SELECT id FROM refresh_jobs WHERE status = 'running'"
+    params = []
+    if scope:
+        query += " AND scope = ?"
+        params.append(scope)
+    row = conn.execute(query + " ORDER BY id DESC LIMIT 1", params).fetchone()
+    conn.close()
+    return get_refresh_job(row['id']) if row else None
+
+def reset_running_tasks(job_id):
+    """Returns tasks left 'running' by an interrupted runner to the queue."""
+    conn = get_connection()
+    conn.execute("""
+        UPDATE refresh_tasks SET status = 'pending', started_at = NULL
+        WHERE job_id = ? AND status = 'running'
+    """, (job_id,))
+    conn.commit()
+    conn.close()
+
+def claim_refresh_task(job_id):
+    """
+    Marks the next pending task running and returns it, or None when the job has
+    nothing left (or was cancelled). Retries queue behind first attempts.
+    """
+    conn = get_connection()
+    conn.isolation_level = None
+    conn.execute("BEGIN IMMEDIATE")
+    task = conn.execute("""
+        SELECT t.* FROM refresh_tasks t
+        JOIN refresh_jobs j ON j.id = t.job_id
+        WHERE t.job_id = ? AND t.status = 'pending' AND j.status = 'running'
+        ORDER BY t.attempts, t.position
+        LIMIT 1
+    """, (job_id,)).fetchone()
+    if task:
+        conn.execute("""
+            UPDATE refresh_tasks SET status = 'running', attempts = attempts + 1, started_at = ?
+            WHERE job_id = ? AND repository_id = ?
+        """, (datetime.now(), job_id, task['repository_id']))
+        task = dict(task)
+        task['attempts'] += 1
+    conn.execute("COMMIT")
+    conn.close()
+    return task
+
+def finish_refresh_task(job_id, repo_id, result=None, error=None, retry=False):
+    """
+    Records a task outcome. A failed task goes back to 'pending' when retry is set,
+    otherwise it ends as 'failed'.
+    """
+    conn = get_connection()
+    if error is None:
+        conn.execute("""
+            UPDATE refresh_tasks
+            SET status = 'done', error = NULL, new_count = ?, updated_count = ?, unchanged_count = ?, finished_at = ?
+            WHERE job_id = ? AND repository_id = ?
+        """, (result['new'], result['updated'], result['unchanged'], datetime.now(), job_id, repo_id))
     else:
+        conn.execute("""
+            UPDATE refresh_tasks SET status = ?, error = ?, finished_at = ?
+            WHERE job_id = ? AND repository_id = ? AND status = 'running'
+        """, ('pending' if retry else 'failed', error, datetime.now(), job_id, repo_id))
+    conn.commit()
+    conn.close()
+
+def finish_refresh_job(job_id, status='completed'):
+    """Closes a job. Cancelling also cancels its unfinished tasks."""
+    conn = get_connection()
+    if status == 'cancelled':
+        conn.execute("""
+            UPDATE refresh_tasks SET status = 'cancelled'
+            WHERE job_id = ? AND status IN ('pending', 'running')
+        """, (job_id,))
+    conn.execute("""
+        UPDATE refresh_jobs SET status = ?, finished_at = ? WHERE id = ? AND status = 'running'
+    """, (status, datetime.now(), job_id))
+    conn.commit()
+    conn.close()
+
+def cancel_refresh_job(job_id):
+    finish_refresh_job(job_id, 'cancelled')
+
+def get_refresh_job_results(job_id):
+    """Per-repository task rows of a job, in run order."""
+    conn = get_connection()
+    rows = conn.execute("""
+        SELECT t.*, r.full_name FROM refresh_tasks t
+        LEFT JOIN repositories r ON r.id = t.repository_id
+        WHERE t.job_id = ?
+        ORDER BY t.position
+    """, (job_id,)).fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+def _store_issue_body(cursor, issue_id, body):
+    """Writes the compressed full body, skipping the write if its hash is unchanged."""
+    if body is None:
+        return
+    body_hash = hashlib.sha1(body.encode("utf-8")).hexdigest()
+    cursor.execute("SELECT body_hash FROM issue_bodies WHERE issue_id = ?", (issue_id,))
+    existing = cursor.fetchone()
+    if existing and existing['body_hash'] == body_hash:
+        return
+    cursor.execute(
+        "INSERT OR REPLACE INTO issue_bodies (issue_id, body_hash, body) VALUES (?, ?, ?)",
+        (issue_id, body_hash, zlib.compress(body.encode("utf-8")))
+    )
+
+def _label_rows(issue_id, labels):
+    return [(label, issue_id) for label in {l.lower() for l in (labels or "").split(',')} if label]
+
+def _store_issue_labels(cursor, issue_id, labels):
+    """Replaces an issue's issue_labels rows with its current labels."""
+    cursor.execute("DELETE FROM issue_labels WHERE issue_id = ?", (issue_id,))
+    cursor.executemany("INSERT INTO issue_labels (label, issue_id) VALUES (?, ?)", _label_rows(issue_id, labels))
+
+def rebuild_issue_labels(cursor):
+    """Refills issue_labels from issues.labels, e.g. after rows were written directly (bulk import)."""
+    cursor.execute("DELETE FROM issue_labels")
+    rows = cursor.execute("SELECT id, labels FROM issues WHERE labels != ''").fetchall()
+    cursor.executemany("INSERT INTO issue_labels (label, issue_id) VALUES (?, ?)",
+                       [row for issue_id, labels in rows for row in _label_rows(issue_id, labels)])
+
+def _search_text(title, body):
+    return f"{title}\n{body or ''}"
+
+def _store_issue_search(cursor, issue_id, title, body):
+    """Replaces an issue's search text. body is the full body, or the preview if that's all there is."""
+    cursor.execute("DELETE FROM issue_search WHERE rowid = ?", (issue_id,))
+    cursor.execute("INSERT INTO issue_search (rowid, text) VALUES (?, ?)", (issue_id, _search_text(title, body)))
+
+def rebuild_issue_search(cursor):
+    """Refills issue_search from issues and issue_bodies, e.g. after a migration or bulk import."""
+    cursor.execute("DELETE FROM issue_search")
+    rows = cursor.execute("""
+        SELECT i.id, i.title, i.body_preview, b.body FROM issues i
+        LEFT JOIN issue_bodies b ON b.issue_id = i.id
+    """).fetchall()
+    cursor.executemany(
+        "INSERT INTO issue_search (rowid, text) VALUES (?, ?)",
+        [(row[0], _search_text(row[1], _decompress_body(row[3]) if row[3] else row[2])) for row in rows]
+    )
+
+def get_issue_body(issue_id):
+    """Loads the full body of one issue, or None if only the preview is stored."""
+    conn = get_connection()
+    row = conn.execute("SELECT body FROM issue_bodies WHERE issue_id = ?", (issue_id,)).fetchone()
+    conn.close()
+    return _decompress_body(row['body']) if row else None
+
+def issue_content_hash(issue_data):
+    """Fingerprints the fields a refresh can change, so unchanged issues can be skipped."""
+    fields = (
+        issue_data.title, issue_data.state, issue_data.labels, bool(issue_data.is_assigned),
+        issue_data.assignee_login, issue_data.comments_count, issue_data.body_preview, issue_data.body
+    )
+    return hashlib.sha1("\x1f".join("" if f is None else str(f) for f in fields).encode("utf-8")).hexdigest()
+
+def _sync_issue_rows(cursor, repo_id, issues, current_time):
+    """
+    Writes a batch of issues on an open cursor, comparing content hashes in bulk so
+    only new or changed rows are written.
+    Returns: dict with 'new', 'updated' and 'unchanged' counts.
+    """
+    counts = {'new': 0, 'updated': 0, 'unchanged': 0}
+    if not issues:
+        return counts
+
+    # One lookup for the whole batch instead of a SELECT per issue
+    cursor.execute("""
+        SELECT github_issue_id, id, content_hash, state FROM issues
+        WHERE repository_id = ? AND github_issue_id IN (SELECT value FROM json_each(?))
+    """, (repo_id, json.dumps([i.github_issue_id for i in issues])))
+    existing = {row['github_issue_id']: (row['id'], row['content_hash'], row['state']) for row in cursor.fetchall()}
+    changes = []
+
+    for issue_data in issues:
+        content_hash = issue_content_hash(issue_data)
+        match = existing.get(issue_data.github_issue_id)
+
+        if match and match[1] == content_hash:
+            counts['unchanged'] += 1
+            continue
+
+        if match:
+            # Update existing
+            cursor.execute("""
+                UPDATE issues SET
+                    title = ?, state = ?, labels = ?, is_assigned = ?, 
+                    assignee_login = ?, comments_count = ?, last_updated_at = ?, body_preview = ?,
+                    content_hash = ?
+                WHERE id = ?
+            """, (
+                issue_data.title, issue_data.state, issue_data.labels, 
+                issue_data.is_assigned, issue_data.assignee_login, issue_data.comments_count,
+                current_time, issue_data.body_preview, content_hash, match[0]
+            ))
+            _store_issue_body(cursor, match[0], issue_data.body)
+            _store_issue_labels(cursor, match[0], issue_data.labels)
+            _store_issue_search(cursor, match[0], issue_data.title, issue_data.body or issue_data.body_preview)
+            closed = match[2] == 'open' and issue_data.state == 'closed'
+            changes.append((match[0], repo_id, 'closed' if closed else 'updated', current_time))
+            counts['updated'] += 1
+            continue
+
         # Insert new
         cursor.execute("""
             INSERT INTO issues (
                 repository_id, github_issue_id, github_issue_url, title, state, labels,
                 is_assigned, assignee_login, comments_count, created_at_github,
-                first_seen_at, last_updated_at, body_preview
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                first_seen_at, last_updated_at, body_preview, content_hash
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
-            repo_id, issue_data['github_issue_id'], issue_data['github_issue_url'], 
-            issue_data['title'], issue_data['state'], issue_data['labels'], 
-            issue_data['is_assigned'], issue_data['assignee_login'], issue_data['comments_count'],
-            issue_data['created_at_github'], current_time, current_time, issue_data['body_preview']
+            repo_id, issue_data.github_issue_id, issue_data.github_issue_url, 
+            issue_data.title, issue_data.state, issue_data.labels, 
+            issue_data.is_assigned, issue_data.assignee_login, issue_data.comments_count,
+            issue_data.created_at_github, current_time, current_time, issue_data.body_preview,
+            content_hash
         ))
-        result = 'new'
-        
+        issue_id = cursor.lastrowid
+        _store_issue_body(cursor, issue_id, issue_data.body)
+        _store_issue_labels(cursor, issue_id, issue_data.labels)
+        _store_issue_search(cursor, issue_id, issue_data.title, issue_data.body or issue_data.body_preview)
+        # Guard against the same issue appearing twice in one batch
+        existing[issue_data.github_issue_id] = (issue_id, content_hash, issue_data.state)
+        changes.append((issue_id, repo_id, 'new', current_time))
+        counts['new'] += 1
+
+    cursor.executemany("""
+        INSERT INTO issue_changes (issue_id, repository_id, kind, changed_at) VALUES (?, ?, ?, ?)
+    """, changes)
+    return counts
+
+def upsert_issue(repo_id, issue_data):
+    """
+    Inserts a new issue or updates an existing one.
+    Returns: 'new' if inserted, 'updated' if changed, 'unchanged' if nothing was written.
+    """
+    counts = upsert_issues(repo_id, [issue_data])
+    return next(result for result, count in counts.items() if count)
+
+def upsert_issues(repo_id, issues, conn=None):
+    """
+    Upserts a batch of issues in a single transaction, skipping unchanged ones.
+    Pass an open connection to reuse it across batches (it is committed, not closed).
+    Returns: dict with 'new', 'updated' and 'unchanged' counts.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    counts = _sync_issue_rows(conn.cursor(), repo_id, issues, datetime.now())
     conn.commit()
+    if own_conn:
+        conn.close()
+    return counts
+
+# --- NEW: Change Log ---
+# Every write to issues or seen state appends to issue_changes with an increasing seq,
+# so consumers (read model, feed cache) can ask what changed since the seq they last
+# saw instead of rescanning. Entries name the issue, not its new values: consumers
+# re-read the rows they care about. Derived data (scores, duplicate links) is logged
+# under its own kinds so consumers can handle it cheaply, and a pass over every issue
+# logs one marker without an issue_id instead of one entry per issue. Compaction keeps
+# only the newest entry per issue and kind group (and per user for seen state), and
+# drops entries older than CHANGE_LOG_RETENTION_DAYS.
+
+CHANGE_KINDS = ('new', 'updated', 'closed', 'deleted', 'seen', 'unseen', 'rescored', 'relinked')
+SEEN_CHANGE_KINDS = ('seen', 'unseen')
+DERIVED_CHANGE_KINDS = ('rescored', 'relinked')  # Only issues.score / issues.duplicate_of changed
+CHANGE_LOG_RETENTION_DAYS = 30
+
+def _log_changes(conn, kind, id_query, params, user_id=None):
+    """Appends one change per issue selected by id_query. Deletions must be logged before the rows go."""
+    conn.execute(f"""
+        INSERT INTO issue_changes (issue_id, repository_id, kind, user_id, changed_at)
+        SELECT id, repository_id, ?, ?, ? FROM issues WHERE id IN ({id_query})
+    """, [kind, user_id, datetime.now()] + list(params))
+
+def log_issue_changes(conn, issue_ids, kind, since=None):
+    """
+    Records derived-data changes (kind in DERIVED_CHANGE_KINDS) on an open connection.
+    With `since` (the start of the sync being post-processed), issues the sync already
+    logged aren't logged again: their entry is moved to the end of the log instead, so
+    a consumer that read it before this write still re-reads the issue.
+    """
+    ids_json = json.dumps(list(issue_ids))
+    if since is not None:
+        placeholders = ", ".join("?" for _ in SEEN_CHANGE_KINDS + DERIVED_CHANGE_KINDS)
+        # MAX(seq) picks the kind of each issue's newest entry
+        logged = conn.execute(f"""
+            SELECT MAX(seq), issue_id, repository_id, kind FROM issue_changes
+            WHERE issue_id IN (SELECT value FROM json_each(?)) AND changed_at >= ?
+              AND kind NOT IN ({placeholders})
+            GROUP BY issue_id
+        """, (ids_json, since) + SEEN_CHANGE_KINDS + DERIVED_CHANGE_KINDS).fetchall()
+        if logged:
+            now = datetime.now()
+            conn.executemany("DELETE FROM issue_changes WHERE seq = ?", [(r[0],) for r in logged])
+            conn.executemany(
+                "INSERT INTO issue_changes (issue_id, repository_id, kind, changed_at) VALUES (?, ?, ?, ?)",
+                [(r[1], r[2], r[3], now) for r in logged]
+            )
+            moved = {r[1] for r in logged}
+            ids_json = json.dumps([i for i in issue_ids if i not in moved])
+    _log_changes(conn, kind, "SELECT value FROM json_each(?)", (ids_json,))
+
+def log_change_marker(conn, kind):
+    """Records one derived-data change (e.g. a full rescore) that may touch every issue."""
+    conn.execute("INSERT INTO issue_changes (kind, changed_at) VALUES (?, ?)", (kind, datetime.now()))
+
+def last_change_marker_at(kind):
+    """When the latest marker of `kind` was logged (raw timestamp), or None."""
+    conn = get_connection()
+    row = conn.execute(
+        "SELECT MAX(changed_at) FROM issue_changes WHERE issue_id IS NULL AND kind = ?", (kind,)
+    ).fetchone()
     conn.close()
-    return result
+    return row[0]
+
+def latest_change_seq(conn=None):
+    """The highest seq ever assigned (0 before the first change)."""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'issue_changes'").fetchone()
+    if own_conn:
+        conn.close()
+    return row[0] if row else 0
 
-def get_issues(filters=None):
+def get_changes_since(seq, limit=None, conn=None):
     """
-    Fetch issues based on filters.
-    filters: dict with keys: category_id, repo_id, search, only_new, only_good_first, unassigned_only
+    Changes with a seq above `seq`, oldest first, as dicts (seq, issue_id,
+    repository_id, kind, user_id, changed_at). Returns None if compaction already
+    dropped changes after `seq`; the caller has to rescan instead.
     """
-    filters = filters or {}
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
+    query = "SELECT * FROM issue_changes WHERE seq > ? ORDER BY seq"
+    params = [seq]
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    changes = [dict(row) for row in cursor.execute(query, params)]
+    # Checked after reading: the floor only rises, so if it is still at or below seq
+    # nothing was compacted away before the read either
+    if cursor.execute("SELECT seq FROM issue_changes_floor").fetchone()[0] > seq:
+        changes = None
+    cursor.close()
+    if own_conn:
+        conn.close()
+    return changes
+
+def compact_changes(now=None):
+    """
+    Drops superseded entries and entries older than CHANGE_LOG_RETENTION_DAYS.
+    Returns the number of entries removed.
+    """
+    cutoff = (now or datetime.now()) - timedelta(days=CHANGE_LOG_RETENTION_DAYS)
     conn = get_connection()
-    
-    # Base query with Join to get repo name and category name helper
+    # GROUP BY puts NULL user_ids in one group: one stream per issue, plus one per user.
+    # Derived kinds get their own groups, so a later rescore can't hide an earlier 'new'
+    removed = conn.execute(f"""
+        DELETE FROM issue_changes WHERE seq NOT IN (
+            SELECT MAX(seq) FROM issue_changes
+            GROUP BY issue_id, user_id, CASE WHEN kind IN ({", ".join("?" for _ in DERIVED_CHANGE_KINDS)}) THEN kind END
+        )
+    """, DERIVED_CHANGE_KINDS).rowcount
+    floor = conn.execute("SELECT MAX(seq) FROM issue_changes WHERE changed_at < ?", (cutoff,)).fetchone()[0]
+    if floor is not None:
+        removed += conn.execute("DELETE FROM issue_changes WHERE seq <= ?", (floor,)).rowcount
+        conn.execute("UPDATE issue_changes_floor SET seq = MAX(seq, ?)", (floor,))
+    conn.commit()
+    conn.close()
+    return removed
+
+# SQL expression for every field a caller can project from get_issues
+ISSUE_COLUMNS = {
+    'id': 'i.id',
+    'repository_id': 'i.repository_id',
+    'github_issue_id': 'i.github_issue_id',
+    'github_issue_url': 'i.github_issue_url',
+    'title': 'i.title',
+    'state': 'i.state',
+    'labels': 'i.labels',
+    'is_assigned': 'i.is_assigned',
+    'assignee_login': 'i.assignee_login',
+    'comments_count': 'i.comments_count',
+    'created_at_github': 'i.created_at_github',
+    'first_seen_at': 'i.first_seen_at',
+    'last_updated_at': 'i.last_updated_at',
+    'body_preview': 'i.body_preview',
+    'seen_at': 's.seen_at',
+    'score': 'i.score',
+    'duplicate_of': 'i.duplicate_of',
+    'duplicate_count': """CASE WHEN i.duplicate_of IS NULL THEN 0 ELSE (
+        SELECT COUNT(*) - 1 FROM issues d WHERE d.duplicate_of = i.duplicate_of AND d.state = 'open'
+    ) END""",
+    'repo_name': 'r.full_name',
+    'category_name': 'c.name',
+}
+
+# Label substrings treated as "good first issue" by the only_good_first filter
+GOOD_FIRST_KEYWORDS = ['good first issue', 'good-first-issue', 'beginner', 'help wanted']
+
+# --- NEW: Composable issue filters ---
+# Each filter adds a fixed SQL fragment, always in this order. Multi-value filters
+# bind one JSON array (json_each), so the SQL text depends only on which filters are
+# active, never on how many values they carry, and repeated queries hit sqlite3's
+# prepared-statement cache on the reused read connection.
+
+def _as_list(value):
+    return list(value) if isinstance(value, (list, tuple, set, frozenset)) else [value]
+
+def _json_list(value):
+    return [json.dumps(_as_list(value))]
+
+# Issues carrying any of the bound labels (exact, case-insensitive)
+_LABELED_IDS = "SELECT issue_id FROM issue_labels WHERE label IN (SELECT lower(value) FROM json_each(?))"
+
+ISSUE_FILTERS = [
+    # (filter key, SQL condition, function returning its parameters)
+    ('unseen_only', "s.issue_id IS NULL", None),
+    # Written against i.repository_id so the category's repos drive idx_issues_repo_open
+    ('category_id', """i.repository_id IN (
+        SELECT id FROM repositories WHERE category_id IN (SELECT value FROM json_each(?))
+    )""", _json_list),
+    ('repo_id', "i.repository_id IN (SELECT value FROM json_each(?))", _json_list),
+    ('labels', f"i.id IN ({_LABELED_IDS})", _json_list),
+    ('exclude_labels', f"i.id NOT IN ({_LABELED_IDS})", _json_list),
+    ('assignee', "i.assignee_login = ? COLLATE NOCASE", lambda v: [v]),
+    ('min_comments', "i.comments_count >= ?", lambda v: [v]),
+    ('max_comments', "i.comments_count <= ?", lambda v: [v]),
+    # Note: In production a separate tags table is better, but this works for MVP
+    ('only_good_first', "(" + " OR ".join("i.labels LIKE ?" for _ in GOOD_FIRST_KEYWORDS) + ")",
+     lambda v: [f"%{k}%" for k in GOOD_FIRST_KEYWORDS]),
+    ('unassigned_only', "i.is_assigned = 0", None),
+    # first_seen_at is stored via sqlite3's datetime adapter, so string comparison works
+    ('only_new', "i.first_seen_at > ?", lambda v: [datetime.now() - timedelta(hours=24)]),
+    # Keep one representative (lowest open id) per near-duplicate cluster
+    ('collapse_duplicates', """(i.duplicate_of IS NULL OR i.id = (
+        SELECT MIN(d.id) FROM issues d WHERE d.duplicate_of = i.duplicate_of AND d.state = 'open'
+    ))""", None),
+    # issue_search holds title + full body (or the preview for issues stored before bodies)
+    ('search', "i.id IN (SELECT rowid FROM issue_search WHERE text LIKE ?)", lambda v: [f"%{v}%"]),
+]
+
+# Filters that usually match a small part of the open set. When one is active its
+# index must drive the query, rather than the state-ordered indexes that avoid a sort
+# but walk every open issue; see _issue_ordering and unindexed_issue_plans.
+SELECTIVE_FILTERS = ('category_id', 'repo_id', 'labels', 'assignee')
+
+def _filter_active(value):
+    """False/None/empty values switch a filter off; 0 is a real bound for the comment filters."""
+    if isinstance(value, (list, tuple, set, frozenset, str)):
+        return bool(value)
+    return value is not None and value is not False
+
+def _issue_filter_clause(filters, join_seen=False):
+    """
+    Builds the shared FROM/WHERE part of issue queries. Returns (sql, params).
+    The user's seen state (alias s) is joined when filtering on it or when join_seen is set.
+    """
     query = """
-        SELECT i.*, r.full_name as repo_name, c.name as category_name
         FROM issues i
         JOIN repositories r ON i.repository_id = r.id
         JOIN categories c ON r.category_id = c.id
-        WHERE 1=1
     """
     params = []
+    if join_seen or filters.get('unseen_only'):
+        # One primary-key probe per issue, however many users there are
+        query += " LEFT JOIN issue_seen s ON s.user_id = ? AND s.issue_id = i.id"
+        params.append(filters.get('user_id') or DEFAULT_USER_ID)
+    if _filter_active(filters.get('labels')):
+        # Labels are found through issue_labels, which has no state column; +i.state
+        # keeps the state-led indexes from looking cheaper than that lookup
+        query += " WHERE +i.state = 'open'"
+    else:
+        query += " WHERE i.state = 'open'"
+
+    for key, condition, values in ISSUE_FILTERS:
+        value = filters.get(key)
+        if _filter_active(value):
+            query += f" AND {condition}"
+            if values:
+                params.extend(values(value))
+
+    return query, params
+
+def _issue_ordering(filters, order_by):
+    """
+    ORDER BY clause for get_issues. With a selective filter active the sort column
+    is written as +column: SQLite then can't use idx_issues_open_created/_score to
+    skip the sort, so it picks the selective filter's index and sorts the few matches.
+    """
+    ordering = ISSUE_ORDERINGS[order_by]
+    if any(_filter_active(filters.get(key)) for key in SELECTIVE_FILTERS):
+        ordering = "+" + ordering
+    return ordering
+
+def get_label_counts():
+    """Open issues per label, most common first."""
+    conn = get_connection()
+    rows = conn.execute("""
+        SELECT labels, COUNT(*) FROM issues WHERE state = 'open' AND labels != '' GROUP BY labels
+    """).fetchall()
+    conn.close()
+    counts = {}
+    for labels, count in rows:
+        for label in labels.split(','):
+            counts[label] = counts.get(label, 0) + count
+    return dict(sorted(counts.items(), key=lambda item: -item[1]))
+
+def _issue_plan_problem(plan, selective):
+    """Why an issue query plan is unacceptable, or None if it is fine."""
+    for step in plan:
+        if step.startswith(("SCAN i", "SCAN d")) and "INDEX" not in step:
+            return "full table scan"
+        # With a selective filter active, a search on state alone visits every open issue
+        if selective and step.startswith("SEARCH i ") and step.endswith("(state=?)"):
+            return "state-only index search despite a selective filter"
+    return None
+
+def unindexed_issue_plans():
+    """
+    Runs EXPLAIN QUERY PLAN for every combination of ISSUE_FILTERS (both orderings,
+    plus the count query) and returns (filter keys, problem, plan) for each plan that
+    scans the issues table, or walks all open issues via state although one of
+    SELECTIVE_FILTERS is active. An empty list means every combination is indexed.
+    """
+    samples = {
+        'unseen_only': True, 'category_id': [1, 2], 'repo_id': [1], 'labels': ["bug"],
+        'exclude_labels': ["question"], 'assignee': "octocat", 'min_comments': 1, 'max_comments': 10,
+        'only_good_first': True, 'unassigned_only': True, 'only_new': True,
+        'collapse_duplicates': True, 'search': "crash",
+    }
+    keys = [key for key, _, _ in ISSUE_FILTERS]
+    conn = get_connection()
+    failures = []
+    for mask in range(2 ** len(keys)):
+        active = [key for bit, key in enumerate(keys) if mask >> bit & 1]
+        filters = {key: samples[key] for key in active}
+        selective = any(key in SELECTIVE_FILTERS for key in active)
+        where, params = _issue_filter_clause(filters, join_seen=True)
+        count_where, count_params = _issue_filter_clause(filters)
+        queries = [(f"SELECT i.id {where} ORDER BY {_issue_ordering(filters, order)}", params)
+                   for order in ISSUE_ORDERINGS]
+        queries.append((f"SELECT COUNT(*) {count_where}", count_params))
+        for query, query_params in queries:
+            plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", query_params)]
+            problem = _issue_plan_problem(plan, selective)
+            if problem:
+                failures.append((active, problem, plan))
+    conn.close()
+    return failures
+
+# Supported get_issues orderings
+ISSUE_ORDERINGS = {
+    'created': "i.created_at_github DESC",
+    'score': "i.score DESC",
+}
+
+def get_issues(filters=None, columns=None, order_by='created', limit=None):
+    """
+    Fetch issues based on filters.
+    filters: dict with keys from ISSUE_FILTERS: category_id, repo_id, labels, exclude_labels (each a
+             value or a list of values), assignee, min_comments, max_comments, search, only_new,
+             only_good_first, unassigned_only, unseen_only, collapse_duplicates; plus user_id
+             (whose seen state applies; default user if unset)
+    columns: optional list of Issue fields to fetch (see ISSUE_COLUMNS); others are left None.
+    order_by: 'created' (newest first) or 'score' (best to pick up first).
+    limit: optional maximum number of issues.
+    Returns: list of Issue records.
+    """
+    filters = filters or {}
+    columns = columns or list(ISSUE_COLUMNS)
+    unknown = set(columns) - set(ISSUE_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown issue columns: {', '.join(sorted(unknown))}")
+
+    # Select in Issue field order, with NULL for anything not projected, so each
+    # row tuple maps straight onto an Issue without an intermediate dict
+    select = ", ".join(
+        ISSUE_COLUMNS[field] if field in columns else "NULL"
+        for field in Issue._fields
+    )
+    where, params = _issue_filter_clause(filters, join_seen='seen_at' in columns)
+    query = f"SELECT {select} {where} ORDER BY {_issue_ordering(filters, order_by)}"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
     
-    # Apply Filters
-    if filters.get('category_id'):
-        query += " AND r.category_id = ?"
-        params.append(filters['category_id'])
-        
-    if filters.get('repo_id'):
-        query += " AND i.repository_id = ?"
-        params.append(filters['repo_id'])
-        
-    if filters.get('only_good_first'):
-        # Checking labels string for keywords
-        # Note: In production a separate tags table is better, but this works for MVP
-        keywords = ['good first issue', 'good-first-issue', 'beginner', 'help wanted']
-        query += " AND (" + " OR ".join(["i.labels LIKE ?" for _ in keywords]) + ")"
-        for k in keywords:
-            params.append(f"%{k}%")
-            
-    if filters.get('unassigned_only'):
-        query += " AND i.is_assigned = 0"
-        
-    if filters.get('only_new'):
-        # SQLite uses string comparison for dates, assuming ISO format
-        # first_seen_at > now - 24 hours
-        yesterday = datetime.now() # Logic handled in python or sql?
-        # Let's do a simple check: sort by first_seen_at desc in python or pass timestamp
-        # Ideally, we pass the timestamp string for 24h ago
-        pass # Handling in Python post-processing or precise SQL if needed
-        
-    if filters.get('search'):
-        term = f"%{filters['search']}%"
-        query += " AND (i.title LIKE ? OR i.body_preview LIKE ?)"
-        params.extend([term, term])
-        
-    query += " ORDER BY i.created_at_github DESC"
-    
-    rows = conn.execute(query, params).fetchall()
+    with _read_connection() as conn:
+        cursor = conn.cursor()
+        issues = list(map(Issue._make, cursor.execute(query, params)))
+        cursor.close()
+    return issues
+
+def count_issues(filters=None):
+    """Counts issues matching the same filters as get_issues without fetching them."""
+    where, params = _issue_filter_clause(filters or {})
+    with _read_connection() as conn:
+        return conn.execute(f"SELECT COUNT(*) {where}", params).fetchone()[0]
+
+# --- NEW: Bulk Seen State ---
+# Every bulk mark gets a seen_batches row and stamps its issue_seen rows with that id,
+# which doubles as the undo token: undoing removes only the user's rows still carrying it.
+
+def _start_seen_batch(conn, user_id):
+    return conn.execute("INSERT INTO seen_batches (user_id) VALUES (?)", (user_id,)).lastrowid
+
+def _log_seen_changes(conn, kind, user_id, batch_id):
+    """Logs the issues of one bulk mark, found by the batch id all its rows share."""
+    _log_changes(conn, kind, "SELECT issue_id FROM issue_seen WHERE user_id = ? AND batch_id = ?",
+                 (user_id, batch_id), user_id=user_id)
+
+def mark_issues_seen(issue_ids, user_id=None):
+    """Marks the given unseen issues seen for a user in one statement. Returns (count, undo_token)."""
+    user_id = user_id or DEFAULT_USER_ID
+    conn = get_connection()
+    batch_id = _start_seen_batch(conn, user_id)
+    cursor = conn.execute("""
+        INSERT OR IGNORE INTO issue_seen (user_id, issue_id, seen_at, batch_id)
+        SELECT ?, id, ?, ? FROM issues WHERE id IN (SELECT value FROM json_each(?))
+    """, (user_id, datetime.now(), batch_id, json.dumps(list(issue_ids))))
+    count = cursor.rowcount
+    _log_seen_changes(conn, 'seen', user_id, batch_id)
+    conn.commit()
+    conn.close()
+    return count, batch_id
+
+def mark_matching_issues_seen(filters):
+    """Marks every issue matching get_issues filters seen for filters' user. Returns (count, undo_token)."""
+    filters = dict(filters or {}, unseen_only=True)
+    user_id = filters.get('user_id') or DEFAULT_USER_ID
+    where, params = _issue_filter_clause(filters)
+    conn = get_connection()
+    batch_id = _start_seen_batch(conn, user_id)
+    cursor = conn.execute(f"""
+        INSERT OR IGNORE INTO issue_seen (user_id, issue_id, seen_at, batch_id)
+        SELECT ?, i.id, ?, ? {where}
+    """, [user_id, datetime.now(), batch_id] + params)
+    count = cursor.rowcount
+    _log_seen_changes(conn, 'seen', user_id, batch_id)
+    conn.commit()
+    conn.close()
+    return count, batch_id
+
+def unmark_issues_seen(undo_token, user_id=None):
+    """Reverts one bulk mark. Returns the number of issues marked unseen again."""
+    user_id = user_id or DEFAULT_USER_ID
+    conn = get_connection()
+    _log_seen_changes(conn, 'unseen', user_id, undo_token)
+    cursor = conn.execute("DELETE FROM issue_seen WHERE user_id = ? AND batch_id = ?", (user_id, undo_token))
+    count = cursor.rowcount
+    conn.commit()
+    conn.close()
+    return count
+
+# --- NEW: Saved Feeds ---
+
+# Filters that only make sense inside one dashboard session
+FEED_EXCLUDED_FILTERS = ('user_id', 'unseen_only')
+
+def _slugify(name):
+    slug = "".join(ch if ch.isalnum() else "-" for ch in name.lower())
+    return "-".join(part for part in slug.split("-") if part) or "feed"
+
+def create_saved_feed(name, filters):
+    """Saves filters as a published feed. Returns (success, slug or error message)."""
+    filters = {
+        key: value for key, value in filters.items()
+        if key not in FEED_EXCLUDED_FILTERS and _filter_active(value)
+    }
+    slug = _slugify(name)
+    conn = get_connection()
+    if conn.execute("SELECT 1 FROM saved_feeds WHERE slug = ?", (slug,)).fetchone():
+        conn.close()
+        return False, "A feed with this name already exists."
+    conn.execute("INSERT INTO saved_feeds (slug, name, filters) VALUES (?, ?, ?)",
+                 (slug, name, json.dumps(filters, sort_keys=True)))
+    conn.commit()
+    conn.close()
+    return True, slug
+
+def get_saved_feeds():
+    conn = get_connection()
+    feeds = [dict(row, filters=json.loads(row['filters']))
+             for row in conn.execute("SELECT * FROM saved_feeds ORDER BY name")]
+    conn.close()
+    return feeds
+
+def get_saved_feed(slug):
+    conn = get_connection()
+    row = conn.execute("SELECT * FROM saved_feeds WHERE slug = ?", (slug,)).fetchone()
+    conn.close()
+    return dict(row, filters=json.loads(row['filters'])) if row else None
+
+def delete_saved_feed(feed_id):
+    conn = get_connection()
+    conn.execute("DELETE FROM saved_feeds WHERE id = ?", (feed_id,))
+    conn.commit()
+    conn.close()
+
+# --- NEW: Users ---
+
+def get_or_create_user(name):
+    """Id of the user with this name, creating it on first use."""
+    conn = get_connection()
+    conn.execute("INSERT OR IGNORE INTO users (name) VALUES (?)", (name,))
+    conn.commit()
+    user_id = conn.execute("SELECT id FROM users WHERE name = ?", (name,)).fetchone()[0]
     conn.close()
-    return [dict(row) for row in rows]
+    return user_id
 
 if __name__ == "__main__":
     init_db()
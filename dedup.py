@@ -0,0 +1,274 @@
+"""
+Cross-repository near-duplicate detection with MinHash + LSH.
+
+Each issue's title and body preview (minus issue-template scaffolding such as
+"### System Info" headings and checklists) are shingled into word pairs and
+reduced to a MinHash signature at ingest time. Signatures are split into bands whose hashes
+are stored in issue_lsh, so candidates are found with indexed bucket lookups
+instead of comparing every pair of issues. Confirmed duplicates share a cluster
+id in issues.duplicate_of (the lowest issue id in the cluster). A match also needs
+similar titles, so issues that only share boilerplate aren't linked.
+
+Clustering is single-linkage on purpose: an issue that matches members of two
+clusters joins them into one, so clusters are the connected groups of pairwise
+matches and two members need not match each other directly (A~B and B~C puts A
+and C together). Issues copied across many repositories tend to drift a little per
+copy, and linking through the copies keeps them in one cluster.
+"""
+import json
+import re
+import zlib
+
+import numpy as np
+
+import database
+
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+SIMILARITY_THRESHOLD = 0.6   # Estimated Jaccard similarity to count as a duplicate
+TITLE_SIMILARITY_THRESHOLD = 0.5  # Exact Jaccard of the title shingles, checked on top
+MAX_BUCKET_CANDIDATES = 100  # Caps huge buckets (e.g. issues that are all template text)
+_PRIME = np.uint64((1 << 31) - 1)
+
+# Fixed seed so signatures stay comparable across runs
+_rng = np.random.RandomState(1337)
+_A = _rng.randint(1, (1 << 31) - 1, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, (1 << 31) - 1, size=NUM_PERM).astype(np.uint64)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Lines issue templates repeat verbatim: markdown headings, bold pseudo-headings,
+# checklist items and HTML comments (hints GitHub hides when rendering)
+_TEMPLATE_RE = re.compile(
+    r"<!--[\s\S]*?(?:-->|\Z)|^[ \t]*(?:#{1,6}[ \t].*|\*\*[^*\n]+\*\*:?[ \t]*|[-*][ \t]+\[[ xX]\][ \t].*)$",
+    re.MULTILINE
+)
+
+def strip_template(text):
+    """Removes issue-template scaffolding so shared boilerplate doesn't look like shared content."""
+    return _TEMPLATE_RE.sub(" ", text or "")
+
+def shingles(text):
+    """Word-pair shingles of lower-cased text; single words for very short text."""
+    tokens = _TOKEN_RE.findall((text or "").lower())
+    if len(tokens) < 2:
+        return set(tokens)
+    return {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+def minhash(shingle_set):
+    """Returns the MinHash signature of a shingle set, or None if it is empty."""
+    if not shingle_set:
+        return None
+    hashes = np.fromiter(
+        (zlib.crc32(s.encode("utf-8")) for s in shingle_set),
+        dtype=np.uint64, count=len(shingle_set)
+    ) % _PRIME
+    # (a * h + b) mod p for every permutation at once; a, h < 2^31 so no overflow
+    return ((np.outer(_A, hashes) + _B[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+def band_buckets(signature):
+    """Hashes each band of a signature into one bucket id."""
+    return [
+        zlib.crc32(signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes())
+        for band in range(BANDS)
+    ]
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(sig_a == sig_b))
+
+def title_similarity(title_a, title_b):
+    """Exact Jaccard similarity of two titles' shingles."""
+    a, b = shingles(title_a), shingles(title_b)
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+def _unlink(cursor, issue_ids):
+    """
+    Takes issues out of their duplicate clusters so they can be matched afresh.
+    A cluster that lost its root is re-rooted at its lowest remaining id, and one
+    left with a single member is dissolved.
+    Returns: ids whose duplicate_of changed.
+    """
+    ids_json = json.dumps(list(issue_ids))
+    unlinked = [r[0] for r in cursor.execute("""
+        SELECT id FROM issues WHERE id IN (SELECT value FROM json_each(?)) AND duplicate_of IS NOT NULL
+    """, (ids_json,))]
+    if not unlinked:
+        return []
+    roots = [r[0] for r in cursor.execute("""
+        SELECT DISTINCT duplicate_of FROM issues WHERE id IN (SELECT value FROM json_each(?))
+    """, (json.dumps(unlinked),))]
+    cursor.execute("UPDATE issues SET duplicate_of = NULL WHERE id IN (SELECT value FROM json_each(?))",
+                   (json.dumps(unlinked),))
+
+    changed = set(unlinked)
+    for root in roots:
+        members = [r[0] for r in cursor.execute("SELECT id FROM issues WHERE duplicate_of = ? ORDER BY id", (root,))]
+        if len(members) == 1:
+            cursor.execute("UPDATE issues SET duplicate_of = NULL WHERE id = ?", (members[0],))
+        elif members and members[0] != root:
+            cursor.execute("UPDATE issues SET duplicate_of = ? WHERE duplicate_of = ?", (members[0], root))
+        else:
+            continue
+        changed.update(members)
+    return sorted(changed)
+
+def index_issues(issue_ids, since=None, log_changes=True, unlink=False):
+    """
+    (Re)computes signatures for the given issues, updates the LSH index and merges
+    any cross-repository matches into duplicate clusters. With unlink, the issues
+    first leave their current clusters (their text may no longer match) in the same
+    transaction. Relinked issues are logged as 'relinked' (see
+    database.log_issue_changes for `since`) unless log_changes is off, for passes
+    that log one marker instead.
+    Returns: number of distinct issues whose cluster changed.
+    """
+    if not issue_ids:
+        return 0
+
+    conn = database.get_connection()
+    cursor = conn.cursor()
+    ids_json = json.dumps(list(issue_ids))
+    rows = cursor.execute("""
+        SELECT id, repository_id, title, body_preview FROM issues
+        WHERE id IN (SELECT value FROM json_each(?))
+    """, (ids_json,)).fetchall()
+
+    # Drop stale index entries before re-inserting
+    cursor.execute("DELETE FROM issue_lsh WHERE issue_id IN (SELECT value FROM json_each(?))", (ids_json,))
+    before = {}
+    if unlink:
+        before = {r[0]: r[1] for r in cursor.execute("""
+            SELECT id, duplicate_of FROM issues WHERE duplicate_of IN (
+                SELECT duplicate_of FROM issues WHERE id IN (SELECT value FROM json_each(?))
+            )
+        """, (ids_json,))}
+        _unlink(cursor, issue_ids)
+
+    linked = set()
+    for row in rows:
+        signature = minhash(shingles(f"{row['title']} {strip_template(row['body_preview'])}"))
+        if signature is None:
+            cursor.execute("DELETE FROM issue_minhash WHERE issue_id = ?", (row['id'],))
+            continue
+
+        buckets = band_buckets(signature)
+        candidates = set()
+        for band, bucket in enumerate(buckets):
+            cursor.execute(
+                "SELECT issue_id FROM issue_lsh WHERE band = ? AND bucket = ? LIMIT ?",
+                (band, bucket, MAX_BUCKET_CANDIDATES)
+            )
+            candidates.update(r[0] for r in cursor.fetchall())
+        candidates.discard(row['id'])
+
+        cursor.execute(
+            "INSERT OR REPLACE INTO issue_minhash (issue_id, signature) VALUES (?, ?)",
+            (row['id'], signature.tobytes())
+        )
+        cursor.executemany(
+            "INSERT OR IGNORE INTO issue_lsh (band, bucket, issue_id) VALUES (?, ?, ?)",
+            [(band, bucket, row['id']) for band, bucket in enumerate(buckets)]
+        )
+
+        if candidates:
+            linked.update(_merge_matches(cursor, row, signature, candidates, since, log_changes))
+
+    if before:
+        # Net effect on the clusters the issues left: rejoining the same root isn't a change
+        after = {r[0]: r[1] for r in cursor.execute(
+            "SELECT id, duplicate_of FROM issues WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(before)),)
+        )}
+        moved = {i for i in before if after.get(i) != before[i]}
+        if log_changes:
+            database.log_issue_changes(cursor, sorted(moved - linked), 'relinked', since=since)
+        linked = (linked - before.keys()) | moved
+
+    conn.commit()
+    conn.close()
+    return len(linked)
+
+def _merge_matches(cursor, row, signature, candidates, since=None, log_changes=True):
+    """
+    Verifies LSH candidates and merges confirmed ones into a single cluster, along
+    with every cluster they (or this issue) already belong to (see module docstring).
+    Returns: ids of the issues whose duplicate_of changed.
+    """
+    cursor.execute("""
+        SELECT m.issue_id, m.signature, i.repository_id, i.duplicate_of, i.title
+        FROM issue_minhash m JOIN issues i ON i.id = m.issue_id
+        WHERE m.issue_id IN (SELECT value FROM json_each(?))
+    """, (json.dumps(list(candidates)),))
+
+    matches = []
+    for cand in cursor.fetchall():
+        # Only cross-repository copies count as duplicates here
+        if cand['repository_id'] == row['repository_id']:
+            continue
+        cand_sig = np.frombuffer(cand['signature'], dtype=np.uint32)
+        if (similarity(signature, cand_sig) >= SIMILARITY_THRESHOLD
+                and title_similarity(row['title'], cand['title']) >= TITLE_SIMILARITY_THRESHOLD):
+            matches.append(cand)
+
+    if not matches:
+        return []
+
+    current = cursor.execute("SELECT duplicate_of FROM issues WHERE id = ?", (row['id'],)).fetchone()[0]
+    roots = {m['duplicate_of'] for m in matches if m['duplicate_of']}
+    if current:
+        roots.add(current)
+    members = [row['id']] + [m['issue_id'] for m in matches]
+    root = min(roots | set(members))
+
+    # Point every member, and every member of any cluster being merged, at one root
+    relinked = [r[0] for r in cursor.execute("""
+        SELECT id FROM issues
+        WHERE (id IN (SELECT value FROM json_each(?)) OR duplicate_of IN (SELECT value FROM json_each(?)))
+          AND duplicate_of IS NOT ?
+    """, (json.dumps(members), json.dumps(list(roots)), root)).fetchall()]
+    cursor.execute("UPDATE issues SET duplicate_of = ? WHERE id IN (SELECT value FROM json_each(?))",
+                   (root, json.dumps(relinked)))
+    if log_changes:
+        database.log_issue_changes(cursor, relinked, 'relinked', since=since)
+    return relinked
+
+def index_changed(repo_id, since):
+    """
+    Indexes a repository's issues written since `since`, and open ones never indexed.
+    Edited issues leave their clusters first and only rejoin one they still match.
+    """
+    conn = database.get_connection()
+    ids = [r[0] for r in conn.execute("""
+        SELECT id FROM issues i
+        WHERE repository_id = ? AND (last_updated_at >= ? OR (
+            state = 'open' AND NOT EXISTS (SELECT 1 FROM issue_minhash m WHERE m.issue_id = i.id)))
+    """, (repo_id, since))]
+    conn.close()
+    return index_issues(ids, since=since, unlink=True)
+
+def rebuild_index(batch_size=5000):
+    """Re-indexes every open issue in batches. Returns the number of issues in a duplicate cluster."""
+    conn = database.get_connection()
+    conn.execute("DELETE FROM issue_lsh")
+    conn.execute("UPDATE issues SET duplicate_of = NULL")
+    conn.commit()
+    ids = [r[0] for r in conn.execute("SELECT id FROM issues WHERE state = 'open' ORDER BY id")]
+    conn.close()
+
+    try:
+        for start in range(0, len(ids), batch_size):
+            index_issues(ids[start:start + batch_size], log_changes=False)
+    finally:
+        # One marker for the whole pass, logged even if it stopped half way
+        conn = database.get_connection()
+        database.log_change_marker(conn, 'relinked')
+        conn.commit()
+        # Later batches can relink issues from earlier ones, so count the final state
+        linked = conn.execute("SELECT COUNT(*) FROM issues WHERE duplicate_of IS NOT NULL").fetchone()[0]
+        conn.close()
+    return linked
+
+if __name__ == "__main__":
+    database.init_db()
+    print(f"Linked {rebuild_index()} issues into duplicate clusters.")
@@ -0,0 +1,243 @@
+"""
+Publishes saved filters as JSON Feed, RSS and Atom for feed readers and bots.
+
+Run with:   python feed_server.py [--port 8766]
+Feeds:      http://127.0.0.1:8766/feeds/<slug>.json | .rss | .atom
+
+Feed bodies are cached in memory and only rebuilt when a write to the database
+changed the feed's items. Responses carry ETag and Last-Modified, so polling
+clients that send If-None-Match / If-Modified-Since get a 304 without a body.
+"""
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+from dotenv import load_dotenv
+
+import database
+
+DEFAULT_PORT = 8766
+FEED_SIZE = 50        # Newest matching issues per feed
+MAX_CACHE_AGE = 300   # Seconds; time-relative filters (only_new) drift without any write
+FEED_COLUMNS = ['id', 'title', 'github_issue_url', 'repo_name', 'labels', 'assignee_login',
+                'comments_count', 'created_at_github', 'last_updated_at', 'body_preview']
+
+CONTENT_TYPES = {
+    'json': "application/feed+json; charset=utf-8",
+    'rss': "application/rss+xml; charset=utf-8",
+    'atom': "application/atom+xml; charset=utf-8",
+}
+
+def _to_datetime(value):
+    """Aware datetime from a GitHub ('...Z') or locally stored timestamp."""
+    if not value:
+        return datetime.now(timezone.utc)
+    dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return dt if dt.tzinfo else dt.astimezone()
+
+def _labels(issue):
+    return [label for label in (issue.labels or "").split(',') if label]
+
+# --- Rendering ---
+
+def render_json(feed, issues, feed_url):
+    return json.dumps({
+        "version": "https://jsonfeed.org/version/1.1",
+        "title": feed['name'],
+        "feed_url": feed_url,
+        "items": [{
+            "id": issue.github_issue_url,
+            "url": issue.github_issue_url,
+            "title": f"[{issue.repo_name}] {issue.title}",
+            "content_text": issue.body_preview or issue.title,
+            "date_published": _to_datetime(issue.created_at_github).isoformat(),
+            "date_modified": _to_datetime(issue.last_updated_at).isoformat(),
+            "tags": _labels(issue),
+        } for issue in issues],
+    }, indent=2)
+
+def render_rss(feed, issues, feed_url):
+    items = "".join(f"""
+    <item>
+      <title>{escape(f"[{issue.repo_name}] {issue.title}")}</title>
+      <link>{escape(issue.github_issue_url)}</link>
+      <guid isPermaLink="true">{escape(issue.github_issue_url)}</guid>
+      <pubDate>{format_datetime(_to_datetime(issue.created_at_github))}</pubDate>
+      <description>{escape(issue.body_preview or issue.title)}</description>
+      {"".join(f"<category>{escape(label)}</category>" for label in _labels(issue))}
+    </item>""" for issue in issues)
+    return f"""<?xml version="1.0" encoding="utf-8"?>
+<rss version="2.0">
+  <channel>
+    <title>{escape(feed['name'])}</title>
+    <link>{escape(feed_url)}</link>
+    <description>{escape(feed['name'])} (GitHub Issue Tracker)</description>{items}
+  </channel>
+</rss>
+"""
+
+def render_atom(feed, issues, feed_url):
+    updated = max((_to_datetime(issue.last_updated_at) for issue in issues), default=_to_datetime(None))
+    entries = "".join(f"""
+  <entry>
+    <title>{escape(f"[{issue.repo_name}] {issue.title}")}</title>
+    <id>{escape(issue.github_issue_url)}</id>
+    <link href="{escape(issue.github_issue_url)}"/>
+    <published>{_to_datetime(issue.created_at_github).isoformat()}</published>
+    <updated>{_to_datetime(issue.last_updated_at).isoformat()}</updated>
+    <summary>{escape(issue.body_preview or issue.title)}</summary>
+    {"".join(f'<category term="{escape(label)}"/>' for label in _labels(issue))}
+  </entry>""" for issue in issues)
+    return f"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>{escape(feed['name'])}</title>
+  <id>{escape(feed_url)}</id>
+  <link rel="self" href="{escape(feed_url)}"/>
+  <updated>{updated.isoformat()}</updated>{entries}
+</feed>
+"""
+
+RENDERERS = {'json': render_json, 'rss': render_rss, 'atom': render_atom}
+
+# --- Cache ---
+
+class FeedCache:
+    """
+    Rendered feeds keyed by (slug, format), each remembering the change log seq it
+    was checked at. Feeds ignore seen state and scores (items are newest first), and
+    duplicate links unless the filter collapses duplicates, so a cached entry is
+    reused while the log only has such entries since then. Otherwise the feed query
+    (FEED_SIZE rows) runs again and the body is rebuilt only if the items differ.
+    """
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self._conn = sqlite3.connect(database.DB_NAME, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def _is_current(self, entry, feed, seq):
+        if entry['feed_id'] != feed['id'] or time.time() - entry['checked_at'] >= MAX_CACHE_AGE:
+            return False
+        if entry['seq'] == seq:
+            return True
+        changes = database.get_changes_since(entry['seq'], conn=self._conn)
+        ignored = database.SEEN_CHANGE_KINDS + ('rescored',)
+        if not feed['filters'].get('collapse_duplicates'):
+            ignored += ('relinked',)
+        return changes is not None and all(c['kind'] in ignored for c in changes)
+
+    def get(self, slug, fmt):
+        """(body, etag, last_modified) for a feed, or None if there is no such feed."""
+        with self._lock:
+            # Saved feeds aren't in the change log; this lookup catches deleted feeds
+            feed = database.get_saved_feed(slug)
+            if feed is None:
+                self._entries.pop((slug, fmt), None)
+                return None
+            seq = database.latest_change_seq(self._conn)
+            entry = self._entries.get((slug, fmt))
+            if entry and self._is_current(entry, feed, seq):
+                entry['seq'] = seq
+                return entry['body'], entry['etag'], entry['last_modified']
+
+            issues = database.get_issues(feed['filters'], columns=FEED_COLUMNS, order_by='created', limit=FEED_SIZE)
+            items_key = hashlib.sha256(json.dumps(
+                [feed['name'], [(i.id, i.title, i.labels, i.body_preview, i.last_updated_at) for i in issues]]
+            ).encode("utf-8")).hexdigest()
+
+            if not entry or entry['items_key'] != items_key:
+                body = RENDERERS[fmt](feed, issues, f"{self.base_url}/feeds/{slug}.{fmt}").encode("utf-8")
+                entry = {
+                    'body': body,
+                    'etag': '"' + hashlib.sha256(body).hexdigest()[:32] + '"',
+                    # HTTP dates have second precision
+                    'last_modified': datetime.now(timezone.utc).replace(microsecond=0),
+                    'items_key': items_key,
+                    'feed_id': feed['id'],
+                }
+                self._entries[(slug, fmt)] = entry
+            entry['seq'] = seq
+            entry['checked_at'] = time.time()
+            return entry['body'], entry['etag'], entry['last_modified']
+
+def is_not_modified(headers, etag, last_modified):
+    """Conditional GET check; If-None-Match takes precedence over If-Modified-Since."""
+    if_none_match = headers.get("If-None-Match")
+    if if_none_match:
+        return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+    if_modified_since = headers.get("If-Modified-Since")
+    if if_modified_since:
+        try:
+            return last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+class FeedHandler(BaseHTTPRequestHandler):
+    cache = None
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if not path.startswith("/feeds/") or "." not in path:
+            self._reply(404, b"not found", "text/plain")
+            return
+        slug, fmt = path[len("/feeds/"):].rsplit(".", 1)
+        if fmt not in RENDERERS:
+            self._reply(404, b"unknown feed format", "text/plain")
+            return
+
+        result = self.cache.get(slug, fmt)
+        if result is None:
+            self._reply(404, b"no such feed", "text/plain")
+            return
+        body, etag, last_modified = result
+        headers = {
+            "ETag": etag,
+            "Last-Modified": format_datetime(last_modified, usegmt=True),
+            "Cache-Control": "max-age=60",
+        }
+        if is_not_modified(self.headers, etag, last_modified):
+            self._reply(304, b"", None, headers)
+        else:
+            self._reply(200, body, CONTENT_TYPES[fmt], headers)
+
+    def _reply(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Feed readers poll constantly; keep the console for errors
+
+def serve(port=DEFAULT_PORT, base_url=None):
+    load_dotenv()
+    database.init_db()
+    FeedHandler.cache = FeedCache(base_url or f"http://127.0.0.1:{port}")
+    server = ThreadingHTTPServer(("127.0.0.1", port), FeedHandler)
+    print(f"Serving feeds on http://127.0.0.1:{port}/feeds/<slug>.json|.rss|.atom")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve saved filters as JSON Feed/RSS/Atom")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--base-url", help="Public URL of this server, used for feed self links")
+    args = parser.parse_args()
+    serve(args.port, args.base_url)
@@ -1,10 +1,19 @@
 import requests
 import time
 import os
-from typing import List, Dict, Optional
+import random
+import json
+import hashlib
+import sqlite3
+from typing import List, Dict, Iterator, Optional
+from models import Issue
 
 # Constants
 GITHUB_API_URL = "https://api.github.com/repos"
+GITHUB_SEARCH_URL = "https://api.github.com/search/issues"
+MAX_PAGES = 5                  # Pages of 100 issues fetched per repository (and label)
+SEARCH_QUERY_MAX_LENGTH = 256  # GitHub rejects longer search queries
+SEARCH_MAX_RESULTS = 1000      # Search API never returns more than this per query
 GOOD_FIRST_ISSUE_LABELS = {
     "good first issue",
     "good-first-issue",
@@ -20,16 +29,144 @@ GOOD_FIRST_ISSUE_LABELS = {
     "starter bug"
 }
 
+# --- NEW: Response cache ---
+# Repo metadata barely changes, so responses are kept in a small SQLite cache keyed
+# by URL and token. Expired entries are revalidated with their ETag; GitHub does not
+# charge quota for a 304.
+
+CACHE_DB_NAME = "http_cache.db"
+CACHE_MAX_ENTRIES = 5000
+CACHE_MAX_BYTES = 20 * 1024 * 1024
+CACHE_TTLS = {
+    "repo": 6 * 3600,         # /repos/{owner}/{repo}
+    "default": 15 * 60,
+}
+CACHE_MISSING_TTL = 10 * 60   # 404s are cached briefly so typos don't hammer the API
+
+_cache_ready = False
+
+def _cache_connection():
+    global _cache_ready
+    conn = sqlite3.connect(CACHE_DB_NAME)
+    if not _cache_ready:
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS http_cache (
+            cache_key TEXT PRIMARY KEY,
+            status_code INTEGER NOT NULL,
+            body TEXT,
+            etag TEXT,
+            size INTEGER NOT NULL,
+            expires_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        );
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_http_cache_last_access ON http_cache (last_access)")
+        conn.commit()
+        _cache_ready = True
+    return conn
+
+def _cache_key(url: str, token: str) -> str:
+    # Responses can differ by token (private repos), but the token itself is never stored
+    scope = hashlib.sha256((token or "").encode()).hexdigest()[:16]
+    return f"{scope}:{url}"
+
+def _cache_ttl(endpoint: str, status_code: int) -> int:
+    if status_code == 404:
+        return CACHE_MISSING_TTL
+    return CACHE_TTLS.get(endpoint, CACHE_TTLS["default"])
+
+def _evict(conn):
+    """Drops least recently used entries beyond the entry and size limits."""
+    conn.execute("""
+        DELETE FROM http_cache WHERE cache_key IN (
+            SELECT cache_key FROM http_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+        )
+    """, (CACHE_MAX_ENTRIES,))
+
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_cache").fetchone()[0]
+    if total > CACHE_MAX_BYTES:
+        freed = 0
+        victims = []
+        for key, size in conn.execute("SELECT cache_key, size FROM http_cache ORDER BY last_access"):
+            victims.append((key,))
+            freed += size
+            if total - freed <= CACHE_MAX_BYTES:
+                break
+        conn.executemany("DELETE FROM http_cache WHERE cache_key = ?", victims)
+
+def cached_get(url: str, token: str, endpoint: str = "default", timeout: int = 5):
+    """
+    GET with the persistent response cache.
+    Only 200 and 404 responses are cached.
+    Returns: (status_code, parsed JSON body or None)
+    """
+    key = _cache_key(url, token)
+    now = time.time()
+    conn = _cache_connection()
+    try:
+        row = conn.execute(
+            "SELECT status_code, body, etag, expires_at FROM http_cache WHERE cache_key = ?", (key,)
+        ).fetchone()
+
+        if row and row[3] > now:
+            conn.execute("UPDATE http_cache SET last_access = ? WHERE cache_key = ?", (now, key))
+            conn.commit()
+            return row[0], json.loads(row[1]) if row[1] else None
+
+        headers = {
+            "Authorization": f"token {token}",
+            "Accept": "application/vnd.github.v3+json"
+        }
+        if row and row[2]:
+            headers["If-None-Match"] = row[2]
+
+        response = get_with_retry(url, headers, timeout=timeout)
+
+        if response.status_code == 304 and row:
+            # Still fresh upstream: extend the entry without spending quota
+            conn.execute(
+                "UPDATE http_cache SET expires_at = ?, last_access = ? WHERE cache_key = ?",
+                (now + _cache_ttl(endpoint, row[0]), now, key)
+            )
+            conn.commit()
+            return row[0], json.loads(row[1]) if row[1] else None
+
+        if response.status_code not in (200, 404):
+            return response.status_code, None
+
+        body = response.text if response.status_code == 200 else None
+        conn.execute("""
+            INSERT OR REPLACE INTO http_cache (cache_key, status_code, body, etag, size, expires_at, last_access)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (
+            key, response.status_code, body, response.headers.get("ETag"), len(body or ""),
+            now + _cache_ttl(endpoint, response.status_code), now
+        ))
+        _evict(conn)
+        conn.commit()
+        return response.status_code, json.loads(body) if body else None
+    finally:
+        conn.close()
+
+def get_repo_metadata(owner: str, repo: str, token: str) -> Optional[Dict]:
+    """
+    Returns cached metadata for a repository, or None if it doesn't exist.
+    full_name reflects the redirect target if the repository was renamed.
+    """
+    status_code, data = cached_get(f"{GITHUB_API_URL}/{owner}/{repo}", token, endpoint="repo")
+    if status_code != 200 or not data:
+        return None
+    return {
+        "full_name": data.get('full_name'),
+        "default_branch": data.get('default_branch'),
+        "archived": data.get('archived', False),
+        "open_issues_count": data.get('open_issues_count', 0),
+    }
+
 def validate_repo(owner: str, repo: str, token: str) -> bool:
     """Checks if a repository exists on GitHub and is accessible."""
-    url = f"{GITHUB_API_URL}/{owner}/{repo}"
-    headers = {
-        "Authorization": f"token {token}",
-        "Accept": "application/vnd.github.v3+json"
-    }
     try:
-        response = requests.get(url, headers=headers, timeout=5)
-        return response.status_code == 200
+        return get_repo_metadata(owner, repo, token) is not None
     except:
         return False
 
@@ -39,6 +176,59 @@ class GitHubAPIError(Exception):
 class RateLimitExceededError(GitHubAPIError):
     pass
 
+class RepositoryNotFoundError(GitHubAPIError):
+    """The repository (or its issue tracker) is gone; retrying won't help."""
+    pass
+
+class InvalidSearchQueryError(GitHubAPIError):
+    """The search API rejected a query, usually over a repo: qualifier that no longer resolves."""
+    pass
+
+# --- NEW: Retries ---
+# Timeouts, connection errors, 5xx and secondary rate limits are usually transient,
+# so they are retried with jittered exponential backoff. 404s and an exhausted
+# quota are not retried: that only burns time.
+
+MAX_RETRIES = 3
+RETRY_BASE_DELAY = 1.0   # Seconds; doubles on every attempt
+RETRY_MAX_DELAY = 30.0
+TRANSIENT_STATUS_CODES = {429, 500, 502, 503, 504}
+
+def _is_transient(response) -> bool:
+    if response.status_code in TRANSIENT_STATUS_CODES:
+        return True
+    # Secondary rate limits are 403s that carry Retry-After and clear quickly
+    return response.status_code == 403 and "Retry-After" in response.headers
+
+def _backoff_delay(attempt: int, response=None) -> float:
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), RETRY_MAX_DELAY)
+    # Full jitter keeps parallel clients from retrying in lockstep
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+def get_with_retry(url: str, headers: Dict, params: Optional[Dict] = None, timeout: int = 10,
+                   max_retries: int = MAX_RETRIES) -> requests.Response:
+    """
+    requests.get with retries for transient failures.
+    Returns the last response (callers still check its status code); re-raises the
+    timeout/connection error if every attempt failed that way.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            response = requests.get(url, headers=headers, params=params, timeout=timeout)
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            if attempt == max_retries:
+                raise
+            print(f"{type(e).__name__} for {url}, retrying ({attempt + 1}/{max_retries})...")
+            time.sleep(_backoff_delay(attempt))
+            continue
+
+        if not _is_transient(response) or attempt == max_retries:
+            return response
+        print(f"HTTP {response.status_code} for {url}, retrying ({attempt + 1}/{max_retries})...")
+        time.sleep(_backoff_delay(attempt, response))
+
 def is_good_first_issue(labels: List[Dict]) -> bool:
     """Checks if any label matches the 'good first issue' keywords."""
     for label in labels:
@@ -46,7 +236,86 @@ def is_good_first_issue(labels: List[Dict]) -> bool:
             return True
     return False
 
-def fetch_repo_issues(owner: str, repo: str, token: str) -> List[Dict]:
+def process_issue(item: Dict) -> Issue:
+    """Transforms a raw GitHub issue payload into the record stored in the DB."""
+    labels_list = [l['name'] for l in item.get('labels', [])]
+    assignees = item.get('assignees', [])
+
+    return Issue(
+        github_issue_id=item['number'],
+        github_issue_url=item['html_url'],
+        title=item['title'],
+        state=item['state'],
+        labels=",".join(labels_list),
+        is_assigned=len(assignees) > 0,
+        assignee_login=assignees[0]['login'] if assignees else None,
+        comments_count=item['comments'],
+        created_at_github=item['created_at'],
+        body_preview=(item.get('body') or "")[:200],
+        body=item.get('body') or "",
+        is_good_first_issue=is_good_first_issue(item.get('labels', []))
+    )
+
+def iter_issue_pages(owner: str, repo: str, token: str, labels: Optional[List[str]] = None,
+                     max_pages: int = MAX_PAGES) -> Iterator[List[Dict]]:
+    """
+    Yields raw pages (lists of GitHub issue payloads) of open issues, following
+    pagination up to max_pages per label scope. Pull requests are not filtered here.
+
+    Transient failures are retried (see get_with_retry). Raises
+    RepositoryNotFoundError for a missing repository or disabled issue tracker and
+    RateLimitExceededError/GitHubAPIError on other API errors.
+    """
+    url = f"{GITHUB_API_URL}/{owner}/{repo}/issues"
+    headers = {
+        "Authorization": f"token {token}",
+        "Accept": "application/vnd.github.v3+json"
+    }
+    # GitHub ANDs comma-separated labels, so OR semantics need a request per label
+    label_scopes = labels or [None]
+
+    for label in label_scopes:
+        params = {
+            "state": "open",
+            "per_page": 100,
+            "sort": "created",
+            "direction": "desc"
+        }
+        if label:
+            params["labels"] = label
+        page_url = url
+
+        for _ in range(max_pages):
+            # Respectful delay
+            time.sleep(1)
+
+            response = get_with_retry(page_url, headers, params=params, timeout=10)
+
+            if response.status_code == 200:
+                yield response.json()
+
+            elif response.status_code == 403:
+                # Check for specific rate limit message
+                if "rate limit" in response.text.lower():
+                    raise RateLimitExceededError("GitHub API rate limit exceeded.")
+                else:
+                    raise GitHubAPIError(f"Access Forbidden: {response.text}")
+
+            elif response.status_code in (404, 410):
+                # 410 means the repository has issues disabled
+                raise RepositoryNotFoundError(f"Repository {owner}/{repo} not found ({response.status_code}).")
+
+            else:
+                raise GitHubAPIError(f"Error fetching issues: {response.status_code} - {response.text}")
+
+            # The 'next' link already carries the query string
+            next_link = response.links.get('next')
+            if not next_link:
+                break
+            page_url = next_link['url']
+            params = None
+
+def fetch_repo_issues(owner: str, repo: str, token: str, labels: Optional[List[str]] = None) -> List[Issue]:
     """
     Fetches open issues from a GitHub repository.
     
@@ -54,79 +323,147 @@ def fetch_repo_issues(owner: str, repo: str, token: str) -> List[Dict]:
         owner: GitHub owner (e.g., 'huggingface')
         repo: Repository name (e.g., 'transformers')
         token: GitHub Personal Access Token
+        labels: Optional label scope. When given, GitHub filters server-side with
+            one request per label and the results are merged.
         
     Returns:
-        List of dictionaries containing processed issue data.
+        List of Issue records.
+
+    Raises:
+        GitHubAPIError (or a subclass), or the final requests timeout/connection
+        error once retries are exhausted, so callers can tell a failed fetch apart
+        from a repository with no open issues.
+    """
+    processed_issues = {}
+
+    for page in iter_issue_pages(owner, repo, token, labels):
+        for item in page:
+            # Skip Pull Requests (GitHub API returns PRs as issues)
+            if 'pull_request' in item:
+                continue
+            # Issues with several tracked labels come back once per label
+            if item['number'] not in processed_issues:
+                processed_issues[item['number']] = process_issue(item)
+
+    return list(processed_issues.values())
+
+# --- NEW: Search-based discovery ---
+
+def _build_search_batches(repo_names: List[str], base_query: str) -> List[List[str]]:
+    """Packs repo: qualifiers into as few queries as the search length limit allows."""
+    batches = []
+    current = []
+    length = len(base_query)
+    for name in repo_names:
+        qualifier = f" repo:{name}"
+        if current and length + len(qualifier) > SEARCH_QUERY_MAX_LENGTH:
+            batches.append(current)
+            current = []
+            length = len(base_query)
+        current.append(name)
+        length += len(qualifier)
+    if current:
+        batches.append(current)
+    return batches
+
+def _search_batch(repo_names: List[str], base_query: str, headers: Dict, allow_truncated: bool = False) -> Optional[List[Dict]]:
+    """
+    Runs one paginated search query for a batch of repositories.
+    Returns None if the batch matched more results than the search API will page
+    through, unless allow_truncated is set.
+    """
+    query = base_query + "".join(f" repo:{name}" for name in repo_names)
+    items = []
+    page = 1
+
+    while True:
+        # The search API has a much lower rate limit than the core API
+        time.sleep(2)
+
+        params = {"q": query, "per_page": 100, "page": page, "sort": "created", "order": "desc"}
+        response = get_with_retry(GITHUB_SEARCH_URL, headers, params=params, timeout=10)
+
+        if response.status_code == 403 or response.status_code == 429:
+            if "rate limit" in response.text.lower():
+                raise RateLimitExceededError("GitHub search rate limit exceeded.")
+            raise GitHubAPIError(f"Access Forbidden: {response.text}")
+        elif response.status_code == 422:
+            raise InvalidSearchQueryError(f"Invalid search query: {response.text}")
+        elif response.status_code != 200:
+            raise GitHubAPIError(f"Error searching issues: {response.status_code} - {response.text}")
+
+        data = response.json()
+        total = data.get('total_count', 0)
+        if total > SEARCH_MAX_RESULTS and not allow_truncated:
+            return None
+
+        page_items = data.get('items', [])
+        items.extend(page_items)
+        if len(page_items) < 100 or len(items) >= min(total, SEARCH_MAX_RESULTS):
+            return items
+        page += 1
+
+def search_good_first_issues(repo_names: List[str], token: str, label: str = "good first issue"):
+    """
+    Finds open issues carrying `label` across many repositories using the search API.
+
+    Instead of one issues request per repository, repo: qualifiers are batched into
+    a handful of paginated search queries. A failing batch doesn't sink the others:
+    a rejected query is split until the offending repository is isolated, other
+    errors fail just that batch, and a rate limit fails everything not yet searched.
+
+    Returns:
+        (results, errors): results maps lower-cased 'owner/repo' to a list of Issue
+        records for every repository that was searched; errors maps the lower-cased
+        names of the repositories that couldn't be searched to the error message.
     """
-    url = f"{GITHUB_API_URL}/{owner}/{repo}/issues"
     headers = {
         "Authorization": f"token {token}",
         "Accept": "application/vnd.github.v3+json"
     }
-    params = {
-        "state": "open",
-        "per_page": 100,
-        "sort": "created",
-        "direction": "desc"
-    }
+    base_query = f'label:"{label}" is:issue is:open'
+    results = {name.lower(): [] for name in repo_names}
+    errors = {}
 
-    try:
-        # Respectful delay
-        time.sleep(1)
-        
-        response = requests.get(url, headers=headers, params=params, timeout=10)
-        
-        if response.status_code == 200:
-            issues_data = response.json()
-            processed_issues = []
-            
-            for item in issues_data:
-                # Skip Pull Requests (GitHub API returns PRs as issues)
-                if 'pull_request' in item:
-                    continue
-                    
-                labels_list = [l['name'] for l in item.get('labels', [])]
-                assignees = item.get('assignees', [])
-                
-                processed_issue = {
-                    "github_issue_id": item['number'],
-                    "github_issue_url": item['html_url'],
-                    "title": item['title'],
-                    "state": item['state'],
-                    "labels": ",".join(labels_list),
-                    "is_assigned": len(assignees) > 0,
-                    "assignee_login": assignees[0]['login'] if assignees else None,
-                    "comments_count": item['comments'],
-                    "created_at_github": item['created_at'],
-                    "body_preview": (item.get('body') or "")[:200],
-                    "is_good_first_issue": is_good_first_issue(item.get('labels', []))
-                }
-                
-                processed_issues.append(processed_issue)
-                
-            return processed_issues
-            
-        elif response.status_code == 403:
-            # Check for specific rate limit message
-            if "rate limit" in response.text.lower():
-                raise RateLimitExceededError("GitHub API rate limit exceeded.")
+    def fail(names, error):
+        for name in names:
+            results.pop(name.lower(), None)
+            errors[name.lower()] = str(error)
+
+    pending = _build_search_batches(repo_names, base_query)
+    while pending:
+        batch = pending.pop(0)
+        try:
+            items = _search_batch(batch, base_query, headers, allow_truncated=len(batch) == 1)
+        except RateLimitExceededError as e:
+            # Every later query would hit the same limit
+            fail([name for names in [batch] + pending for name in names], e)
+            break
+        except InvalidSearchQueryError as e:
+            if len(batch) == 1:
+                fail(batch, e)
             else:
-                raise GitHubAPIError(f"Access Forbidden: {response.text}")
-                
-        elif response.status_code == 404:
-            print(f"Warning: Repository {owner}/{repo} not found.")
-            return []
-            
-        else:
-            raise GitHubAPIError(f"Error fetching issues: {response.status_code} - {response.text}")
-
-    except requests.exceptions.Timeout:
-        print(f"Timeout fetching {owner}/{repo}. Retrying...")
-        # Simple retry logic could go here, for now just failing gracefully
-        return []
-    except Exception as e:
-        print(f"Unexpected error for {owner}/{repo}: {str(e)}")
-        return []
+                # Split until the repository that breaks the query is on its own
+                mid = len(batch) // 2
+                pending[:0] = [batch[:mid], batch[mid:]]
+            continue
+        except (GitHubAPIError, requests.exceptions.RequestException) as e:
+            fail(batch, e)
+            continue
+
+        if items is None:
+            # Too many matches to page through, split the batch and try again
+            mid = len(batch) // 2
+            pending[:0] = [batch[:mid], batch[mid:]]
+            continue
+
+        for item in items:
+            # repository_url looks like https://api.github.com/repos/{owner}/{repo}
+            full_name = item['repository_url'].split("/repos/", 1)[-1].lower()
+            if full_name in results:
+                results[full_name].append(process_issue(item))
+
+    return results, errors
 
 if __name__ == "__main__":
     # Test block
@@ -141,4 +478,4 @@ if __name__ == "__main__":
         issues = fetch_repo_issues("streamlit", "streamlit", token)
         print(f"Found {len(issues)} issues.")
         if issues:
-            print("Sample Issue:", issues[0]['title'])
+            print("Sample Issue:", issues[0].title)
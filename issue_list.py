@@ -0,0 +1,34 @@
+"""
+Issue list as a single custom component.
+
+Only the loaded pages of the result set are sent to the browser; the component
+keeps just the cards inside its scroll window in the DOM and reports card actions
+back as one event ({action: 'seen' | 'details' | 'more', ids: [...], nonce}).
+'more' asks for the next page once the user scrolls to the last loaded card.
+"""
+import os
+
+import streamlit.components.v1 as components
+
+CARD_HEIGHT = 210    # Fixed row height in px, needed to position cards without measuring them
+TOOLBAR_HEIGHT = 40
+MAX_HEIGHT = 900     # Frame height cap; longer lists scroll inside the component
+
+_component = components.declare_component(
+    "issue_list",
+    path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend", "issue_list")
+)
+
+def issue_list(cards, total=None, expanded=(), css="", key=None, on_change=None):
+    """
+    Renders the cards (dicts with id, title, url, repo, labels, assignee, comments,
+    first_seen, is_new, duplicate_count, seen) and returns the last card action.
+    total: number of matching issues when cards is only the first pages of them.
+    """
+    total = len(cards) if total is None else total
+    height = min(TOOLBAR_HEIGHT + total * CARD_HEIGHT, MAX_HEIGHT)
+    return _component(
+        cards=cards, total=total, expanded=sorted(expanded), css=css,
+        card_height=CARD_HEIGHT, height=height,
+        key=key, on_change=on_change, default=None
+    )
@@ -1,5 +1,7 @@
 import time
 import os
+import queue
+import threading
 from datetime import datetime, timedelta
 import database
 import github_client
@@ -7,20 +9,214 @@ import github_client
 # Expose for app.py
 validate_repo = github_client.validate_repo
 
+def get_repo_metadata(owner, repo, token):
+    """Cached repo metadata for the UI; None if missing or GitHub is unreachable."""
+    try:
+        return github_client.get_repo_metadata(owner, repo, token)
+    except Exception as e:
+        print(f"Metadata lookup failed for {owner}/{repo}: {str(e)}")
+        return None
+
+_env_loaded = False
+
+def load_env():
+    """Loads .env into the environment once per process."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
 def get_github_token():
     # Priority: 1. Streamlit Secrets, 2. Environment Variable
     import streamlit as st
-    if hasattr(st, "secrets") and "GITHUB_TOKEN" in st.secrets:
-        return st.secrets["GITHUB_TOKEN"]
+    try:
+        if hasattr(st, "secrets") and "GITHUB_TOKEN" in st.secrets:
+            return st.secrets["GITHUB_TOKEN"]
+    except Exception:
+        # No secrets.toml (e.g. running outside `streamlit run`)
+        pass
         
-    from dotenv import load_dotenv
-    load_dotenv()
+    load_env()
     return os.getenv("GITHUB_TOKEN")
 
+def parse_labels(text):
+    """Splits a comma-separated label string into a clean list."""
+    if not text:
+        return []
+    return [l.strip() for l in text.split(',') if l.strip()]
+
+# --- Refresh pipeline ---
+# fetch -> transform -> write run as three stages connected by bounded queues, so
+# SQLite writes overlap with HTTP waits instead of following them.
+
+PIPELINE_QUEUE_SIZE = 4  # Max pages/batches buffered between stages (backpressure)
+_DONE = object()         # End-of-stream marker passed down the pipeline
+
+def _put(q, item, stop):
+    """Blocking put that gives up once another stage has failed."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _get(q, stop):
+    """Blocking get that gives up once another stage has failed."""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _DONE
+
+def _run_refresh_pipeline(repo, token):
+    """
+    Streams a repository's issues from GitHub into the DB.
+    Returns dict with {new, updated, unchanged, total} or {error}.
+    """
+    raw_pages = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    batches = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    stop = threading.Event()
+    errors = []
+    counts = {"new": 0, "updated": 0, "unchanged": 0, "total": 0}
+
+    def fetch_stage():
+        try:
+            for page in github_client.iter_issue_pages(
+                repo['github_owner'], repo['github_repo'], token,
+                labels=parse_labels(repo['tracked_labels'])
+            ):
+                if not _put(raw_pages, page, stop):
+                    return
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(raw_pages, _DONE, stop)
+
+    def transform_stage():
+        seen_numbers = set()
+        try:
+            while True:
+                page = _get(raw_pages, stop)
+                if page is _DONE:
+                    break
+                batch = []
+                for item in page:
+                    # Skip Pull Requests and issues already returned for another label
+                    if 'pull_request' in item or item['number'] in seen_numbers:
+                        continue
+                    seen_numbers.add(item['number'])
+                    batch.append(github_client.process_issue(item))
+                if batch and not _put(batches, batch, stop):
+                    return
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(batches, _DONE, stop)
+
+    def write_stage():
+        # Single writer: one connection, one commit per batch
+        conn = database.get_connection()
+        try:
+            while True:
+                batch = _get(batches, stop)
+                if batch is _DONE:
+                    break
+                result = database.upsert_issues(repo['id'], batch, conn=conn)
+                counts["new"] += result['new']
+                counts["updated"] += result['updated']
+                counts["unchanged"] += result['unchanged']
+                counts["total"] += len(batch)
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            conn.close()
+
+    stages = [threading.Thread(target=fn, daemon=True) for fn in (fetch_stage, transform_stage, write_stage)]
+    for t in stages:
+        t.start()
+    for t in stages:
+        t.join()
+
+    if errors:
+        return {"error": str(errors[0]), "exception": errors[0]}
+    return counts
+
+def post_sync(repo_id, since):
+    """
+    Derived data for issues a sync wrote since `since`: scores and duplicate links.
+    Only issues the sync actually wrote are touched, plus open issues still missing
+    a score or signature (e.g. a crash between the write and this step).
+    """
+    # Imported lazily: pandas/NumPy add ~0.5s to startup and are only needed after a sync
+    import scoring
+    import dedup
+    scoring.rescore_changed(repo_id, since)
+    dedup.index_changed(repo_id, since)
+
+FULL_RESCORE_INTERVAL = timedelta(hours=1)
+
+def rescore_if_due(now=None):
+    """
+    Freshness and repo activity decay with time, not only when an issue changes,
+    so every score is recomputed once FULL_RESCORE_INTERVAL has passed since the
+    last full pass (its 'rescored' marker). Returns the number of changed scores,
+    or None if the pass wasn't due.
+    """
+    last = _parse_timestamp(database.last_change_marker_at('rescored'))
+    if last and (now or datetime.now()) - last < FULL_RESCORE_INTERVAL:
+        return None
+    import scoring
+    return scoring.rescore_all()
+
+def _parse_timestamp(value):
+    """datetime from a stored timestamp, or None if missing/unparseable."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+# --- Circuit breaker ---
+# Repos that keep failing are skipped by batch refreshes for a growing cooldown, and
+# repos that keep returning 404 are deactivated, so they stop costing time and quota.
+
+BREAKER_THRESHOLD = 3                        # Consecutive failures before the breaker opens
+BREAKER_BASE_COOLDOWN = timedelta(minutes=30)
+BREAKER_MAX_COOLDOWN = timedelta(hours=24)
+DEACTIVATE_AFTER_NOT_FOUND = 3               # Consecutive 404s before is_active is cleared
+
+def breaker_open_until(repo):
+    """The datetime the repo's breaker stays open until, or None if it is closed."""
+    until = _parse_timestamp(repo.get('breaker_open_until'))
+    return until if until and until > datetime.now() else None
+
+def _record_failure(repo, error):
+    if isinstance(error, github_client.RateLimitExceededError):
+        # Quota is shared by every repo; it says nothing about this one
+        return
+    not_found = isinstance(error, github_client.RepositoryNotFoundError)
+    failures, not_found_count = database.record_repository_failure(repo['id'], str(error), not_found)
+
+    if not_found_count >= DEACTIVATE_AFTER_NOT_FOUND:
+        print(f"Deactivating {repo['full_name']}: not found {not_found_count} times in a row.")
+        database.set_repository_active(repo['id'], False)
+    elif failures >= BREAKER_THRESHOLD:
+        cooldown = min(BREAKER_MAX_COOLDOWN, BREAKER_BASE_COOLDOWN * 2 ** (failures - BREAKER_THRESHOLD))
+        print(f"Opening circuit for {repo['full_name']} for {cooldown} after {failures} failures.")
+        database.set_repository_breaker(repo['id'], datetime.now() + cooldown)
+
 def refresh_repository(repo_id: int):
     """
     Refreshes a single repository.
-    Returns dict with stats: {new, updated, errors}
+    Returns dict with stats: {new, updated, unchanged, total, repo_name} or {error}
     """
     repo = database.get_repository(repo_id)
     if not repo:
@@ -32,91 +228,271 @@ def refresh_repository(repo_id: int):
         
     print(f"Refreshing {repo['full_name']}...")
     
-    # Fetch from GitHub
-    try:
-        issues = github_client.fetch_repo_issues(repo['github_owner'], repo['github_repo'], token)
-    except Exception as e:
-        return {"error": str(e)}
-        
-    new_count = 0
-    updated_count = 0
-    
-    # Sync with DB
-    for issue in issues:
-        result = database.upsert_issue(repo_id, issue)
-        if result == 'new':
-            new_count += 1
-        elif result == 'updated':
-            updated_count += 1
+    # Fetch from GitHub and sync with DB
+    sync_started = datetime.now()
+    result = _run_refresh_pipeline(repo, token)
+    if "error" in result:
+        # Pages written before the failure still need their scores and duplicate links;
+        # a retry sees them as unchanged and wouldn't select them by last_updated_at
+        post_sync(repo_id, sync_started)
+        _record_failure(repo, result["exception"])
+        # A missing repository won't reappear within the same run
+        retryable = not isinstance(result["exception"], github_client.RepositoryNotFoundError)
+        return {"error": result["error"], "retryable": retryable}
+
+    post_sync(repo_id, sync_started)
+    _record_churn(repo, result, sync_started)
             
     # Update repo timestamp
-    database.update_repo_timestamp(repo_id, len(issues))
+    database.update_repo_timestamp(repo_id, result["total"])
+    database.record_repo_snapshot(repo_id)
     
     return {
-        "new": new_count,
-        "updated": updated_count,
-        "total": len(issues),
+        "new": result["new"],
+        "updated": result["updated"],
+        "unchanged": result["unchanged"],
+        "total": result["total"],
         "repo_name": repo['full_name']
     }
 
-def refresh_category(category_id: int, progress_callback=None):
-    """
-    Refreshes all active repos in a category.
-    progress_callback: function(current, total, status_text)
-    """
-    repos = database.get_repositories(category_id, active_only=True)
+# Repos that push updates via webhooks are only polled for an occasional reconciliation
+RECONCILE_INTERVAL = timedelta(hours=24)
+
+def needs_polling(repo):
+    """False for webhook-enabled repos whose last full refresh is recent enough."""
+    last = _parse_timestamp(repo['last_refreshed_at'])
+    if not repo['webhook_enabled'] or not last:
+        return True
+    return datetime.now() - last >= RECONCILE_INTERVAL
+
+# --- Adaptive refresh cadence ---
+# Each refresh updates an exponentially weighted rate of new+changed issues per hour.
+# A repo is next due once about TARGET_CHANGES_PER_REFRESH changes are expected, so
+# busy repos are polled often and quiet ones rarely, for the same total quota.
+
+CHURN_EWMA_ALPHA = 0.3                         # Weight of the latest observation
+TARGET_CHANGES_PER_REFRESH = 3
+DEFAULT_REFRESH_INTERVAL = timedelta(hours=1)  # Until a repo has a measured rate
+MIN_REFRESH_INTERVAL = timedelta(minutes=15)
+MAX_REFRESH_INTERVAL = timedelta(hours=24)
+
+def refresh_interval(churn_rate):
+    """Time until the next refresh for a repo changing churn_rate issues per hour."""
+    if churn_rate is None:
+        return DEFAULT_REFRESH_INTERVAL
+    if churn_rate <= 0:
+        return MAX_REFRESH_INTERVAL
+    interval = timedelta(hours=TARGET_CHANGES_PER_REFRESH / churn_rate)
+    return max(MIN_REFRESH_INTERVAL, min(MAX_REFRESH_INTERVAL, interval))
+
+def _record_churn(repo, result, refreshed_at):
+    """Folds one refresh's changes into the repo's churn rate and schedules the next one."""
+    rate = repo['churn_rate']
+    elapsed_hours = None
+    last = _parse_timestamp(repo['last_refreshed_at'])
+    # The first refresh sees every issue as new, which says nothing about churn
+    if last:
+        elapsed_hours = max((refreshed_at - last).total_seconds() / 3600, 1 / 60)
+        observed = (result['new'] + result['updated']) / elapsed_hours
+        rate = observed if rate is None else CHURN_EWMA_ALPHA * observed + (1 - CHURN_EWMA_ALPHA) * rate
+    database.record_repo_churn(
+        repo['id'], result['new'], result['updated'], elapsed_hours, rate,
+        refreshed_at + refresh_interval(rate)
+    )
+
+def is_due(repo):
+    """Whether a batch refresh should include this repo now."""
+    if repo['webhook_enabled']:
+        return needs_polling(repo)
+    due = _parse_timestamp(repo['next_refresh_due_at'])
+    return due is None or due <= datetime.now()
+
+# --- Refresh jobs ---
+# Multi-repo refreshes run as persistent jobs (see database.create_refresh_job), so a
+# restart or closed tab resumes where it stopped instead of starting over.
+
+MAX_TASK_ATTEMPTS = 3                     # Tries per repository within one job
+JOB_RESUME_WINDOW = timedelta(hours=24)   # Older unfinished jobs are dropped, not resumed
+
+def _start_or_resume_job(scope, repos):
+    """Returns the id of the unfinished job for scope, or of a new one over repos."""
+    job = database.get_unfinished_refresh_job(scope)
+    if job:
+        created = _parse_timestamp(job['created_at']) or datetime.min
+        if datetime.now() - created < JOB_RESUME_WINDOW:
+            print(f"Resuming refresh job {job['id']} ({scope})...")
+            return job['id']
+        database.cancel_refresh_job(job['id'])
+    return database.create_refresh_job(scope, [r['id'] for r in repos])
+
+def _job_stats(job_id):
+    """Totals over the whole job, including work done before a resume."""
+    job = database.get_refresh_job(job_id)
     stats = {
+        "job_id": job_id,
+        "cancelled": job['status'] == 'cancelled',
         "total_new": 0,
         "total_updated": 0,
+        "total_unchanged": 0,
         "repos_processed": 0,
         "repos_failed": 0,
         "details": []
     }
-    
-    for i, repo in enumerate(repos):
+    for task in database.get_refresh_job_results(job_id):
+        if task['status'] == 'done':
+            stats["repos_processed"] += 1
+            stats["total_new"] += task['new_count']
+            stats["total_updated"] += task['updated_count']
+            stats["total_unchanged"] += task['unchanged_count']
+        elif task['status'] == 'failed':
+            stats["repos_failed"] += 1
+            stats["details"].append(f"Failed {task['full_name'] or task['repository_id']}: {task['error']}")
+    return stats
+
+def run_refresh_job(job_id, progress_callback=None):
+    """
+    Works through a job's remaining tasks. Safe to call again after an interruption:
+    finished repositories are skipped, and every stage of refresh_repository is
+    idempotent (content-hash upserts, recomputed scores and duplicate links,
+    timestamp update), so re-running a half-finished repository is harmless.
+    Stops early if the job is cancelled from another session.
+    """
+    database.reset_running_tasks(job_id)
+
+    while True:
+        task = database.claim_refresh_task(job_id)
+        if task is None:
+            break
+
+        repo = database.get_repository(task['repository_id'])
         if progress_callback:
-            progress_callback(i, len(repos), f"Refreshing {repo['full_name']}...")
-            
-        result = refresh_repository(repo['id'])
-        
+            job = database.get_refresh_job(job_id)
+            finished = job['tasks'].get('done', 0) + job['tasks'].get('failed', 0)
+            name = repo['full_name'] if repo else f"repository {task['repository_id']}"
+            progress_callback(finished, job['total_tasks'], f"Refreshing {name}...")
+
+        # The breaker may have opened after the job was created (e.g. on an earlier attempt)
+        open_until = breaker_open_until(repo) if repo else None
+        if open_until or (repo and not repo['is_active']):
+            reason = f"circuit open until {open_until:%H:%M}" if open_until else "repository deactivated"
+            database.finish_refresh_task(job_id, task['repository_id'], error=f"Skipped: {reason}")
+            continue
+
+        try:
+            result = refresh_repository(task['repository_id'])
+        except Exception as e:
+            result = {"error": str(e)}
+
         if "error" in result:
-            stats["repos_failed"] += 1
-            stats["details"].append(f"Failed {repo['full_name']}: {result['error']}")
+            retry = result.get("retryable", True) and task['attempts'] < MAX_TASK_ATTEMPTS
+            database.finish_refresh_task(job_id, task['repository_id'], error=result['error'], retry=retry)
         else:
-            stats["repos_processed"] += 1
-            stats["total_new"] += result["new"]
-            stats["total_updated"] += result["updated"]
-            
+            database.finish_refresh_task(job_id, task['repository_id'], result=result)
+
         # Small delay to be safe between repos if not handled in client
         time.sleep(0.5)
-        
-    return stats
 
-def refresh_all(progress_callback=None):
+    database.finish_refresh_job(job_id)
+    rescore_if_due()
+    database.compact_changes()
+    return _job_stats(job_id)
+
+def cancel_refresh(scope=None):
+    """Cancels the unfinished refresh job for scope (any scope if None)."""
+    job = database.get_unfinished_refresh_job(scope)
+    if job:
+        database.cancel_refresh_job(job['id'])
+
+def next_due_at():
+    """Earliest time an active repository becomes due for a batch refresh, or None."""
+    due_times = []
+    for repo in database.get_repositories(active_only=True):
+        if repo['webhook_enabled']:
+            last = _parse_timestamp(repo['last_refreshed_at'])
+            due = last + RECONCILE_INTERVAL if last else None
+        else:
+            due = _parse_timestamp(repo['next_refresh_due_at'])
+        due = due or datetime.now()
+        open_until = breaker_open_until(repo)
+        due_times.append(max(due, open_until) if open_until else due)
+    return min(due_times, default=None)
+
+def refresh_category(category_id: int, progress_callback=None):
     """
-    Refreshes ALL active repositories.
+    Refreshes all active repos in a category, resuming an interrupted run if any.
+    progress_callback: function(current, total, status_text)
+    """
+    repos = [
+        r for r in database.get_repositories(category_id, active_only=True)
+        if needs_polling(r) and not breaker_open_until(r)
+    ]
+    job_id = _start_or_resume_job(f"category:{category_id}", repos)
+    return run_refresh_job(job_id, progress_callback)
+
+def refresh_all(progress_callback=None, due_only=True):
+    """
+    Refreshes active repositories, resuming an interrupted run if any.
+    With due_only, only repositories whose adaptive refresh time has passed are
+    included, busiest first. Webhook-enabled repositories are skipped until they
+    are due for reconciliation, and repositories whose circuit breaker is open
+    until it closes.
+    """
+    repos = [
+        r for r in database.get_repositories(active_only=True)
+        if (is_due(r) if due_only else needs_polling(r)) and not breaker_open_until(r)
+    ]
+    # Hot repos first so they still get refreshed if quota runs out mid-run;
+    # repos without a measured rate yet go first to get one
+    repos.sort(key=lambda r: -r['churn_rate'] if r['churn_rate'] is not None else float('-inf'))
+    job_id = _start_or_resume_job("all", repos)
+    return run_refresh_job(job_id, progress_callback)
+
+def discover_good_first_issues(progress_callback=None):
+    """
+    Discovery mode: finds good-first issues across ALL active repositories with a
+    few batched search queries instead of one issues request per repository.
+    Results go through the same upsert path as a normal refresh.
     """
     repos = database.get_repositories(active_only=True)
     stats = {
         "total_new": 0,
         "total_updated": 0,
+        "total_unchanged": 0,
         "repos_processed": 0,
-        "repos_failed": 0
+        "repos_failed": 0,
+        "errors": {}  # full_name -> why that repository couldn't be searched
     }
-    
+
+    token = get_github_token()
+    if not token or not repos:
+        stats["repos_failed"] = len(repos)
+        if repos:
+            stats["errors"] = {r['full_name']: "GitHub Token not found" for r in repos}
+        return stats
+
+    if progress_callback:
+        progress_callback(0, len(repos), f"Searching {len(repos)} repositories...")
+
+    results, errors = github_client.search_good_first_issues([r['full_name'] for r in repos], token)
+
     for i, repo in enumerate(repos):
         if progress_callback:
-            progress_callback(i, len(repos), f"Refreshing {repo['full_name']}...")
-            
-        result = refresh_repository(repo['id'])
-        
-        if "error" in result:
+            progress_callback(i, len(repos), f"Saving {repo['full_name']}...")
+
+        error = errors.get(repo['full_name'].lower())
+        if error is not None:
+            # Not searched, so an empty result must not be upserted as "no issues"
             stats["repos_failed"] += 1
-        else:
-            stats["repos_processed"] += 1
-            stats["total_new"] += result["new"]
-            stats["total_updated"] += result["updated"]
-            
-        time.sleep(0.5)
-        
+            stats["errors"][repo['full_name']] = error
+            continue
+
+        sync_started = datetime.now()
+        result = database.upsert_issues(repo['id'], results.get(repo['full_name'].lower(), []))
+        stats["total_new"] += result['new']
+        stats["total_updated"] += result['updated']
+        stats["total_unchanged"] += result['unchanged']
+        stats["repos_processed"] += 1
+        if result['new'] or result['updated']:
+            post_sync(repo['id'], sync_started)
+
     return stats
@@ -0,0 +1,33 @@
+from typing import NamedTuple, Optional
+
+class Issue(NamedTuple):
+    """
+    Compact issue record used from the GitHub client through to the dashboard.
+
+    Records built from the API leave the DB-only fields (id, first_seen_at, ...) as
+    None. Records read with a column projection leave unselected fields as None.
+    """
+    github_issue_id: Optional[int] = None
+    github_issue_url: Optional[str] = None
+    title: Optional[str] = None
+    state: Optional[str] = None
+    labels: Optional[str] = None  # Comma-separated label names
+    is_assigned: Optional[bool] = None
+    assignee_login: Optional[str] = None
+    comments_count: Optional[int] = None
+    created_at_github: Optional[str] = None
+    body_preview: Optional[str] = None
+    body: Optional[str] = None  # Full body; only set on fetched records (see get_issue_body)
+    is_good_first_issue: Optional[bool] = None
+
+    # DB-only fields
+    id: Optional[int] = None
+    repository_id: Optional[int] = None
+    first_seen_at: Optional[str] = None
+    last_updated_at: Optional[str] = None
+    seen_at: Optional[str] = None
+    score: Optional[float] = None
+    duplicate_of: Optional[int] = None
+    duplicate_count: Optional[int] = None  # Other open issues in the same duplicate cluster
+    repo_name: Optional[str] = None
+    category_name: Optional[str] = None
@@ -0,0 +1,323 @@
+"""
+Optional in-process read model for the dashboard.
+
+Holds a columnar snapshot of open issues plus inverted indexes (row positions per
+category, repository and label) so filters and counts are answered from memory
+instead of a fresh SQLite query on every rerun. The snapshot is kept current by
+reading the change log (database.get_changes_since) and re-reading only the
+issues and seen marks it names; rescored issues only have their score re-read.
+"""
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import database
+from models import Issue
+
+_SNAPSHOT_QUERY = """
+    SELECT i.id, i.repository_id, r.category_id, i.github_issue_id, i.github_issue_url, i.title,
+           i.state, i.labels, i.is_assigned, i.assignee_login, i.comments_count,
+           i.created_at_github, i.first_seen_at, i.last_updated_at, i.score,
+           i.duplicate_of, r.full_name AS repo_name, c.name AS category_name
+    FROM issues i
+    JOIN repositories r ON i.repository_id = r.id
+    JOIN categories c ON r.category_id = c.id
+"""
+
+# Filters the read model can answer; anything else falls back to SQL
+SUPPORTED_FILTERS = {
+    'category_id', 'repo_id', 'labels', 'exclude_labels', 'assignee', 'min_comments', 'max_comments',
+    'only_new', 'only_good_first', 'unassigned_only', 'unseen_only', 'collapse_duplicates', 'user_id',
+}
+
+def _same(a, b):
+    """Element-wise equality of two aligned Series, treating missing values as equal."""
+    return bool(((a == b) | (a.isna() & b.isna())).all())
+
+class ReadModel:
+    def __init__(self, db_name=None):
+        self._conn = sqlite3.connect(db_name or database.DB_NAME, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.reload()
+
+    # --- Loading ---
+
+    def reload(self):
+        """Loads a full snapshot of open issues."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                df = pd.read_sql_query(_SNAPSHOT_QUERY + " WHERE i.state = 'open'", self._conn)
+                # Read in the same transaction, so the snapshot covers exactly the changes up to seq
+                self._seq = database.latest_change_seq(self._conn)
+                self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            finally:
+                self._conn.rollback()
+            self._set_snapshot(df)
+
+    def sync(self):
+        """
+        Brings the snapshot up to date. Cheap when nothing changed: SQLite's
+        data_version tells us whether another connection committed since last time.
+        """
+        with self._lock:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if version == self._data_version:
+                return
+            self._data_version = version
+
+            changes = database.get_changes_since(self._seq, conn=self._conn)
+            applied = True
+            if changes:
+                self._seq = changes[-1]['seq']
+                applied = self._apply_changes(changes)
+        if changes is None or not applied:
+            # Compaction dropped changes we hadn't read yet, or a pass relinked everything
+            self.reload()
+
+    def _apply_changes(self, changes):
+        """Applies a batch of log entries. Returns False if only a reload can."""
+        markers = {c['kind'] for c in changes if c['issue_id'] is None}
+        if 'relinked' in markers:
+            return False
+
+        # Rescored issues only need their score; anything else re-reads the row
+        issue_ids = sorted({c['issue_id'] for c in changes if c['issue_id'] is not None
+                            and c['kind'] not in database.SEEN_CHANGE_KINDS and c['kind'] != 'rescored'})
+        rescored = sorted({c['issue_id'] for c in changes if c['issue_id'] is not None
+                           and c['kind'] == 'rescored'} - set(issue_ids))
+        if issue_ids:
+            changed = pd.read_sql_query(
+                _SNAPSHOT_QUERY + " WHERE i.id IN (SELECT value FROM json_each(?))",
+                self._conn, params=(json.dumps(issue_ids),)
+            )
+            # Deleted issues are missing from `changed`
+            if len(changed) != len(issue_ids) or not self._patch(changed):
+                kept = self.df[~self.df['id'].isin(issue_ids)]
+                self._set_snapshot(pd.concat([kept, changed[changed['state'] == 'open']], ignore_index=True))
+
+        seen_ids = {}
+        for change in changes:
+            if change['kind'] in database.SEEN_CHANGE_KINDS:
+                seen_ids.setdefault(change['user_id'], set()).add(change['issue_id'])
+        for user_id, ids in seen_ids.items():
+            # Users not loaded yet read their full seen state on first use
+            if user_id in self._seen:
+                self._refresh_seen(user_id, ids)
+
+        if 'rescored' in markers:
+            self._refresh_scores()
+        elif rescored:
+            self._refresh_scores(rescored)
+        return True
+
+    def _refresh_scores(self, issue_ids=None):
+        """Re-reads the scores of the given issues, or of every open issue after a full rescore."""
+        if issue_ids is None:
+            rows = self._conn.execute("SELECT id, score FROM issues WHERE state = 'open'").fetchall()
+        else:
+            rows = self._conn.execute(
+                "SELECT id, score FROM issues WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(issue_ids),)
+            ).fetchall()
+        if not rows:
+            return
+        positions, found = self._snapshot_positions([r[0] for r in rows])
+        scores = np.array([r[1] for r in rows], dtype=float)  # None -> NaN, as read_sql_query reads it
+        self.df.iloc[positions[found], self.df.columns.get_loc('score')] = scores[found]
+        self._set_orders()
+
+    def _set_snapshot(self, df):
+        df = df.sort_values('id', ignore_index=True)
+        self.df = df
+        labels = df['labels'].fillna("").str.lower()
+        self.is_assigned = df['is_assigned'].fillna(0).to_numpy(dtype=bool, copy=True)
+        # Per-user seen state, keyed by user id; rebuilt lazily since row positions changed
+        self._seen = {}
+        self.is_good_first = np.zeros(len(df), dtype=bool)
+        for keyword in database.GOOD_FIRST_KEYWORDS:
+            self.is_good_first |= labels.str.contains(keyword, regex=False).to_numpy()
+        self.first_seen = pd.to_datetime(df['first_seen_at'], errors='coerce').to_numpy(copy=True)
+
+        # Lowest open id of each duplicate cluster represents it when collapsing
+        cluster_min = df.groupby('duplicate_of')['id'].transform('min')
+        self.is_representative = (df['duplicate_of'].isna() | (df['id'] == cluster_min)).to_numpy()
+        self.cluster_size = df.groupby('duplicate_of')['id'].transform('count').fillna(1).to_numpy(dtype=int)
+
+        # Inverted indexes: key -> row positions
+        self.by_category = df.groupby('category_id').indices
+        self.by_repo = df.groupby('repository_id').indices
+        exploded = labels.str.split(',').explode().str.strip()
+        exploded = exploded[exploded != ""]
+        self.by_label = {
+            label: np.unique(positions.to_numpy())
+            for label, positions in exploded.groupby(exploded.values).groups.items()
+        }
+
+        self._set_orders()
+
+    def _set_orders(self):
+        """Precomputes row orders for each supported sort."""
+        df = self.df
+        self.orders = {
+            'created': np.argsort(df['created_at_github'].fillna("").to_numpy(dtype=str), kind='stable')[::-1],
+            'score': np.argsort(df['score'].fillna(-1).to_numpy(), kind='stable')[::-1],
+        }
+
+    def _patch(self, changed):
+        """
+        Updates rows in place when every changed issue is already in the snapshot,
+        still open, and keeps its labels and cluster (the common case: comment and
+        assignee churn, rescoring). Returns False if a rebuild is needed.
+        """
+        changed = changed.sort_values('id', ignore_index=True)
+        ids = self.df['id'].to_numpy()
+        positions = np.searchsorted(ids, changed['id'].to_numpy())
+        if (positions >= len(ids)).any() or (ids[positions] != changed['id'].to_numpy()).any():
+            return False
+        if (changed['state'] != 'open').any():
+            return False
+
+        current = self.df.iloc[positions].reset_index(drop=True)
+        if not (_same(current['labels'], changed['labels']) and _same(current['duplicate_of'], changed['duplicate_of'])):
+            return False
+
+        resort = not (_same(current['score'], changed['score'])
+                      and _same(current['created_at_github'], changed['created_at_github']))
+        for col in changed.columns:
+            # Arrow-backed string columns are rewritten whole on assignment; skip untouched ones
+            if not _same(current[col], changed[col]):
+                self.df.iloc[positions, self.df.columns.get_loc(col)] = changed[col].astype(self.df[col].dtype).to_numpy()
+
+        self.is_assigned[positions] = changed['is_assigned'].fillna(0).to_numpy(dtype=bool)
+        self.first_seen[positions] = pd.to_datetime(changed['first_seen_at'], errors='coerce').to_numpy()
+        if resort:
+            self._set_orders()
+
+        return True
+
+    # --- Per-user seen state ---
+
+    def _load_seen(self, user_id):
+        """Seen timestamps for the user's snapshot rows (None = unseen)."""
+        rows = self._conn.execute("SELECT issue_id, seen_at FROM issue_seen WHERE user_id = ?", (user_id,)).fetchall()
+        self._seen[user_id] = {
+            'is_seen': np.zeros(len(self.df), dtype=bool),
+            'seen_at': np.full(len(self.df), None, dtype=object),
+        }
+        self._apply_seen(user_id, rows)
+
+    def _snapshot_positions(self, issue_ids):
+        """(positions, found) of issue_ids in the id-sorted snapshot; closed issues aren't in it."""
+        ids = self.df['id'].to_numpy()
+        issue_ids = np.asarray(issue_ids)
+        positions = np.searchsorted(ids, issue_ids)
+        found = (positions < len(ids)) & (ids[np.minimum(positions, len(ids) - 1)] == issue_ids)
+        return positions, found
+
+    def _apply_seen(self, user_id, rows):
+        if not rows:
+            return
+        positions, found = self._snapshot_positions([r[0] for r in rows])
+        seen = self._seen[user_id]
+        seen['is_seen'][positions[found]] = True
+        seen['seen_at'][positions[found]] = np.array([r[1] for r in rows], dtype=object)[found]
+
+    def _refresh_seen(self, user_id, issue_ids):
+        """Re-reads the user's seen state for issues the change log named (marks and undos)."""
+        issue_ids = sorted(issue_ids)
+        positions, found = self._snapshot_positions(issue_ids)
+        seen = self._seen[user_id]
+        seen['is_seen'][positions[found]] = False
+        seen['seen_at'][positions[found]] = None
+        self._apply_seen(user_id, self._conn.execute(
+            "SELECT issue_id, seen_at FROM issue_seen WHERE user_id = ? AND issue_id IN (SELECT value FROM json_each(?))",
+            (user_id, json.dumps(issue_ids))
+        ).fetchall())
+
+    def _user_seen(self, user_id):
+        user_id = user_id or database.DEFAULT_USER_ID
+        if user_id not in self._seen:
+            self._load_seen(user_id)
+        return self._seen[user_id]
+
+    # --- Queries ---
+
+    def supports(self, filters):
+        return all(key in SUPPORTED_FILTERS for key, value in (filters or {}).items() if value)
+
+    def _positions(self, index, keys):
+        """Rows matching any of keys (a single key or a list, like the SQL filters accept)."""
+        mask = np.zeros(len(self.df), dtype=bool)
+        for key in (keys if isinstance(keys, (list, tuple, set, frozenset)) else [keys]):
+            positions = index.get(key.lower() if isinstance(key, str) else key)
+            if positions is not None:
+                mask[positions] = True
+        return mask
+
+    def _mask(self, filters):
+        filters = filters or {}
+        mask = np.ones(len(self.df), dtype=bool)
+        if filters.get('category_id'):
+            mask &= self._positions(self.by_category, filters['category_id'])
+        if filters.get('repo_id'):
+            mask &= self._positions(self.by_repo, filters['repo_id'])
+        if filters.get('labels'):
+            mask &= self._positions(self.by_label, filters['labels'])
+        if filters.get('exclude_labels'):
+            mask &= ~self._positions(self.by_label, filters['exclude_labels'])
+        if filters.get('assignee'):
+            mask &= (self.df['assignee_login'].str.lower() == filters['assignee'].lower()).fillna(False).to_numpy(dtype=bool)
+        if filters.get('min_comments') is not None:
+            mask &= self.df['comments_count'].fillna(0).to_numpy() >= filters['min_comments']
+        if filters.get('max_comments') is not None:
+            mask &= self.df['comments_count'].fillna(0).to_numpy() <= filters['max_comments']
+        if filters.get('only_good_first'):
+            mask &= self.is_good_first
+        if filters.get('unassigned_only'):
+            mask &= ~self.is_assigned
+        if filters.get('unseen_only'):
+            mask &= ~self._user_seen(filters.get('user_id'))['is_seen']
+        if filters.get('only_new'):
+            mask &= self.first_seen > np.datetime64(datetime.now() - timedelta(hours=24))
+        if filters.get('collapse_duplicates'):
+            mask &= self.is_representative
+        return mask
+
+    def count(self, filters=None):
+        """Counts matching issues, or None if the filters need SQL."""
+        if not self.supports(filters):
+            return None
+        with self._lock:
+            return int(self._mask(filters).sum())
+
+    def get_issues(self, filters=None, order_by='created', limit=None):
+        """Matching Issue records in display order, or None if the filters need SQL."""
+        if not self.supports(filters):
+            return None
+        with self._lock:
+            mask = self._mask(filters)
+            order = self.orders[order_by]
+            rows = order[mask[order]]
+            if limit is not None:
+                rows = rows[:limit]
+            subset = self.df.iloc[rows]
+            seen_at = self._user_seen((filters or {}).get('user_id'))['seen_at'][rows]
+            # NaN -> None so records behave like the ones read from SQLite
+            subset = subset.astype(object).where(subset.notna(), None)
+            return [
+                Issue(
+                    id=row['id'], repository_id=row['repository_id'], github_issue_id=row['github_issue_id'],
+                    github_issue_url=row['github_issue_url'], title=row['title'], state=row['state'],
+                    labels=row['labels'], is_assigned=bool(row['is_assigned']),
+                    assignee_login=row['assignee_login'], comments_count=row['comments_count'],
+                    created_at_github=row['created_at_github'], first_seen_at=row['first_seen_at'],
+                    last_updated_at=row['last_updated_at'], seen_at=seen, score=row['score'],
+                    duplicate_of=row['duplicate_of'], duplicate_count=int(size) - 1,
+                    repo_name=row['repo_name'], category_name=row['category_name'],
+                )
+                for row, size, seen in zip(subset.to_dict('records'), self.cluster_size[rows], seen_at)
+            ]
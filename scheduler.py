@@ -0,0 +1,42 @@
+"""
+Refreshes repositories on their adaptive schedule, without the dashboard open.
+
+    python scheduler.py [--max-sleep 900] [--once]
+
+Each pass refreshes only the repositories that are due (busiest first), then
+sleeps until the next one comes due.
+"""
+import argparse
+import time
+from datetime import datetime
+
+import database
+import logic
+
+MIN_SLEEP = 60  # Seconds; avoids spinning when many repos come due one after another
+
+def run_once():
+    stats = logic.refresh_all()
+    print(f"[{datetime.now():%Y-%m-%d %H:%M}] Refreshed {stats['repos_processed']} repos "
+          f"({stats['repos_failed']} failed): {stats['total_new']} new, {stats['total_updated']} updated.")
+    return stats
+
+def run(max_sleep):
+    while True:
+        run_once()
+        due = logic.next_due_at()
+        wait = max_sleep if due is None else (due - datetime.now()).total_seconds()
+        time.sleep(min(max_sleep, max(MIN_SLEEP, wait)))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh repositories as they come due")
+    parser.add_argument("--max-sleep", type=int, default=900, help="Longest pause between passes, in seconds")
+    parser.add_argument("--once", action="store_true", help="Run a single pass and exit")
+    args = parser.parse_args()
+
+    logic.load_env()
+    database.init_db()
+    if args.once:
+        run_once()
+    else:
+        run(args.max_sleep)
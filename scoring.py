@@ -0,0 +1,151 @@
+"""
+"Best issues to pick up" ranking.
+
+Scores are computed for whole batches of issues at once with pandas/NumPy and
+stored in issues.score, so get_issues can ORDER BY score using an index.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+import database
+
+# Relative weight of each signal; the final score is scaled to 0-100
+WEIGHTS = {
+    "freshness": 0.25,
+    "discussion": 0.15,
+    "unassigned": 0.25,
+    "label": 0.25,
+    "repo_activity": 0.10,
+}
+AGE_HALF_LIFE_DAYS = 60       # Freshness halves every two months
+QUIET_COMMENTS = 5            # Comment count at which the discussion signal halves
+ACTIVITY_WINDOW_DAYS = 30     # Window for counting a repo's recently discovered issues
+LABEL_STRENGTH = {
+    "good first issue": 1.0,
+    "good-first-issue": 1.0,
+    "first-timers-only": 1.0,
+    "beginner": 0.8,
+    "easy": 0.7,
+    "starter": 0.7,
+    "help wanted": 0.5,
+    "help-wanted": 0.5,
+    "contributions welcome": 0.4,
+}
+CHUNK_SIZE = 200000
+
+def compute_scores(df, repo_activity, now=None):
+    """
+    Scores a DataFrame of issues without per-row Python loops.
+
+    df: columns created_at_github, comments_count, is_assigned, labels, repository_id
+    repo_activity: Series indexed by repository_id with values in [0, 1]
+    Returns: NumPy array of scores aligned with df.
+    """
+    now = now if now is not None else pd.Timestamp.now(tz="UTC")
+
+    created = pd.to_datetime(df["created_at_github"], utc=True, errors="coerce")
+    age_days = ((now - created).dt.total_seconds() / 86400).fillna(365).clip(lower=0).to_numpy()
+    freshness = np.exp2(-age_days / AGE_HALF_LIFE_DAYS)
+
+    comments = df["comments_count"].fillna(0).to_numpy(dtype=float)
+    discussion = 1.0 / (1.0 + comments / QUIET_COMMENTS)
+
+    unassigned = 1.0 - df["is_assigned"].fillna(0).to_numpy(dtype=float)
+
+    # One vectorized pass per known label, keeping the strongest match
+    labels = df["labels"].fillna("").str.lower()
+    label = np.zeros(len(df))
+    for name, strength in LABEL_STRENGTH.items():
+        label = np.maximum(label, labels.str.contains(name, regex=False).to_numpy() * strength)
+
+    activity = df["repository_id"].map(repo_activity).fillna(0).to_numpy(dtype=float)
+
+    score = (
+        WEIGHTS["freshness"] * freshness
+        + WEIGHTS["discussion"] * discussion
+        + WEIGHTS["unassigned"] * unassigned
+        + WEIGHTS["label"] * label
+        + WEIGHTS["repo_activity"] * activity
+    )
+    return np.round(score * 100, 2)
+
+def _repo_activity(conn):
+    """Recently discovered issues per repo, log-scaled to [0, 1]."""
+    since = pd.Timestamp.now() - pd.Timedelta(days=ACTIVITY_WINDOW_DAYS)
+    counts = pd.read_sql_query("""
+        SELECT repository_id, COUNT(*) AS recent
+        FROM issues
+        WHERE first_seen_at > ?
+        GROUP BY repository_id
+    """, conn, params=(since.to_pydatetime(),), index_col="repository_id")["recent"]
+    if counts.empty:
+        return counts.astype(float)
+    scaled = np.log1p(counts)
+    return scaled / scaled.max()
+
+# Every index keyed on score; a full rescore drops them and rebuilds each in one sort
+SCORE_INDEXES = {
+    "idx_issues_score": "CREATE INDEX IF NOT EXISTS idx_issues_score ON issues (score)",
+    "idx_issues_open_score": "CREATE INDEX IF NOT EXISTS idx_issues_open_score ON issues (state, score)",
+}
+
+def _rescore(where, params, rebuild_index=False, since=None):
+    conn = database.get_connection()
+    conn.row_factory = None
+    activity = _repo_activity(conn)
+    updated = 0
+
+    if rebuild_index:
+        # Rewriting most rows is much cheaper without maintaining the score indexes
+        # row by row; they are rebuilt at the end of the same transaction
+        conn.execute("BEGIN")
+        for name in SCORE_INDEXES:
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+    # Ids are read up front: the UPDATEs below change score, and a cursor still
+    # walking an index on score would skip or revisit rows
+    ids = [row[0] for row in conn.execute(f"SELECT id FROM issues WHERE {where}", params)]
+
+    for start in range(0, len(ids), CHUNK_SIZE):
+        df = pd.read_sql_query("""
+            SELECT id, repository_id, created_at_github, comments_count, is_assigned, labels, score
+            FROM issues
+            WHERE id IN (SELECT value FROM json_each(?))
+        """, conn, params=(json.dumps(ids[start:start + CHUNK_SIZE]),))
+        scores = compute_scores(df, activity)
+        # Skip rows whose score didn't move
+        changed = scores != df["score"].to_numpy(dtype=float)
+        changed_ids = df["id"].to_numpy()[changed].tolist()
+        conn.executemany("UPDATE issues SET score = ? WHERE id = ?", zip(scores[changed].tolist(), changed_ids))
+        if not rebuild_index:
+            database.log_issue_changes(conn, changed_ids, 'rescored', since=since)
+        updated += int(changed.sum())
+
+    if rebuild_index:
+        for create in SCORE_INDEXES.values():
+            conn.execute(create)
+        # One marker for the whole pass rather than an entry per rescored issue
+        if updated:
+            database.log_change_marker(conn, 'rescored')
+    conn.commit()
+    conn.close()
+    return updated
+
+def rescore_all():
+    """Recomputes the score of every open issue. Returns the number of scores that changed."""
+    return _rescore("state = 'open'", (), rebuild_index=True)
+
+def rescore_changed(repo_id, since):
+    """
+    Recomputes scores only for a repository's issues written since `since`
+    (content-hash sync leaves last_updated_at alone on unchanged issues), and for
+    its open issues that were never scored.
+    """
+    return _rescore("repository_id = ? AND (last_updated_at >= ? OR (score IS NULL AND state = 'open'))",
+                    (repo_id, since), since=since)
+
+if __name__ == "__main__":
+    database.init_db()
+    print(f"Scored {rescore_all()} issues.")
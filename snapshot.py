@@ -0,0 +1,249 @@
+"""
+Bulk export/import of the tracker database.
+
+    python snapshot.py export snapshots/2024-06-01 --format parquet
+    python snapshot.py import snapshots/2024-06-01 restored.db
+
+Tables are streamed in chunks, so memory stays bounded regardless of DB size.
+Parquet and Arrow need pyarrow; without it the export falls back to gzipped CSV.
+"""
+import argparse
+import base64
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+import database
+
+# Exported tables, in import order. Derived tables are rebuilt on import instead:
+# issue_labels from issues.labels, issue_search from issues and issue_bodies, and
+# issue_lsh from the exported MinHash signatures.
+# The change log and refresh bookkeeping are local to a database and start empty.
+TABLES = ["categories", "repositories", "issues", "issue_bodies", "issue_minhash",
+          "users", "seen_batches", "issue_seen", "repo_snapshots", "saved_feeds"]
+CHUNK_SIZE = 50000
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow", "csv": ".csv.gz"}
+# How CSV marks NULL, so empty strings and text like "NA" or "nan" survive a round trip
+CSV_NULL = "\\N"
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+def _arrow_schema(conn, table):
+    """Builds a fixed Arrow schema from the SQLite declared types so every chunk matches."""
+    schema = []
+    for col in conn.execute(f"PRAGMA table_info({table})"):
+        decl = (col[2] or "").upper()
+        if decl.startswith("INT") or decl == "BOOLEAN":
+            arrow_type = pa.int64()
+        elif decl == "REAL":
+            arrow_type = pa.float64()
+        elif decl == "BLOB":
+            arrow_type = pa.binary()
+        else:
+            # TEXT and TIMESTAMP (stored as ISO strings by sqlite3)
+            arrow_type = pa.string()
+        schema.append(pa.field(col[1], arrow_type))
+    return pa.schema(schema)
+
+def _blob_columns(conn, table):
+    return [col[1] for col in conn.execute(f"PRAGMA table_info({table})") if (col[2] or "").upper() == "BLOB"]
+
+def export_snapshot(out_dir, fmt="parquet", chunk_size=CHUNK_SIZE):
+    """
+    Streams every table into out_dir as one file per table plus a manifest.
+    All tables are read inside one transaction, so a concurrent refresh can't
+    produce a half-updated snapshot; in WAL mode (see database.init_db) the
+    refresh keeps committing meanwhile.
+    Returns: dict of table name -> rows exported.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt}")
+    if fmt != "csv" and pa is None:
+        print("pyarrow is not installed; falling back to compressed CSV.")
+        fmt = "csv"
+
+    os.makedirs(out_dir, exist_ok=True)
+    database.init_db()
+    conn = database.get_connection()
+    conn.row_factory = None
+    counts = {}
+
+    try:
+        conn.execute("BEGIN")
+        for table in TABLES:
+            path = os.path.join(out_dir, table + FORMATS[fmt])
+            counts[table] = 0
+            chunks = pd.read_sql_query(f"SELECT * FROM {table}", conn, chunksize=chunk_size)
+
+            if fmt == "csv":
+                blobs = _blob_columns(conn, table)
+                header = True
+                with open(path, "wb") as f:
+                    for df in chunks:
+                        for col in blobs:
+                            df[col] = df[col].map(lambda b: base64.b64encode(b).decode("ascii") if b is not None else None)
+                        df.to_csv(f, index=False, header=header, compression="gzip", na_rep=CSV_NULL)
+                        header = False
+                        counts[table] += len(df)
+                continue
+
+            schema = _arrow_schema(conn, table)
+            if fmt == "parquet":
+                writer = pq.ParquetWriter(path, schema, compression="zstd")
+            else:
+                writer = pa_ipc.new_file(path, schema)
+            try:
+                for df in chunks:
+                    writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+                    counts[table] += len(df)
+            finally:
+                writer.close()
+    finally:
+        conn.rollback()
+        conn.close()
+
+    manifest = {
+        "format": fmt,
+        "csv_null": CSV_NULL,
+        "exported_at": datetime.now().isoformat(),
+        "tables": counts,
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"Exported {sum(counts.values())} rows to {out_dir} ({fmt}).")
+    return counts
+
+def _read_chunks(path, fmt, chunk_size, csv_null=None):
+    """
+    Yields (columns, rows) chunks from one exported table file. CSV values stay
+    strings; the column affinities convert numbers back on insert. Snapshots
+    without csv_null predate the sentinel and use pandas' default NA parsing.
+    """
+    if fmt == "parquet":
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            data = batch.to_pydict()
+            yield list(data.keys()), zip(*data.values())
+    elif fmt == "arrow":
+        with pa.memory_map(path) as source:
+            reader = pa_ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                data = reader.get_batch(i).to_pydict()
+                yield list(data.keys()), zip(*data.values())
+    else:
+        if csv_null is None:
+            options = {}
+        else:
+            options = {"dtype": object, "keep_default_na": False, "na_values": [csv_null]}
+        for df in pd.read_csv(path, chunksize=chunk_size, compression="gzip", **options):
+            df = df.astype(object).where(df.notna(), None)
+            yield list(df.columns), df.itertuples(index=False, name=None)
+
+def _rebuild_lsh(conn):
+    """Fills issue_lsh from the imported signatures; cheaper than exporting 16 rows per issue."""
+    import dedup  # NumPy; only needed here
+    import numpy as np
+    rows = conn.execute("SELECT issue_id, signature FROM issue_minhash").fetchall()
+    conn.executemany(
+        "INSERT OR IGNORE INTO issue_lsh (band, bucket, issue_id) VALUES (?, ?, ?)",
+        ((band, bucket, issue_id) for issue_id, signature in rows
+         for band, bucket in enumerate(dedup.band_buckets(np.frombuffer(signature, dtype=np.uint32))))
+    )
+
+def import_snapshot(src_dir, db_path, chunk_size=CHUNK_SIZE):
+    """
+    Bulk-loads a snapshot into a fresh database at db_path in one transaction.
+    Returns: dict of table name -> rows imported.
+    """
+    if os.path.exists(db_path):
+        raise FileExistsError(f"{db_path} already exists; import only targets a fresh database.")
+
+    with open(os.path.join(src_dir, "manifest.json")) as f:
+        manifest = json.load(f)
+    fmt = manifest["format"]
+    if fmt != "csv" and pa is None:
+        raise RuntimeError(f"pyarrow is required to import a {fmt} snapshot.")
+
+    # Create the current schema in the new file
+    original_db = database.DB_NAME
+    database.DB_NAME = db_path
+    try:
+        database.init_db()
+    finally:
+        database.DB_NAME = original_db
+
+    conn = sqlite3.connect(db_path)
+    # Fresh file and a single transaction: a crash just means deleting the file
+    conn.execute("PRAGMA synchronous = OFF")
+    counts = {}
+
+    try:
+        conn.execute("BEGIN")
+        for table in TABLES:
+            path = os.path.join(src_dir, table + FORMATS[fmt])
+            counts[table] = 0
+            if not os.path.exists(path):
+                continue
+
+            # Rows the migrations seed (the default user) come from the snapshot instead
+            conn.execute(f"DELETE FROM {table}")
+            known = {col[1] for col in conn.execute(f"PRAGMA table_info({table})")}
+            blobs = set(_blob_columns(conn, table)) if fmt == "csv" else set()
+
+            for columns, rows in _read_chunks(path, fmt, chunk_size, manifest.get("csv_null")):
+                # Older snapshots may lack newer columns; unknown columns are dropped
+                keep = [i for i, col in enumerate(columns) if col in known]
+                names = [columns[i] for i in keep]
+                decode = [i for i, col in enumerate(names) if col in blobs]
+                batch = []
+                for row in rows:
+                    values = [row[i] for i in keep]
+                    for i in decode:
+                        if values[i] is not None:
+                            values[i] = base64.b64decode(values[i])
+                    batch.append(values)
+                conn.executemany(
+                    f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)})",
+                    batch
+                )
+                counts[table] += len(batch)
+        database.rebuild_issue_labels(conn.cursor())
+        database.rebuild_issue_search(conn.cursor())
+        _rebuild_lsh(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    print(f"Imported {sum(counts.values())} rows into {db_path}.")
+    return counts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export or import tracker.db snapshots")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = sub.add_parser("export", help="Export all tables to a directory")
+    export_parser.add_argument("out_dir")
+    export_parser.add_argument("--format", choices=list(FORMATS), default="parquet")
+    export_parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    import_parser = sub.add_parser("import", help="Load a snapshot into a new database file")
+    import_parser.add_argument("src_dir")
+    import_parser.add_argument("db_path")
+    import_parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    args = parser.parse_args()
+    if args.command == "export":
+        export_snapshot(args.out_dir, args.format, args.chunk_size)
+    else:
+        import_snapshot(args.src_dir, args.db_path, args.chunk_size)
@@ -116,6 +116,17 @@ p, .stCaption {
     box-shadow: 0 4px 10px rgba(139, 92, 246, 0.4);
     margin-top: 5px;
 }
+.badge-duplicate {
+    background: rgba(6, 182, 212, 0.15);
+    color: #67E8F9;
+    border: 1px solid rgba(6, 182, 212, 0.4);
+    padding: 4px 8px;
+    border-radius: 6px;
+    font-size: 11px;
+    font-weight: 700;
+    margin-top: 5px;
+    white-space: nowrap;
+}
 
 /* META INFO */
 .card-meta {
@@ -198,3 +209,6 @@ div[data-testid="stTextInput"] > div > div > input {
 }
 </style>
 """
+
+# Same rules without the <style> wrapper, for injecting into component iframes
+COMPONENT_CSS = CSS.replace("<style>", "").replace("</style>", "")
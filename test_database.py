@@ -0,0 +1,169 @@
+import threading
+from datetime import datetime
+
+import database
+from models import Issue
+
+def _issue(number, labels, assignee=None):
+    return Issue(
+        github_issue_id=number, github_issue_url=f"https://github.com/o/r/issues/{number}",
+        title=f"Issue {number}", state='open', labels=labels, is_assigned=assignee is not None,
+        assignee_login=assignee, comments_count=0, created_at_github=f"2024-01-{number:02d}T00:00:00Z",
+        body_preview="", body="",
+    )
+
+def _numbers(db, filters):
+    return sorted(i.github_issue_id for i in db.get_issues(filters, columns=['github_issue_id']))
+
+def test_every_filter_combination_has_a_selective_plan(db):
+    assert db.unindexed_issue_plans() == []
+
+def test_label_filters_match_whole_labels_case_insensitively(db):
+    repo_id = db.get_repositories()[0]['id']
+    db.upsert_issues(repo_id, [
+        _issue(1, "bug,good first issue"),
+        _issue(2, "Bug"),
+        _issue(3, "bugfix"),
+        _issue(4, ""),
+    ])
+    assert _numbers(db, {'labels': ["BUG"]}) == [1, 2]
+    assert _numbers(db, {'labels': ["bug", "bugfix"]}) == [1, 2, 3]
+    assert _numbers(db, {'exclude_labels': ["bug"]}) == [3, 4]
+
+    # Relabelling replaces the issue's label rows
+    db.upsert_issues(repo_id, [_issue(1, "docs")])
+    assert _numbers(db, {'labels': ["bug"]}) == [2]
+    assert _numbers(db, {'labels': ["docs"]}) == [1]
+
+def test_selective_filters_combine_with_orderings(db):
+    repos = db.get_repositories()
+    db.upsert_issues(repos[0]['id'], [_issue(1, "bug", assignee="Octocat"), _issue(2, "bug")])
+    db.upsert_issues(repos[1]['id'], [_issue(3, "bug", assignee="octocat")])
+    for order_by in database.ISSUE_ORDERINGS:
+        issues = db.get_issues({'assignee': "OCTOCAT"}, columns=['github_issue_id'], order_by=order_by)
+        assert sorted(i.github_issue_id for i in issues) == [1, 3]
+    assert _numbers(db, {'repo_id': [repos[0]['id']], 'labels': ["bug"]}) == [1, 2]
+    assert _numbers(db, {'category_id': [repos[1]['category_id']], 'assignee': "octocat"}) == (
+        [3] if repos[1]['category_id'] != repos[0]['category_id'] else [1, 3])
+
+def test_derived_data_is_logged_once_per_sync_and_once_per_full_pass(db):
+    import logic
+    import scoring
+    from datetime import datetime
+
+    repo_id = db.get_repositories()[0]['id']
+    since = datetime.now()
+    db.upsert_issues(repo_id, [_issue(1, "good first issue"), _issue(2, "bug")])
+    start = db.latest_change_seq()
+    logic.post_sync(repo_id, since)
+
+    # Rescoring the synced issues moves their 'new' entries instead of adding more
+    changes = db.get_changes_since(0)
+    assert sorted((c['issue_id'], c['kind']) for c in changes) == sorted((i.id, 'new') for i in db.get_issues())
+    assert all(c['seq'] > start for c in changes)
+
+    conn = db.get_connection()
+    conn.execute("UPDATE issues SET score = NULL")
+    conn.commit()
+    conn.close()
+    start = db.latest_change_seq()
+    assert scoring.rescore_all() == 2
+    assert [(c['issue_id'], c['kind']) for c in db.get_changes_since(start)] == [(None, 'rescored')]
+
+def test_search_matches_title_and_full_body_from_the_index(db):
+    repo_id = db.get_repositories()[0]['id']
+    long_body = "x" * 300 + " Segfault in the TOKENIZER when input is empty"
+    db.upsert_issues(repo_id, [
+        _issue(1, "")._replace(title="Crash on startup"),
+        _issue(2, "")._replace(body_preview=long_body[:200], body=long_body),
+    ])
+    assert _numbers(db, {'search': "crash"}) == [1]
+    assert _numbers(db, {'search': "tokenizer when"}) == [2]  # Only in the full body
+    assert _numbers(db, {'search': "em"}) == [2]  # Shorter than a trigram
+    assert db.count_issues({'search': "segfault"}) == 1
+
+    # Edits replace the indexed text
+    db.upsert_issues(repo_id, [_issue(2, "")._replace(body_preview="fixed", body="fixed")])
+    assert _numbers(db, {'search': "segfault"}) == []
+
+def test_issue_list_reads_share_one_connection_across_threads(db):
+    repo_id = db.get_repositories()[0]['id']
+    db.upsert_issues(repo_id, [_issue(1, "bug"), _issue(2, "bug")])
+    assert db.count_issues() == 2
+    conn = db._read_conn
+
+    # Streamlit reruns and HTTP requests each arrive on a new thread
+    counts = []
+    threads = [threading.Thread(target=lambda: counts.append(db.count_issues({'labels': ["bug"]}))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert counts == [2] * 4
+    assert db._read_conn is conn
+
+def test_seen_at_migration_rebuilds_issues_without_drop_column(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_NAME", str(tmp_path / "old.db"))
+    migrations = database.MIGRATIONS
+    monkeypatch.setattr(database, "MIGRATIONS", [m for m in migrations if m[0] < 14])
+    database.init_db()
+    conn = database.get_connection()
+    conn.execute("INSERT INTO categories (name) VALUES ('c')")
+    conn.execute("INSERT INTO repositories (category_id, github_owner, github_repo, full_name) VALUES (1, 'o', 'r', 'o/r')")
+    for number, seen_at in ((1, "2024-02-01 00:00:00"), (2, None), (3, None)):
+        conn.execute("INSERT INTO issues (repository_id, github_issue_id, title, state, seen_at) VALUES (1, ?, 't', 'open', ?)",
+                     (number, seen_at))
+    conn.execute("DELETE FROM issues WHERE github_issue_id = 3")
+    conn.execute("INSERT INTO issue_bodies (issue_id, body_hash) VALUES (1, 'h')")
+    conn.commit()
+    conn.close()
+
+    # SQLite before 3.35 has no ALTER TABLE ... DROP COLUMN
+    monkeypatch.setattr(database.sqlite3, "sqlite_version_info", (3, 31, 1))
+    monkeypatch.setattr(database, "MIGRATIONS", migrations)
+    database._initialized.clear()
+    database.init_db()
+
+    conn = database.get_connection()
+    assert "seen_at" not in {row[1] for row in conn.execute("PRAGMA table_info(issues)")}
+    assert [tuple(r) for r in conn.execute("SELECT user_id, issue_id FROM issue_seen")] == [(1, 1)]
+    assert conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'issues'").fetchone()[0] == 3
+    assert "REFERENCES issues (id)" in conn.execute("SELECT sql FROM sqlite_master WHERE name = 'issue_bodies'").fetchone()[0]
+    assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'issues'")}
+    assert {"idx_issues_score", "idx_issues_open_created"} <= indexes
+    conn.close()
+
+def test_undo_restores_exactly_the_rows_of_one_bulk_mark(db, monkeypatch):
+    repo_id = db.get_repositories()[0]['id']
+    db.upsert_issues(repo_id, [_issue(1, "bug"), _issue(2, "bug"), _issue(3, "docs"), _issue(4, "docs")])
+    ids = {i.github_issue_id: i.id for i in db.get_issues(columns=['id', 'github_issue_id'])}
+    db.mark_issues_seen([ids[4]])
+
+    # Both marks land in the same clock tick
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2024, 6, 1, 12, 0, 0)
+    monkeypatch.setattr(database, "datetime", FrozenDatetime)
+    count, by_filter = db.mark_matching_issues_seen({'labels': ["bug"]})
+    assert count == 2
+    _, by_id = db.mark_issues_seen([ids[3]])
+    assert by_filter != by_id
+
+    assert db.unmark_issues_seen(by_filter) == 2
+    assert _numbers(db, {'unseen_only': True}) == [1, 2]
+    assert db.unmark_issues_seen(by_id) == 1
+    assert _numbers(db, {'unseen_only': True}) == [1, 2, 3]
+
+def test_upsert_skips_unchanged_issues_by_content_hash(db):
+    repo_id = db.get_repositories()[0]['id']
+    page = [_issue(1, "bug"), _issue(2, "bug"), _issue(3, "docs")]
+    assert db.upsert_issues(repo_id, page) == {'new': 3, 'updated': 0, 'unchanged': 0}
+    seq = db.latest_change_seq()
+    assert db.upsert_issues(repo_id, page) == {'new': 0, 'updated': 0, 'unchanged': 3}
+    assert db.latest_change_seq() == seq
+
+    page[1] = page[1]._replace(comments_count=4)
+    assert db.upsert_issues(repo_id, page) == {'new': 0, 'updated': 1, 'unchanged': 2}
+    assert [c['kind'] for c in db.get_changes_since(seq)] == ['updated']
@@ -0,0 +1,63 @@
+from datetime import datetime
+
+import dedup
+from models import Issue
+
+HF_TEMPLATE = """### System Info
+
+- `transformers` version: 4.40.0
+- Platform: Linux-5.15
+- Python version: 3.10.12
+
+### Who can help?
+
+### Reproduction
+"""
+
+def _issue(number, title, body=""):
+    return Issue(
+        github_issue_id=number, github_issue_url=f"https://github.com/o/r/issues/{number}", title=title,
+        state='open', labels="bug", is_assigned=False, assignee_login=None, comments_count=0,
+        created_at_github="2024-01-01T00:00:00Z", body_preview=body[:200], body=body,
+    )
+
+def _add_copies(db, repos, title, body=""):
+    for repo in repos:
+        db.upsert_issues(repo['id'], [_issue(1, title, body)])
+
+def test_duplicate_link_counts_are_distinct_issues(db):
+    _add_copies(db, db.get_repositories()[:3], "Crash when parsing an empty config file on startup")
+    ids = [i.id for i in db.get_issues()]
+    assert dedup.index_issues(ids) == 3
+    assert dedup.index_issues(ids) == 0  # Already clustered: nothing relinked
+    assert dedup.rebuild_index() == 3
+
+def test_shared_template_text_alone_does_not_link_issues(db):
+    repos = db.get_repositories()
+    db.upsert_issues(repos[0]['id'], [_issue(1, "Tokenizer drops special tokens", HF_TEMPLATE + "tok")])
+    db.upsert_issues(repos[1]['id'], [_issue(2, "Trainer hangs with deepspeed", HF_TEMPLATE + "train")])
+    assert dedup.index_issues([i.id for i in db.get_issues()]) == 0
+
+    # The same issue filed twice with the template still links
+    db.upsert_issues(repos[2]['id'], [_issue(3, "Tokenizer drops special tokens", HF_TEMPLATE + "tok")])
+    assert dedup.rebuild_index() == 2
+
+def test_reindexing_an_edited_issue_removes_its_stale_link(db):
+    repos = db.get_repositories()[:3]
+    _add_copies(db, repos, "Crash when parsing an empty config file on startup")
+    assert dedup.rebuild_index() == 3
+    root = min(i.id for i in db.get_issues())
+
+    # Edit the cluster's root so it no longer matches; the other two stay together
+    since = datetime.now()
+    db.upsert_issues(repos[0]['id'], [_issue(1, "Add a dark mode toggle to the settings page")])
+    assert dedup.index_changed(repos[0]['id'], since) == 3
+    duplicate_of = {i.id: i.duplicate_of for i in db.get_issues()}
+    others = sorted(i for i in duplicate_of if i != root)
+    assert duplicate_of == {root: None, others[0]: others[0], others[1]: others[0]}
+
+    # Editing a second one dissolves what is left of the cluster
+    since = datetime.now()
+    db.upsert_issues(repos[1]['id'], [_issue(1, "Document the plugin API")])
+    dedup.index_changed(repos[1]['id'], since)
+    assert all(i.duplicate_of is None for i in db.get_issues())
@@ -0,0 +1,74 @@
+import github_client
+import logic
+
+def _item(number):
+    return {
+        'number': number, 'html_url': f"https://github.com/o/r/issues/{number}",
+        'title': f"Parser crashes on input case {number} with a trailing comma", 'state': 'open',
+        'labels': [{'name': "good first issue"}], 'assignees': [], 'comments': 0,
+        'created_at': "2024-01-01T00:00:00Z", 'body': f"Steps to reproduce case {number}",
+    }
+
+def _serve_pages(monkeypatch, pages):
+    monkeypatch.setattr(github_client, "iter_issue_pages", lambda owner, repo, token, labels=None: iter(pages))
+
+def _unprocessed(db, repo_id):
+    conn = db.get_connection()
+    rows = conn.execute("""
+        SELECT COUNT(*) FROM issues i
+        WHERE repository_id = ? AND (score IS NULL OR i.id NOT IN (SELECT issue_id FROM issue_minhash))
+    """, (repo_id,)).fetchone()[0]
+    conn.close()
+    return rows
+
+def test_retry_after_partial_sync_scores_and_indexes_committed_pages(db, monkeypatch):
+    monkeypatch.setattr(logic, "get_github_token", lambda: "token")
+    repo_id = db.get_repositories()[0]['id']
+    pages = [[_item(1), _item(2)], [_item(3)]]
+
+    _serve_pages(monkeypatch, pages)
+
+    # The first page is committed, then writing the second one fails
+    upsert_issues = db.upsert_issues
+    def failing_upsert(repo_id, issues, conn=None):
+        if issues[0].github_issue_id == 3:
+            raise RuntimeError("disk I/O error")
+        return upsert_issues(repo_id, issues, conn=conn)
+    monkeypatch.setattr(db, "upsert_issues", failing_upsert)
+    assert "error" in logic.refresh_repository(repo_id)
+    assert _unprocessed(db, repo_id) == 0
+
+    monkeypatch.setattr(db, "upsert_issues", upsert_issues)
+    result = logic.refresh_repository(repo_id)
+    assert (result['new'], result['unchanged']) == (1, 2)
+    assert _unprocessed(db, repo_id) == 0
+
+def test_post_sync_picks_up_rows_a_crash_left_unprocessed(db, monkeypatch):
+    monkeypatch.setattr(logic, "get_github_token", lambda: "token")
+    repo_id = db.get_repositories()[0]['id']
+    # Written, then the process died before post_sync
+    db.upsert_issues(repo_id, [github_client.process_issue(_item(1))])
+
+    _serve_pages(monkeypatch, [[_item(1)]])
+    assert logic.refresh_repository(repo_id)['unchanged'] == 1
+    assert _unprocessed(db, repo_id) == 0
+
+def test_refresh_job_rescores_everything_once_per_interval(db):
+    repo_id = db.get_repositories()[0]['id']
+    db.upsert_issues(repo_id, [github_client.process_issue(_item(1))])
+    conn = db.get_connection()
+    conn.execute("UPDATE issues SET score = -1")
+    conn.commit()
+
+    def stale_scores():
+        return conn.execute("SELECT COUNT(*) FROM issues WHERE score = -1").fetchone()[0]
+
+    logic.run_refresh_job(db.create_refresh_job("test", []))
+    assert stale_scores() == 0
+
+    # Within the interval, a job with nothing to refresh leaves scores alone
+    conn.execute("UPDATE issues SET score = -1")
+    conn.commit()
+    logic.run_refresh_job(db.create_refresh_job("test", []))
+    assert stale_scores() > 0
+    conn.close()
@@ -0,0 +1,52 @@
+import sqlite3
+
+import snapshot
+from models import Issue
+
+def _add_issue(db, title, labels, body_preview):
+    repo_id = db.get_repositories()[0]['id']
+    db.upsert_issues(repo_id, [Issue(
+        github_issue_id=len(title) + len(labels) + len(body_preview), github_issue_url="https://github.com/o/r/issues/1",
+        title=title, state='open', labels=labels, is_assigned=False, assignee_login=None, comments_count=3,
+        created_at_github="2024-01-01T00:00:00Z", body_preview=body_preview, body="full body",
+    )])
+
+def _rows(path, query):
+    conn = sqlite3.connect(path)
+    rows = conn.execute(query).fetchall()
+    conn.close()
+    return rows
+
+def test_csv_round_trip_keeps_nulls_empty_strings_and_na_like_text(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "pa", None)  # Force the CSV fallback
+    _add_issue(db, "NA", "nan", "")
+    _add_issue(db, "null", "", "NULL text")
+    query = """
+        SELECT title, labels, body_preview, assignee_login, comments_count, typeof(comments_count)
+        FROM issues ORDER BY id
+    """
+    expected = _rows(db.DB_NAME, query)
+    assert expected[0][:4] == ("NA", "nan", "", None)
+
+    snapshot.export_snapshot(str(tmp_path / "snap"), fmt="csv")
+    restored = str(tmp_path / "restored.db")
+    monkeypatch.setattr(db, "_initialized", set())
+    snapshot.import_snapshot(str(tmp_path / "snap"), restored)
+    assert _rows(restored, query) == expected
+    assert _rows(restored, "SELECT COUNT(*) FROM issue_bodies") == [(2,)]
+
+def test_export_does_not_block_a_concurrent_refresh(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "pa", None)
+    _add_issue(db, "Before the export", "bug", "")
+
+    # Commit from another connection while the export's read transaction is open
+    blob_columns = snapshot._blob_columns
+    def write_during_export(conn, table):
+        if table == "issues":
+            _add_issue(db, "Written during the export", "bug", "")
+        return blob_columns(conn, table)
+    monkeypatch.setattr(snapshot, "_blob_columns", write_during_export)
+
+    counts = snapshot.export_snapshot(str(tmp_path / "snap"), fmt="csv")
+    assert counts["issues"] == 1  # The export's snapshot predates the write
+    assert db.count_issues() == 2
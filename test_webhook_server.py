@@ -0,0 +1,80 @@
+import json
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+import requests
+
+import webhook_server
+
+SECRET = "test-secret"
+
+def _payload(repo, number, action="opened", labels=("good first issue",)):
+    """Trimmed-down recorded `issues` delivery."""
+    return {
+        'action': action,
+        'issue': {
+            'number': number, 'html_url': f"https://github.com/{repo['full_name']}/issues/{number}",
+            'title': f"Crash on input {number}", 'state': 'open',
+            'labels': [{'name': name} for name in labels], 'assignees': [], 'comments': 0,
+            'created_at': "2024-01-01T00:00:00Z", 'body': "Steps to reproduce",
+        },
+        'repository': {'full_name': repo['full_name']},
+    }
+
+@pytest.fixture
+def server(db, monkeypatch):
+    # Not started: the tests flush it themselves
+    batcher = webhook_server.WebhookBatcher()
+    monkeypatch.setattr(webhook_server.WebhookHandler, "secret", SECRET)
+    monkeypatch.setattr(webhook_server.WebhookHandler, "batcher", batcher)
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), webhook_server.WebhookHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/", batcher
+    httpd.shutdown()
+    httpd.server_close()
+
+def _post(url, payload, secret=SECRET):
+    body = json.dumps(payload).encode("utf-8")
+    return requests.post(url, data=body, timeout=5, headers={
+        "Content-Type": "application/json",
+        "X-GitHub-Event": "issues",
+        "X-Hub-Signature-256": webhook_server.sign_payload(body, secret),
+    })
+
+def _stored(db, repo_id):
+    conn = db.get_connection()
+    rows = [r[0] for r in conn.execute(
+        "SELECT github_issue_id FROM issues WHERE repository_id = ? ORDER BY github_issue_id", (repo_id,))]
+    conn.close()
+    return rows
+
+def test_signed_delivery_is_upserted(db, server):
+    url, batcher = server
+    repo = db.get_repositories()[0]
+    assert _post(url, _payload(repo, 7)).status_code == 202
+    batcher.flush()
+    assert _stored(db, repo['id']) == [7]
+
+def test_bad_signature_is_rejected(db, server):
+    url, batcher = server
+    repo = db.get_repositories()[0]
+    assert _post(url, _payload(repo, 7), secret="wrong").status_code == 401
+    batcher.flush()
+    assert _stored(db, repo['id']) == []
+
+def test_out_of_scope_and_transferred_issues_are_dropped(db, server):
+    url, batcher = server
+    repo = db.get_repositories()[0]
+    db.update_repository_labels(repo['id'], ["Good First Issue"])
+    _post(url, _payload(repo, 1))
+    _post(url, _payload(repo, 2))
+    _post(url, _payload(repo, 3, labels=("bug",)))
+    batcher.flush()
+    assert _stored(db, repo['id']) == [1, 2]
+
+    _post(url, _payload(repo, 1, action="unlabeled", labels=()))
+    _post(url, _payload(repo, 2, action="transferred"))
+    batcher.flush()
+    assert _stored(db, repo['id']) == []
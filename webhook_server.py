@@ -0,0 +1,240 @@
+"""
+Local receiver for GitHub `issues` and `label` webhooks.
+
+Run with:   python webhook_server.py [--port 8765]
+Replay a recorded delivery locally:
+            python webhook_server.py replay payload.json --event issues
+
+Deliveries must be signed with GITHUB_WEBHOOK_SECRET (X-Hub-Signature-256).
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from dotenv import load_dotenv
+
+import database
+import github_client
+import logic
+
+DEFAULT_PORT = 8765
+FLUSH_INTERVAL = 2.0   # Seconds between batched writes
+FLUSH_MAX_EVENTS = 200  # Flush early once this many issues are pending
+
+def sign_payload(body: bytes, secret: str) -> str:
+    """Returns the X-Hub-Signature-256 header value GitHub would send for body."""
+    digest = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+def verify_signature(body: bytes, signature: str, secret: str) -> bool:
+    if not secret or not signature:
+        return False
+    return hmac.compare_digest(sign_payload(body, secret), signature)
+
+class WebhookBatcher:
+    """
+    Coalesces webhook issue events and writes them in batches.
+    Several events for the same issue between flushes collapse into the latest one.
+    """
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL, flush_max=FLUSH_MAX_EVENTS):
+        self.flush_interval = flush_interval
+        self.flush_max = flush_max
+        self._lock = threading.Lock()
+        self._pending = {}  # (repo_id, github_issue_id) -> Issue, or None for a deletion
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+
+    def add(self, repo_id, github_issue_id, issue):
+        with self._lock:
+            self._pending[(repo_id, github_issue_id)] = issue
+            if len(self._pending) >= self.flush_max:
+                self._wake.set()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        by_repo = {}
+        for (repo_id, github_issue_id), issue in pending.items():
+            upserts, deletes = by_repo.setdefault(repo_id, ([], []))
+            if issue is None:
+                deletes.append(github_issue_id)
+            else:
+                upserts.append(issue)
+
+        flush_started = datetime.now()
+        conn = database.get_connection()
+        try:
+            for repo_id, (upserts, deletes) in by_repo.items():
+                if upserts:
+                    result = database.upsert_issues(repo_id, upserts, conn=conn)
+                    print(f"Webhook: repo {repo_id} +{result['new']} new, {result['updated']} updated")
+                if deletes:
+                    database.delete_issues(repo_id, deletes, conn=conn)
+                database.mark_webhook_received(repo_id)
+                database.record_repo_snapshot(repo_id, conn=conn)
+        finally:
+            conn.close()
+
+        for repo_id, (upserts, _) in by_repo.items():
+            if upserts:
+                logic.post_sync(repo_id, flush_started)
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Webhook flush failed: {str(e)}")
+
+def in_label_scope(repo, item):
+    """
+    Whether an issue payload falls inside the labels a repository tracks (any of
+    them, case-insensitively, like the polling path's per-label requests).
+    Repositories without tracked labels take every issue.
+    """
+    tracked = {label.lower() for label in logic.parse_labels(repo['tracked_labels'])}
+    if not tracked:
+        return True
+    return any(label.get('name', '').lower() in tracked for label in item.get('labels') or [])
+
+def handle_event(event, payload, batcher):
+    """
+    Applies one webhook delivery. Returns an HTTP status code.
+    """
+    repo_info = payload.get('repository') or {}
+    repo = database.get_repository_by_full_name(repo_info.get('full_name', ''))
+    if not repo:
+        # Not tracked here; acknowledge so GitHub doesn't keep retrying
+        return 202
+
+    if event == "issues":
+        item = payload.get('issue') or {}
+        if 'pull_request' in item or 'number' not in item:
+            return 202
+        # A transferred issue lives in another repository now; an issue that lost its
+        # tracked label would never have been fetched by a refresh. Both are dropped
+        # (a no-op if the issue was never stored).
+        if payload.get('action') in ("deleted", "transferred") or not in_label_scope(repo, item):
+            batcher.add(repo['id'], item['number'], None)
+        else:
+            # Same transform as the polling path; closed issues are kept with state 'closed'
+            batcher.add(repo['id'], item['number'], github_client.process_issue(item))
+
+    elif event == "label":
+        database.mark_webhook_received(repo['id'])
+        # A renamed/removed label changes the label strings of issues we never got events for
+        if payload.get('action') in ("edited", "deleted"):
+            database.request_reconciliation(repo['id'])
+
+    return 202
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    secret = None
+    batcher = None
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+
+        if not verify_signature(body, self.headers.get("X-Hub-Signature-256"), self.secret):
+            self._reply(401, "invalid signature")
+            return
+
+        event = self.headers.get("X-GitHub-Event", "")
+        if event == "ping":
+            self._reply(200, "pong")
+            return
+        if event not in ("issues", "label"):
+            self._reply(202, "ignored")
+            return
+
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            self._reply(400, "invalid JSON")
+            return
+
+        status = handle_event(event, payload, self.batcher)
+        self._reply(status, "accepted")
+
+    def _reply(self, status, message):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain")
+        self.end_headers()
+        self.wfile.write(message.encode("utf-8"))
+
+def serve(port=DEFAULT_PORT):
+    load_dotenv()
+    secret = os.getenv("GITHUB_WEBHOOK_SECRET")
+    if not secret:
+        print("GITHUB_WEBHOOK_SECRET is not set; every delivery will be rejected.")
+
+    database.init_db()
+    batcher = WebhookBatcher()
+    batcher.start()
+
+    WebhookHandler.secret = secret
+    WebhookHandler.batcher = batcher
+    server = ThreadingHTTPServer(("127.0.0.1", port), WebhookHandler)
+    print(f"Listening for GitHub webhooks on http://127.0.0.1:{port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.stop()
+
+def replay(path, event, port=DEFAULT_PORT):
+    """POSTs a recorded webhook payload to a locally running receiver."""
+    load_dotenv()
+    secret = os.getenv("GITHUB_WEBHOOK_SECRET", "")
+    with open(path, "rb") as f:
+        body = f.read()
+    response = requests.post(
+        f"http://127.0.0.1:{port}/",
+        data=body,
+        headers={
+            "Content-Type": "application/json",
+            "X-GitHub-Event": event,
+            "X-Hub-Signature-256": sign_payload(body, secret),
+        },
+        timeout=5,
+    )
+    print(f"{response.status_code} {response.text}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="GitHub webhook receiver")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    sub = parser.add_subparsers(dest="command")
+    replay_parser = sub.add_parser("replay", help="POST a recorded payload to the local receiver")
+    replay_parser.add_argument("payload")
+    replay_parser.add_argument("--event", default="issues")
+    args = parser.parse_args()
+
+    if args.command == "replay":
+        replay(args.payload, args.event, args.port)
+    else:
+        serve(args.port)